@@ -0,0 +1,68 @@
+"""
+Admin routes: request profiles captured by the sampling profiler, startup costs and
+store versions.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core.activity_log import get_log
+from app.core.profiler import ALLOW_ON_REQUEST, KEEP, SAMPLE_RATE, get_profile, list_profiles
+from app.core.store_versions import store_versions
+from app.core.warmup import startup_report
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+@router.get("/profiles", summary="List recent request profiles")
+def profiles(
+    limit: int = Query(50, ge=1, le=1000),
+    path: Optional[str] = Query(None, description="Only profiles of request paths starting with this"),
+):
+    """
+    Profiles kept in the on-disk ring buffer, newest first. Requests are profiled at
+    NITILENS_PROFILE_SAMPLE_RATE, or on `X-Nitilens-Profile: 1` / `?profile=1` when the
+    server runs with NITILENS_PROFILE_ON_REQUEST=1.
+    """
+    items = list_profiles(limit, path)
+    return {"capacity": KEEP, "sample_rate": SAMPLE_RATE, "on_request": ALLOW_ON_REQUEST,
+            "total": len(items), "profiles": items}
+
+
+@router.get("/profiles/{profile_id}", summary="Folded stacks of one profile (flamegraph input)")
+def profile(profile_id: str, format: str = Query("folded", pattern="^(folded|json)$")):
+    """
+    `folded` returns text for flamegraph.pl or speedscope; `json` returns the metadata
+    with the stacks as a {stack: samples} map.
+    """
+    found = get_profile(profile_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    meta, folded = found
+    if format == "folded":
+        return PlainTextResponse(folded)
+    stacks = {}
+    for line in folded.splitlines():
+        stack, _, count = line.rpartition(" ")
+        stacks[stack] = int(count)
+    return {**meta, "stacks": stacks}
+
+
+@router.get("/startup", summary="Import-time costs and warm-up progress")
+def startup():
+    """
+    Seconds spent importing app.main, each deferred heavy import (timed when first used
+    or warmed), and the background warm-up's per-step timings.
+    """
+    return startup_report()
+
+
+@router.get("/store-versions", summary="Current version of each store (the inputs of ETags)")
+def versions():
+    return store_versions()
+
+
+@router.get("/activity-log", summary="Activity log size, segments and last event")
+def activity_log_status():
+    return get_log().status()
@@ -3,26 +3,46 @@ API routes for compliance scanning and violation retrieval.
 """
 from typing import List, Literal, Optional
 from collections import defaultdict
+from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Query
-from app.core.violation_engine import (
-    get_dataset_stats, load_violations, run_scan, DATA_FILE
-)
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from app.core import activity_log
+from app.core.deadlines import get_engine, run_deadline_tick, submit_events
+from app.core.events import broadcaster, stream
+from app.core.lazy import lazy_import
+from app.core.metrics import ScanMetrics
 from app.core.scheduler import get_scheduler_status
+from app.core.store_versions import conditional
 from app.core.rule_engine import get_rules
+from app.models.gdpr_event import GdprEvent
 from app.models.violation import Violation
 
+# pandas-backed engines are imported on first use (or by the startup warm-up)
+violation_engine = lazy_import("app.core.violation_engine")
+dataset_adapters = lazy_import("app.core.dataset_adapters")
+backtest_engine = lazy_import("app.core.backtest")
+export = lazy_import("app.core.export")
+
 router = APIRouter(prefix="/api/compliance", tags=["Compliance"])
 
 
-@router.post("/scan", summary="Run a compliance scan on the IBM AML dataset")
-def trigger_scan():
+@router.post("/scan", summary="Run a compliance scan on a registered dataset")
+def trigger_scan(dataset: str = "ibm-aml", engine: Optional[Literal["pandas", "sql"]] = None,
+                 requested_by: str = "compliance_officer"):
     """
-    Runs all approved rules against the IBM AML transaction dataset.
-    Returns a summary of violations found.
+    Runs all approved rules against a registered transaction dataset
+    (IBM AML by default). Returns a summary of violations found, with per-stage
+    and per-rule timings, rows in / out and bytes written under `metrics`.
+    `engine` overrides NITILENS_SCAN_ENGINE for this scan.
     """
     try:
-        violations = run_scan()
+        dataset_adapters.get_adapter(dataset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    metrics = ScanMetrics(dataset)
+    try:
+        violations = violation_engine.run_scan(dataset, metrics, engine, requested_by)
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -36,14 +56,17 @@ def trigger_scan():
         rule_counts[v.rule_id] = rule_counts.get(v.rule_id, 0) + 1
 
     return {
+        "dataset": dataset,
         "total_violations": len(violations),
         "severity_breakdown": severity_counts,
         "violations_by_rule": rule_counts,
+        "metrics": metrics.as_dict(),
         "message": f"Scan complete. {len(violations)} violation(s) detected and saved.",
     }
 
 
-@router.get("/violations", summary="List all compliance violations")
+@router.get("/violations", summary="List all compliance violations",
+            dependencies=[Depends(conditional("violations"))])
 def list_violations(
     status: Optional[Literal["open", "reviewed", "resolved", "false_positive"]] = None,
     severity: Optional[Literal["critical", "high", "medium", "low"]] = None,
@@ -51,7 +74,7 @@ def list_violations(
     limit: int = Query(default=100, ge=1, le=1000),
     offset: int = Query(default=0, ge=0),
 ):
-    violations = load_violations()
+    violations = violation_engine.load_violations()
 
     if status:
         violations = [v for v in violations if v.status == status]
@@ -71,23 +94,111 @@ def list_violations(
     }
 
 
-@router.get("/violations/{violation_id}", summary="Get a single violation by ID")
+@router.get("/violations/{violation_id}", summary="Get a single violation by ID",
+            dependencies=[Depends(conditional("violations"))])
 def get_violation(violation_id: str):
-    violations = load_violations()
+    violations = violation_engine.load_violations()
     match = next((v for v in violations if v.id == violation_id), None)
     if not match:
         raise HTTPException(status_code=404, detail="Violation not found")
     return match
 
 
-@router.get("/summary", summary="Centralized compliance dashboard summary")
+@router.get("/violations/{violation_id}/source-row", summary="Raw transaction row behind a violation")
+def get_violation_source_row(violation_id: str):
+    violations = violation_engine.load_violations()
+    match = next((v for v in violations if v.id == violation_id), None)
+    if not match:
+        raise HTTPException(status_code=404, detail="Violation not found")
+    try:
+        return violation_engine.get_source_row(match)
+    except (LookupError, KeyError) as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+Severity = Literal["critical", "high", "medium", "low"]
+
+
+def _export_response(build, fmt: str, filename: str, response: Optional[Response] = None) -> StreamingResponse:
+    try:
+        table = build()
+    except export.ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    media_type, extension = export.FORMATS[fmt]
+    # Headers set by dependencies (ETag) are only merged into responses FastAPI builds itself
+    headers = dict(response.headers) if response is not None else {}
+    headers.pop("content-length", None)
+    return StreamingResponse(
+        export.write_table(table, fmt),
+        media_type=media_type,
+        headers={**headers, "Content-Disposition": f'attachment; filename="{filename}.{extension}"',
+                 "X-Row-Count": str(table.num_rows)},
+    )
+
+
+@router.get("/export/violations", summary="Export violations as Arrow IPC or Parquet",
+            dependencies=[Depends(conditional("violations"))])
+def export_violations(
+    response: Response,
+    format: Literal["arrow", "parquet"] = "parquet",
+    rule_id: Optional[List[str]] = Query(default=None),
+    severity: Optional[List[Severity]] = Query(default=None),
+    status: Optional[List[Literal["open", "reviewed", "resolved", "false_positive"]]] = Query(default=None),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """
+    The whole (filtered) violation store in one typed columnar file, with no page limit.
+    Filters repeat (`?rule_id=aml-001&rule_id=aml-006`); dates apply to the transaction
+    timestamp, both ends inclusive. Evidence is included as a JSON string column.
+    """
+    return _export_response(
+        lambda: export.violations_table(rule_id, severity, status, date_from, date_to),
+        format, "violations", response,
+    )
+
+
+@router.get("/export/flagged", summary="Export flagged transaction rows as Arrow IPC or Parquet")
+def export_flagged(
+    dataset: str = "ibm-aml",
+    format: Literal["arrow", "parquet"] = "parquet",
+    rule_id: Optional[List[str]] = Query(default=None),
+    severity: Optional[List[Severity]] = Query(default=None),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    transaction_ids: bool = False,
+):
+    """
+    Canonical transaction rows flagged by the selected approved rules (all by default),
+    with `row_number` and a `rule_ids` list column; join to violations on row_number,
+    or on transaction_id when `transaction_ids=true`. The date range and rule selection
+    are applied before rules are evaluated.
+    """
+    try:
+        dataset_adapters.get_adapter(dataset)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return _export_response(
+        lambda: export.flagged_table(dataset, rule_id, severity, date_from, date_to, transaction_ids),
+        format, f"flagged-{dataset}",
+    )
+
+
+@router.get("/summary", summary="Centralized compliance dashboard summary",
+            dependencies=[Depends(conditional("violations", "rules", "dataset"))])
 def compliance_summary():
     """
     Single source of truth for all dashboard metrics.
     Returns comprehensive scan results, statistics, and trend data.
     """
-    violations = load_violations()
-    stats = get_dataset_stats()
+    violations = violation_engine.load_violations()
+    stats = violation_engine.get_dataset_stats()
     rules = get_rules(approved_only=True)
 
     total_txns = stats.get("total_transactions", 0)
@@ -170,54 +281,108 @@ def compliance_summary():
         "most_violated_rules": most_violated_rules,
         "trend_data": trend_data,
         "last_scan_time": last_scan_time,
-        "dataset_connected": DATA_FILE.exists(),
+        "dataset_connected": violation_engine.DATA_FILE.exists(),
         "dataset_laundering_rate": stats.get("laundering_percentage", 0),
     }
 
 
-@router.get("/activity", summary="Recent compliance activity log")
-def compliance_activity(limit: int = Query(default=10, ge=1, le=50)):
+ActivityType = Literal["violation_detected", "violation_reviewed", "case_reviewed", "scan_completed",
+                      "scan_failed", "rule_approved", "rule_unapproved"]
+
+
+@router.get("/activity", summary="Recent compliance activity log",
+            dependencies=[Depends(conditional("activity"))])
+def compliance_activity(
+    limit: int = Query(default=10, ge=1, le=500),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    actor: Optional[str] = None,
+    type: Optional[List[ActivityType]] = Query(default=None),
+):
     """
-    Returns recent compliance activity events (violations detected, reviews, etc.)
-    Sorted by timestamp, most recent first.
+    Recent events from the append-only activity log, most recent first: detections,
+    every review action with its reviewer, scans and rule approvals. Filter by time
+    range (`since` / `until`, inclusive; naive times are UTC), `actor` and `type`.
+    `total` is the number of events in the log.
     """
-    violations = load_violations()
-    
-    activity_items = []
-    
-    # Add violation detection events
-    for v in violations:
-        activity_items.append({
-            "type": "violation_detected",
-            "severity": v.severity,
-            "transaction_id": v.transaction_id,
-            "rule_name": v.rule_name,
-            "timestamp": v.detected_at,
-            "status": v.status
-        })
-    
-    # Add review events
-    for v in violations:
-        if v.reviewed_at:
-            activity_items.append({
-                "type": "violation_reviewed",
-                "severity": v.severity,
-                "transaction_id": v.transaction_id,
-                "rule_name": v.rule_name,
-                "timestamp": v.reviewed_at,
-                "status": v.status,
-                "comment": v.reviewer_comment
-            })
-    
-    # Sort by timestamp descending
-    activity_items.sort(key=lambda x: x["timestamp"], reverse=True)
-    
+    log = activity_log.get_log()
+    events = log.recent(limit, since, until, actor, type)
     return {
-        "total": len(activity_items),
-        "items": activity_items[:limit]
+        "total": log.total(),
+        "items": [{**event, "timestamp": event["at"]} for event in events],
     }
 
 
+@router.get("/backtest/{rule_id}", summary="Backtest a rule's threshold against laundering labels")
+def backtest(
+    rule_id: str,
+    dataset: str = "ibm-aml",
+    min_threshold: Optional[float] = None,
+    max_threshold: Optional[float] = None,
+    steps: int = Query(default=100, ge=1, le=5000),
+    scale: Literal["linear", "log"] = "linear",
+):
+    """
+    Sweeps the rule's numeric threshold and returns precision, recall,
+    alert volume and lift curves computed in one vectorized pass.
+    """
+    try:
+        dataset_adapters.get_adapter(dataset)
+        return backtest_engine.backtest_rule(rule_id, dataset, min_threshold, max_threshold, steps, scale)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.get("/scheduler", summary="Get periodic scan scheduler status")
 def scheduler_status():
     return get_scheduler_status()
+
+
+@router.post("/gdpr/events", summary="Submit GDPR erasure / breach events", status_code=202)
+def submit_gdpr_events(events: List[GdprEvent]):
+    """
+    Append events to the deadline engine's event file and advance it immediately, so a
+    deadline that is already past raises its violation in this request.
+    """
+    for event in events:
+        try:
+            datetime.fromisoformat(event.timestamp.replace("Z", "+00:00"))
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid timestamp: {event.timestamp!r}")
+    accepted = submit_events([e.model_dump() for e in events])
+    missed = run_deadline_tick()
+    return {"accepted": accepted, "violations_raised": missed, "deadlines": get_engine().status()}
+
+
+@router.get("/gdpr/deadlines", summary="GDPR deadline engine status")
+def gdpr_deadline_status():
+    return get_engine().status()
+
+
+@router.get("/stream", summary="Server-sent events: scan progress, violation and summary deltas")
+async def event_stream(last_event_id: Optional[str] = Header(default=None)):
+    """
+    A text/event-stream of compact deltas: `scan_started`, `scan_progress`,
+    `scan_completed` / `scan_failed`, `violations_added`, `violation_status` and
+    `summary` counters. New clients first get the latest `summary`; reconnecting clients
+    (Last-Event-ID) get the events they missed, or `resync` if those are gone, which
+    is also sent to a client too slow to keep up. A `resync` means: refetch via the
+    regular endpoints.
+    """
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+    sub = broadcaster.subscribe(last_id)
+    return StreamingResponse(
+        stream(sub, broadcaster),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stream/status", summary="Event stream subscribers and backpressure counters")
+def event_stream_status():
+    return broadcaster.status()
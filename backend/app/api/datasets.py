@@ -1,59 +1,92 @@
 """
 API routes for IBM AML dataset operations.
 """
-from fastapi import APIRouter, HTTPException, Query
-from app.core.violation_engine import get_dataset_preview, get_dataset_stats, load_transactions
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.lazy import lazy_import
+from app.core.store_versions import conditional
+
+# pandas-backed engines are imported on first use (or by the startup warm-up)
+dataset_adapters = lazy_import("app.core.dataset_adapters")
+feature_store = lazy_import("app.core.feature_store")
+row_index = lazy_import("app.core.row_index")
+violation_engine = lazy_import("app.core.violation_engine")
 
 router = APIRouter(prefix="/api/datasets", tags=["Datasets"])
 
 
 @router.get("", summary="List available datasets")
 def list_datasets():
-    return [
-        {
-            "id": "ibm-aml",
-            "name": "IBM AML Transactions",
-            "description": "Synthetic financial transaction dataset with laundering labels (IBM Research)",
-            "license": "CDLA-Sharing-1.0",
-            "source": "https://www.kaggle.com/datasets/ealtman2019/ibm-transactions-for-anti-money-laundering-aml",
-            "columns": [
-                "Timestamp", "From Bank", "Account", "To Bank", "Account.1",
-                "Amount Received", "Receiving Currency", "Amount Paid",
-                "Payment Currency", "Payment Format", "Is Laundering"
-            ],
-            "connected": True,
-        },
-        {
-            "id": "paysim",
-            "name": "PaySim Mobile Money",
-            "description": "6.3M synthetic mobile transactions with fraud labels (CC BY-SA 4.0)",
-            "license": "CC BY-SA 4.0",
-            "source": "https://www.kaggle.com/datasets/ealaxi/paysim1",
-            "columns": [
-                "step", "type", "amount", "nameOrig", "oldbalanceOrg", "newbalanceOrig",
-                "nameDest", "oldbalanceDest", "newbalanceDest", "isFraud", "isFlaggedFraud"
-            ],
-            "connected": False,
-        },
-    ]
-
-
-@router.get("/aml/stats", summary="Statistics for the IBM AML dataset")
+    return [adapter.describe() for adapter in dataset_adapters.list_adapters()]
+
+
+@router.get("/aml/stats", summary="Statistics for the IBM AML dataset",
+            dependencies=[Depends(conditional("dataset"))])
 def aml_stats():
-    stats = get_dataset_stats()
+    stats = violation_engine.get_dataset_stats()
     if "error" in stats:
         raise HTTPException(status_code=500, detail=stats["error"])
     return stats
 
 
-@router.get("/aml/preview", summary="Preview first N rows of IBM AML dataset")
+@router.get("/aml/preview", summary="Preview first N rows of IBM AML dataset",
+            dependencies=[Depends(conditional("dataset"))])
 def aml_preview(limit: int = Query(default=20, ge=1, le=200)):
-    rows = get_dataset_preview(limit)
+    rows = violation_engine.get_dataset_preview(limit)
     if rows and "error" in rows[0]:
         raise HTTPException(status_code=500, detail=rows[0]["error"])
     return {"rows": rows, "count": len(rows)}
 
 
+@router.get("/{dataset_id}/rows", summary="Page through raw rows of a dataset")
+def dataset_rows(
+    dataset_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=1000),
+):
+    try:
+        adapter = dataset_adapters.get_adapter(dataset_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    if not adapter.connected:
+        raise HTTPException(status_code=404, detail=f"{adapter.name} dataset is not connected")
+    rows = violation_engine.get_dataset_preview(limit, dataset_id, offset)
+    if rows and "error" in rows[0]:
+        raise HTTPException(status_code=500, detail=rows[0]["error"])
+    return {"dataset": dataset_id, "offset": offset, "total": row_index.total_rows(adapter),
+            "rows": rows, "count": len(rows)}
+
+
+def _features_for(dataset_id: str):
+    try:
+        return feature_store.get_feature_store(dataset_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/{dataset_id}/accounts", summary="Top accounts by a precomputed feature")
+def top_accounts(
+    dataset_id: str,
+    sort_by: Literal["sent_usd", "received_usd", "sent_count", "received_count",
+                     "distinct_counterparties", "decayed_count_1d", "decayed_count_7d"] = "sent_usd",
+    limit: int = Query(default=20, ge=1, le=500),
+):
+    features = _features_for(dataset_id)
+    return {"dataset": dataset_id, "total_accounts": len(features), "sort_by": sort_by,
+            "accounts": features.top_accounts(sort_by, limit)}
+
+
+@router.get("/{dataset_id}/accounts/{account}", summary="Feature profile for one account")
+def account_profile(dataset_id: str, account: str):
+    profile = _features_for(dataset_id).account(account)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Account {account} not found in {dataset_id}")
+    return profile
+
+
 @router.get("/aml/schema", summary="Column schema for IBM AML dataset")
 def aml_schema():
     return {
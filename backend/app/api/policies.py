@@ -1,102 +1,180 @@
 """
 API routes for policy management and rule review.
 """
-import json
-import shutil
-import tempfile
+import hashlib
+import time
 import uuid
-from pathlib import Path
+from datetime import datetime, timezone
 from typing import List, Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 
-from app.core.pdf_parser import extract_text_from_pdf
+from app.core.gdpr_search import search as search_gdpr
+from app.core.ingestion import (
+    add_policy, get_policy, ingestion_status, load_policies, release_slot,
+    spool_path, submit_ingestion, try_reserve_slot
+)
+from app.core.lazy import lazy_import
+from app.core.store_versions import conditional
 from app.core.rule_engine import (
-    add_rules, approve_rule, delete_rule, get_rules, update_rule
+    approve_rule, delete_rule, get_rules, update_rule
 )
-from app.core.rule_extractor import extract_rules_from_text
 from app.models.rule import PolicyRule
 
-router = APIRouter(prefix="/api/policies", tags=["Policies"])
-
-# In-memory policy registry (lightweight — no DB needed for hackathon)
-_POLICIES_FILE = Path(__file__).parent.parent / "storage" / "policies.json"
-
+# pandas-backed rule evaluation is imported on first preview (or by the startup warm-up)
+rule_conditions = lazy_import("app.core.rule_conditions")
+rule_preview = lazy_import("app.core.rule_preview")
 
-def _load_policies() -> list:
-    try:
-        return json.loads(_POLICIES_FILE.read_text(encoding="utf-8"))
-    except Exception:
-        return []
+router = APIRouter(prefix="/api/policies", tags=["Policies"])
 
 
-def _save_policies(policies: list) -> None:
-    _POLICIES_FILE.write_text(json.dumps(policies, indent=2), encoding="utf-8")
+def _spool_upload(upload: UploadFile, policy_id: str):
+    """
+    Copy the uploaded file to the spool directory, hashing it on the way
+    (runs in the threadpool). Returns (path, sha256 hex digest).
+    """
+    dest = spool_path(policy_id)
+    digest = hashlib.sha256()
+    with dest.open("wb") as out:
+        while chunk := upload.file.read(1024 * 1024):
+            digest.update(chunk)
+            out.write(chunk)
+    return dest, digest.hexdigest()
 
 
-@router.get("", summary="List all uploaded policies")
+@router.get("", summary="List all uploaded policies", dependencies=[Depends(conditional("policies"))])
 def list_policies():
-    return _load_policies()
+    return load_policies()
 
 
-@router.post("/upload", summary="Upload a policy PDF and extract rules")
+@router.post("/upload", summary="Upload a policy PDF and queue rule extraction", status_code=202)
 async def upload_policy(file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
+    # Backpressure: refuse rather than queue unboundedly behind a burst of uploads
+    if not try_reserve_slot():
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Policy ingestion queue is full. Retry shortly."},
+            headers={"Retry-After": "5"},
+        )
+
     policy_id = f"pol-{uuid.uuid4().hex[:8]}"
+    try:
+        pdf_path, content_hash = await run_in_threadpool(_spool_upload, file, policy_id)
+        policy_record = {
+            "id": policy_id,
+            "name": file.filename,
+            "uploaded_at": datetime.now(timezone.utc).isoformat(),
+            "status": "processing",
+            "rules_extracted": 0,
+            "file_size_kb": round(file.size / 1024, 1) if file.size else 0,
+            "content_hash": content_hash,
+        }
+        await run_in_threadpool(add_policy, policy_record)
+        submit_ingestion(policy_id, pdf_path, file.filename, content_hash)
+    except Exception:
+        release_slot()
+        raise
 
-    # Save temp file for parsing
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
+    return {
+        "policy": policy_record,
+        "status_url": f"/api/policies/{policy_id}/status",
+        "message": f"'{file.filename}' accepted. Rules are being extracted and will require approval before scanning.",
+    }
 
+
+@router.get("/search", summary="Search GDPR articles (BM25-ranked)")
+def search_articles(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    started = time.perf_counter()
     try:
-        text = extract_text_from_pdf(tmp_path)
-    finally:
-        Path(tmp_path).unlink(missing_ok=True)
-
-    extracted = extract_rules_from_text(text, policy_id, file.filename)
-    added = add_rules(extracted)
-
-    policy_record = {
-        "id": policy_id,
-        "name": file.filename,
-        "uploaded_at": __import__("datetime").datetime.utcnow().isoformat() + "Z",
-        "rules_extracted": len(added),
-        "file_size_kb": round(file.size / 1024, 1) if file.size else 0,
+        results = search_gdpr(q, limit)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"GDPR corpus not found: {e}")
+    return {
+        "query": q,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        "results": results,
     }
-    policies = _load_policies()
-    policies.append(policy_record)
-    _save_policies(policies)
 
-    return {
-        "policy": policy_record,
-        "extracted_rules": [r.model_dump() for r in added],
-        "message": f"Extracted {len(added)} rules from '{file.filename}'. Rules require approval before scanning.",
+
+@router.get("/ingestion", summary="Policy ingestion pipeline capacity")
+def get_ingestion_status():
+    return ingestion_status()
+
+
+@router.get("/{policy_id}/status", summary="Extraction status for an uploaded policy")
+def get_policy_status(policy_id: str):
+    record = get_policy(policy_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    response = {
+        "policy_id": policy_id,
+        "status": record.get("status", "completed"),
+        "rules_extracted": record.get("rules_extracted", 0),
+        "rules_deduplicated": record.get("rules_deduplicated", 0),
+        "cache_hit": record.get("cache_hit", False),
+        "error": record.get("error"),
     }
+    if response["status"] == "completed":
+        rule_ids = set(record.get("rule_ids", []))
+        response["extracted_rules"] = [r.model_dump() for r in get_rules() if r.id in rule_ids]
+    return response
 
 
-@router.get("/{policy_id}/rules", summary="List rules for a specific policy")
+@router.get("/{policy_id}/rules", summary="List rules for a specific policy",
+            dependencies=[Depends(conditional("rules"))])
 def get_policy_rules(policy_id: str):
     rules = [r for r in get_rules() if r.policy_id == policy_id]
     return rules
 
 
-@router.get("/rules/all", summary="List all rules across all policies")
+@router.get("/rules/all", summary="List all rules across all policies",
+            dependencies=[Depends(conditional("rules"))])
 def list_all_rules(approved_only: bool = False):
     return get_rules(approved_only=approved_only)
 
 
 @router.put("/rules/{rule_id}/approve", summary="Approve or reject a rule")
-def toggle_rule_approval(rule_id: str, approved: bool = True):
-    rule = approve_rule(rule_id, approved)
+def toggle_rule_approval(rule_id: str, approved: bool = True, approved_by: str = "compliance_officer"):
+    rule = approve_rule(rule_id, approved, approved_by)
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
     return rule
 
 
+@router.post("/rules/{rule_id}/preview", summary="Dry-run a rule against the transaction store")
+def preview_rule_hits(
+    rule_id: str,
+    dataset: str = "ibm-aml",
+    sample_size: int = Query(default=20_000, ge=100, le=1_000_000),
+    exact: bool = False,
+    seed: int = 0,
+):
+    """
+    Estimate hit count (with a 95% confidence interval), example rows and overlap with
+    approved rules from a stratified sample; `exact=true` evaluates every row instead.
+    """
+    rule = next((r for r in get_rules() if r.id == rule_id), None)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    try:
+        return rule_preview.preview_rule(rule, dataset_id=dataset, sample_size=sample_size,
+                                         exact=exact, seed=seed)
+    except rule_conditions.ConditionError as e:
+        raise HTTPException(status_code=422, detail=f"Rule condition cannot be evaluated: {e}")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 @router.put("/rules/{rule_id}", summary="Update a rule's fields")
 def modify_rule(rule_id: str, updates: dict):
     rule = update_rule(rule_id, updates)
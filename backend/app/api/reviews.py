@@ -1,11 +1,18 @@
 """
 API routes for human review of compliance violations.
 """
+import heapq
 from typing import Literal, Optional
-from fastapi import APIRouter, HTTPException, Query
-from app.core.violation_engine import load_violations, update_violation_status
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.lazy import lazy_import
+from app.core.priority import top_pending
+from app.core.store_versions import conditional
 from app.models.review import ReviewAction
 
+# pandas-backed engines are imported on first use (or by the startup warm-up)
+cases_store = lazy_import("app.core.cases")
+violation_engine = lazy_import("app.core.violation_engine")
+
 router = APIRouter(prefix="/api/reviews", tags=["Reviews"])
 
 _STATUS_MAP = {
@@ -16,20 +23,22 @@ _STATUS_MAP = {
 }
 
 
-@router.get("", summary="List violations pending human review")
+@router.get("", summary="List violations pending human review",
+            dependencies=[Depends(conditional("violations"))])
 def list_review_queue(
     severity: Optional[Literal["critical", "high", "medium", "low"]] = None,
     limit: int = Query(default=50, ge=1, le=200),
 ):
-    violations = load_violations()
+    """
+    Highest-risk transactions first, each with all of its pending violations.
+    `violations` flattens the same transactions in queue order.
+    """
     # Review queue shows only open + reviewed (not yet resolved or false_positive)
-    queue = [v for v in violations if v.status in ("open", "reviewed")]
-    if severity:
-        queue = [v for v in queue if v.severity == severity]
-    queue.sort(key=lambda v: {"critical": 0, "high": 1, "medium": 2, "low": 3}[v.severity])
+    transactions, total_pending = top_pending(violation_engine.load_violations(), limit, severity)
     return {
-        "total_pending": len(queue),
-        "violations": [v.model_dump() for v in queue[:limit]],
+        "total_pending": total_pending,
+        "transactions": transactions,
+        "violations": [v for t in transactions for v in t["violations"]],
     }
 
 
@@ -39,7 +48,8 @@ def review_violation(violation_id: str, action: ReviewAction):
     if not new_status:
         raise HTTPException(status_code=400, detail=f"Unknown action: {action.action}")
 
-    updated = update_violation_status(violation_id, new_status, action.comment)
+    updated = violation_engine.update_violation_status(violation_id, new_status, action.comment,
+                                                       action.reviewed_by)
     if not updated:
         raise HTTPException(status_code=404, detail="Violation not found")
 
@@ -52,9 +62,50 @@ def review_violation(violation_id: str, action: ReviewAction):
     }
 
 
-@router.get("/stats", summary="Review queue statistics")
+@router.get("/cases", summary="List consolidated alert cases",
+            dependencies=[Depends(conditional("cases"))])
+def list_cases(
+    status: Optional[Literal["open", "reviewed", "resolved", "false_positive"]] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    cases = cases_store.load_cases()
+    if status:
+        cases = [c for c in cases if c.status == status]
+    top = heapq.nlargest(limit, cases, key=lambda c: (c.risk_score or 0.0, c.transaction_count))
+    return {"total": len(cases), "cases": [c.model_dump() for c in top]}
+
+
+@router.get("/cases/{case_id}", summary="Get a single case",
+            dependencies=[Depends(conditional("cases"))])
+def get_case_detail(case_id: str):
+    case = cases_store.get_case(case_id)
+    if not case:
+        raise HTTPException(status_code=404, detail="Case not found")
+    return case
+
+
+@router.post("/cases/{case_id}/action", summary="Take a review action on a whole case")
+def review_case(case_id: str, action: ReviewAction):
+    new_status = _STATUS_MAP.get(action.action)
+    if not new_status:
+        raise HTTPException(status_code=400, detail=f"Unknown action: {action.action}")
+
+    if not violation_engine.update_case_status(case_id, new_status, action.comment, action.reviewed_by):
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    return {
+        "case_id": case_id,
+        "new_status": new_status,
+        "reviewed_by": action.reviewed_by,
+        "comment": action.comment,
+        "message": f"Case {case_id} marked as '{new_status}'.",
+    }
+
+
+@router.get("/stats", summary="Review queue statistics",
+            dependencies=[Depends(conditional("violations"))])
 def review_stats():
-    violations = load_violations()
+    violations = violation_engine.load_violations()
     open_v = [v for v in violations if v.status == "open"]
     reviewed_v = [v for v in violations if v.status == "reviewed"]
     resolved_v = [v for v in violations if v.status == "resolved"]
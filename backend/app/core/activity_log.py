@@ -0,0 +1,345 @@
+"""
+Append-only activity log: detections, review actions (with the reviewer), scans and
+rule approvals, in time order.
+
+Events are JSON lines in segment files under storage/activity, `seg-<first seq>.jsonl`,
+each holding up to SEGMENT_EVENTS events. Every event gets a sequence number and a UTC
+timestamp that never goes backwards, so file order is time order. When a segment fills
+up it is sealed: its sequence and time range and the actors in it go to manifest.json,
+which lets filtered queries skip whole segments. The newest events are also kept in
+memory, so the dashboard's "last N" never touches disk; older ones are read backwards
+from the end of the newest segments, so reading N events costs O(N) rather than the
+size of the log. Only the newest MAX_SEGMENTS segments are kept.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+logger = logging.getLogger("nitilens.activity")
+
+ACTIVITY_DIR = Path(__file__).parent.parent / "storage" / "activity"
+VIOLATIONS_FILE = Path(__file__).parent.parent / "storage" / "violations.json"
+SEGMENT_EVENTS = int(os.getenv("NITILENS_ACTIVITY_SEGMENT_EVENTS", "50000"))
+MAX_SEGMENTS = int(os.getenv("NITILENS_ACTIVITY_MAX_SEGMENTS", "100"))
+TAIL_EVENTS = 1000  # newest events kept in memory
+_BLOCK = 1 << 16
+
+
+def _iso(moment) -> str:
+    """Fixed-width UTC ISO timestamp, so timestamps compare correctly as strings."""
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _lines_reversed(path: Path) -> Iterator[bytes]:
+    """Lines of a file from last to first, read in blocks from the end."""
+    with path.open("rb") as fh:
+        fh.seek(0, os.SEEK_END)
+        position, rest = fh.tell(), b""
+        while position > 0:
+            step = min(_BLOCK, position)
+            position -= step
+            fh.seek(position)
+            lines = (fh.read(step) + rest).split(b"\n")
+            rest = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if rest:
+            yield rest
+
+
+def _segment_meta(name: str, events: Iterable[dict]) -> dict:
+    meta = {"name": name, "first_seq": None, "last_seq": None, "first_at": None, "last_at": None,
+            "count": 0, "actors": set()}
+    for event in events:
+        if meta["first_seq"] is None:
+            meta["first_seq"], meta["first_at"] = event["seq"], event["at"]
+        meta["last_seq"], meta["last_at"] = event["seq"], event["at"]
+        meta["count"] += 1
+        meta["actors"].add(event.get("actor"))
+    return meta
+
+
+def _read_segment(path: Path) -> Iterator[dict]:
+    with path.open("rb") as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # a torn last line from an interrupted write
+
+
+def _matches(event: dict, since: Optional[str], until: Optional[str], actor: Optional[str],
+             types: Optional[set]) -> bool:
+    if until is not None and event["at"] > until:
+        return False
+    if since is not None and event["at"] < since:
+        return False
+    if actor is not None and event.get("actor") != actor:
+        return False
+    return types is None or event["type"] in types
+
+
+class ActivityLog:
+    def __init__(self, directory: Path = ACTIVITY_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._segments: List[dict] = []   # sealed segments, oldest first
+        self._active: Optional[dict] = None
+        self._tail: deque = deque(maxlen=TAIL_EVENTS)
+        self._next_seq = 1
+        self._last_at = ""
+        self._load()
+
+    # -- persistence --------------------------------------------------------
+
+    @property
+    def _manifest(self) -> Path:
+        return self.directory / "manifest.json"
+
+    def _load(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        try:
+            sealed = {m["name"]: {**m, "actors": set(m["actors"])}
+                      for m in json.loads(self._manifest.read_text(encoding="utf-8"))}
+        except (OSError, ValueError):
+            sealed = {}
+        files = sorted(p.name for p in self.directory.glob("seg-*.jsonl"))
+        for name in files:
+            meta = sealed.get(name) or _segment_meta(name, _read_segment(self.directory / name))
+            if meta["count"]:
+                self._segments.append(meta)
+        if self._segments and self._segments[-1]["count"] < SEGMENT_EVENTS:
+            self._active = self._segments.pop()
+        if {m["name"] for m in self._segments} != set(sealed):
+            self._write_manifest()
+        newest = self._active or (self._segments[-1] if self._segments else None)
+        if newest:
+            self._next_seq, self._last_at = newest["last_seq"] + 1, newest["last_at"]
+        for event in reversed(list(islice(self._iter_reversed(self._all_segments()), TAIL_EVENTS))):
+            self._tail.append(event)
+
+    def _write_manifest(self) -> None:
+        tmp = self._manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps([{**m, "actors": sorted(a for a in m["actors"] if a)}
+                                   for m in self._segments]), encoding="utf-8")
+        os.replace(tmp, self._manifest)
+
+    def _seal_active(self) -> None:
+        self._segments.append(self._active)
+        self._active = None
+        while len(self._segments) > MAX_SEGMENTS:
+            dropped = self._segments.pop(0)
+            (self.directory / dropped["name"]).unlink(missing_ok=True)
+        self._write_manifest()
+
+    # -- writing ------------------------------------------------------------
+
+    def append(self, events: Iterable[dict]) -> int:
+        """
+        Append events (each with at least `type` and `actor`) in order; stamps `seq` and
+        `at` (now, or the event's own `at` when replaying history, but never earlier than
+        the last event). Returns the number written.
+        """
+        written = 0
+        with self._lock:
+            now = max(_iso(datetime.now(timezone.utc)), self._last_at)
+            batch: List[bytes] = []
+            for fields in events:
+                if self._active is None:
+                    self._flush(batch)
+                    name = f"seg-{self._next_seq:012d}.jsonl"
+                    self._active = _segment_meta(name, ())
+                at = max(_iso(fields["at"]) if "at" in fields else now, self._last_at)
+                event = {"seq": self._next_seq, "at": at, **{k: v for k, v in fields.items() if k != "at"}}
+                self._next_seq += 1
+                self._last_at = at
+                batch.append(json.dumps(event, separators=(",", ":"), default=str).encode() + b"\n")
+                meta = self._active
+                if meta["first_seq"] is None:
+                    meta["first_seq"], meta["first_at"] = event["seq"], at
+                meta["last_seq"], meta["last_at"] = event["seq"], at
+                meta["count"] += 1
+                meta["actors"].add(event.get("actor"))
+                self._tail.append(event)
+                written += 1
+                if meta["count"] >= SEGMENT_EVENTS:
+                    self._flush(batch)
+                    self._seal_active()
+            self._flush(batch)
+        return written
+
+    def _flush(self, batch: List[bytes]) -> None:
+        if batch and self._active is not None:
+            with (self.directory / self._active["name"]).open("ab") as fh:
+                fh.write(b"".join(batch))
+            batch.clear()
+
+    # -- reading ------------------------------------------------------------
+
+    def _all_segments(self) -> List[dict]:
+        return self._segments + ([self._active] if self._active else [])
+
+    def _iter_reversed(self, segments: List[dict], before_seq: Optional[int] = None,
+                       since: Optional[str] = None, until: Optional[str] = None,
+                       actor: Optional[str] = None) -> Iterator[dict]:
+        """Events newest first from disk, skipping segments the filters rule out."""
+        for meta in reversed(segments):
+            if before_seq is not None and meta["first_seq"] >= before_seq:
+                continue
+            if since is not None and meta["last_at"] < since:
+                return  # this and every older segment end before the range
+            if until is not None and meta["first_at"] > until:
+                continue
+            if actor is not None and actor not in meta["actors"]:
+                continue
+            try:
+                for line in _lines_reversed(self.directory / meta["name"]):
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # a line still being written
+                    if before_seq is not None and event["seq"] >= before_seq:
+                        continue
+                    yield event
+            except FileNotFoundError:
+                return  # dropped by retention while we read; older segments are gone too
+
+    def recent(self, limit: int = 10, since: Optional[datetime] = None, until: Optional[datetime] = None,
+               actor: Optional[str] = None, types: Optional[Iterable[str]] = None) -> List[dict]:
+        """The newest `limit` events matching the filters, newest first."""
+        since_s = _iso(since) if since is not None else None
+        until_s = _iso(until) if until is not None else None
+        types = set(types) if types else None
+        with self._lock:
+            tail = list(self._tail)
+            first_seq = self.first_seq()
+            segments = self._all_segments()
+        found: List[dict] = []
+        for event in reversed(tail):
+            if event["seq"] < first_seq or (since_s is not None and event["at"] < since_s):
+                return found  # dropped by retention, or older than the range
+            if _matches(event, since_s, until_s, actor, types):
+                found.append(event)
+                if len(found) == limit:
+                    return found
+        if not tail or tail[0]["seq"] <= first_seq:
+            return found  # the tail is the whole log
+        for event in self._iter_reversed(segments, tail[0]["seq"], since_s, until_s, actor):
+            if since_s is not None and event["at"] < since_s:
+                break
+            if _matches(event, since_s, until_s, actor, types):
+                found.append(event)
+                if len(found) == limit:
+                    break
+        return found
+
+    def first_seq(self) -> int:
+        oldest = self._segments[0] if self._segments else self._active
+        return oldest["first_seq"] if oldest else self._next_seq
+
+    def total(self) -> int:
+        """Events currently retained."""
+        return self._next_seq - self.first_seq()
+
+    def version(self) -> str:
+        return str(self._next_seq - 1)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "events": self.total(),
+                "last_seq": self._next_seq - 1,
+                "last_at": self._last_at or None,
+                "segments": len(self._segments) + (1 if self._active else 0),
+                "segment_events": SEGMENT_EVENTS,
+                "tail_events": len(self._tail),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Process-wide log and event helpers
+# ---------------------------------------------------------------------------
+
+_log: Optional[ActivityLog] = None
+_log_lock = threading.Lock()
+
+
+def get_log() -> ActivityLog:
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = ActivityLog()
+            if _log.total() == 0:
+                _backfill(_log)
+        return _log
+
+
+def _backfill(log: ActivityLog) -> None:
+    """Seed an empty log from the violation store (detections and latest reviews), once."""
+    try:
+        stored = json.loads(VIOLATIONS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    events = [(v["detected_at"], detection(v, "system")) for v in stored if v.get("detected_at")]
+    events += [(v["reviewed_at"], review(v, v.get("status"), v.get("reviewer_comment"), "unknown"))
+               for v in stored if v.get("reviewed_at")]
+    events.sort(key=lambda item: _iso(item[0]))
+    written = log.append({**event, "at": at} for at, event in events)
+    if written:
+        logger.info(f"Activity log seeded with {written} event(s) from the violation store")
+
+
+def record(event_type: str, actor: str, **fields) -> None:
+    get_log().append([{"type": event_type, "actor": actor, **fields}])
+
+
+def record_many(events: List[dict]) -> None:
+    if events:
+        get_log().append(events)
+
+
+def _field(item, name):
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+
+def detection(violation, actor: str) -> dict:
+    """A violation_detected event for a Violation (or its stored dict)."""
+    return {
+        "type": "violation_detected",
+        "actor": actor,
+        "violation_id": _field(violation, "id"),
+        "transaction_id": _field(violation, "transaction_id"),
+        "rule_id": _field(violation, "rule_id"),
+        "rule_name": _field(violation, "rule_name"),
+        "severity": _field(violation, "severity"),
+        "status": "open",
+        "risk_score": _field(violation, "risk_score"),
+        "case_id": _field(violation, "case_id"),
+    }
+
+
+def review(violation, status: str, comment: Optional[str], reviewer: str, case_id: Optional[str] = None) -> dict:
+    """A violation_reviewed (or, with case_id, case_reviewed) event for one review action."""
+    return {
+        "type": "case_reviewed" if case_id else "violation_reviewed",
+        "actor": reviewer,
+        "violation_id": _field(violation, "id"),
+        "transaction_id": _field(violation, "transaction_id"),
+        "rule_id": _field(violation, "rule_id"),
+        "rule_name": _field(violation, "rule_name"),
+        "severity": _field(violation, "severity"),
+        "status": status,
+        "comment": comment,
+        "case_id": case_id or _field(violation, "case_id"),
+    }
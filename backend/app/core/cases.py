@@ -0,0 +1,93 @@
+"""
+Alert consolidation: rolls per-row hits of high-volume rules into cases.
+
+Rows a case rule flags are grouped by sending account, and split into sessions wherever
+consecutive transfers are more than CASE_WINDOW_HOURS apart. Each session becomes one
+case (and one violation) carrying aggregated evidence instead of one violation per row.
+Grouping is a sort plus a cumulative-sum session key and a single groupby aggregation.
+"""
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.models.case import Case
+from app.core.store_versions import mark_changed
+
+CASES_FILE = Path(__file__).parent.parent / "storage" / "cases.json"
+
+# Rules whose hits are consolidated per account rather than reported per transaction
+CASE_RULES = {"aml-002", "aml-004"}
+CASE_WINDOW_HOURS = float(os.getenv("NITILENS_CASE_WINDOW_HOURS", "24"))
+MAX_CASE_TRANSACTIONS = 50  # transaction ids kept on a case; the count covers all of them
+
+_lock = threading.Lock()
+
+
+def group_into_cases(flagged: pd.DataFrame, risk: pd.Series,
+                     window_hours: float = CASE_WINDOW_HOURS) -> pd.DataFrame:
+    """
+    One row per case: account, transaction count, total USD amount, first / last seen,
+    distinct counterparties, max risk, and the row labels of its members (in time order).
+    """
+    columns = ["account", "transaction_count", "total_amount_usd", "first_seen", "last_seen",
+               "counterparties", "risk_score", "rows"]
+    if flagged.empty:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame({
+        "account": flagged["from_account"].astype(str).to_numpy(),
+        "timestamp": pd.to_datetime(flagged["timestamp"]).to_numpy(),
+        "counterparty": flagged["to_account"].astype(str).to_numpy(),
+        "amount_usd": flagged["amount_paid_usd"].to_numpy(dtype=np.float64),
+        "risk": risk.reindex(flagged.index).to_numpy(dtype=np.float64),
+        "row": flagged.index.to_numpy(),
+    }).sort_values(["account", "timestamp"], kind="stable")
+
+    # A new case starts at each account change or when the gap to the previous hit is too long
+    gap = frame["timestamp"].diff() > pd.Timedelta(hours=window_hours)
+    new_case = frame["account"].ne(frame["account"].shift()) | gap
+    frame["case"] = new_case.cumsum()
+
+    grouped = frame.groupby("case", sort=False)
+    cases = grouped.agg(
+        account=("account", "first"),
+        transaction_count=("row", "size"),
+        total_amount_usd=("amount_usd", "sum"),
+        first_seen=("timestamp", "min"),
+        last_seen=("timestamp", "max"),
+        counterparties=("counterparty", "nunique"),
+        risk_score=("risk", "max"),
+    )
+    cases["rows"] = grouped["row"].agg(list)
+    return cases[columns].reset_index(drop=True)
+
+
+def case_id(rule_id: str, account: str, first_seen) -> str:
+    """Deterministic case id, stable across rescans of the same data."""
+    return "case-" + uuid.uuid5(uuid.NAMESPACE_DNS, f"{rule_id}|{account}|{first_seen}").hex[:10]
+
+
+def load_cases() -> List[Case]:
+    """Load all cases from storage."""
+    with _lock:
+        try:
+            data = json.loads(CASES_FILE.read_text(encoding="utf-8"))
+            return [Case(**c) for c in data]
+        except Exception:
+            return []
+
+
+def save_cases(cases: List[Case]) -> None:
+    """Persist the cases list to storage."""
+    with _lock:
+        CASES_FILE.write_text(json.dumps([c.model_dump() for c in cases], indent=2), encoding="utf-8")
+        mark_changed("cases")
+
+
+def get_case(case_id_: str) -> Optional[Case]:
+    return next((c for c in load_cases() if c.id == case_id_), None)
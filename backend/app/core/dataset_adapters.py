@@ -0,0 +1,282 @@
+"""
+Dataset adapters: map each transaction source onto one canonical schema so the
+same rules can scan any registered dataset.
+
+An adapter declares its file location, raw column dtypes, a column mapping to the
+canonical schema, and constants for canonical columns the source does not carry.
+"""
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from app.core.fx import add_usd_columns, rates_signature
+
+_BASE = Path(__file__).parent.parent.parent.parent  # project root
+DATASETS_DIR = _BASE / "data" / "datasets"
+
+# Canonical transaction schema shared by every adapter (and the violation evidence).
+# Frames returned by load_frame() also carry derived amount_paid_usd / amount_received_usd.
+CANONICAL_COLUMNS = [
+    "timestamp", "from_bank", "from_account", "to_bank", "to_account",
+    "amount_received", "receiving_currency", "amount_paid", "payment_currency",
+    "payment_format", "is_laundering",
+]
+CATEGORICAL_COLUMNS = ["receiving_currency", "payment_currency", "payment_format"]
+
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def _header_names(line: bytes) -> List[str]:
+    """
+    Column names from a CSV header line, parsed by pandas so repeated names come back
+    renamed `name.1`, `name.2`, ... exactly as when pandas reads the header itself
+    (the IBM AML files have two `Account` columns).
+    """
+    return [c.strip() for c in pd.read_csv(io.BytesIO(line), nrows=0).columns]
+
+
+class DatasetAdapter:
+    """Base adapter; subclasses fill in the class attributes and may override _derive()."""
+
+    id: str = ""
+    name: str = ""
+    description: str = ""
+    license: str = ""
+    source: str = ""
+    path: Path = Path()
+    dtypes: Dict[str, str] = {}
+    column_mapping: Dict[str, str] = {}   # raw column -> canonical column
+    constants: Dict[str, object] = {}     # canonical column -> fixed value
+
+    @property
+    def raw_columns(self) -> List[str]:
+        return list(self.dtypes)
+
+    @property
+    def connected(self) -> bool:
+        return self.path.exists()
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "license": self.license,
+            "source": self.source,
+            "columns": self.raw_columns,
+            "connected": self.connected,
+        }
+
+    def iter_chunks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS, start_offset: int = 0,
+                    start_row: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Read the raw file in chunks and yield canonical DataFrames indexed by row number.
+        `start_offset` is a byte offset of a row boundary to resume reading from
+        (with `start_row` the number of that row).
+        """
+        if not self.connected:
+            raise FileNotFoundError(f"{self.name} dataset not found at: {self.path}")
+        with self.path.open("rb") as fh:
+            header = _header_names(fh.readline())
+            if start_offset:
+                fh.seek(start_offset)
+            reader = pd.read_csv(
+                fh,
+                names=header,
+                header=None,
+                usecols=self.raw_columns,
+                dtype=self.dtypes,
+                chunksize=chunk_rows,
+            )
+            row_offset = start_row
+            for raw in reader:
+                raw.index = pd.RangeIndex(row_offset, row_offset + len(raw))
+                row_offset += len(raw)
+                yield self.to_canonical(raw)
+
+    def to_canonical(self, raw: pd.DataFrame) -> pd.DataFrame:
+        """Rename mapped columns, add constants and derived columns, order canonically."""
+        df = raw.rename(columns=self.column_mapping)
+        for col, value in self.constants.items():
+            df[col] = value
+        df = self._derive(df, raw)
+        return df[CANONICAL_COLUMNS]
+
+    def _derive(self, df: pd.DataFrame, raw: pd.DataFrame) -> pd.DataFrame:
+        return df
+
+
+class IbmAmlAdapter(DatasetAdapter):
+    id = "ibm-aml"
+    name = "IBM AML Transactions"
+    description = "Synthetic financial transaction dataset with laundering labels (IBM Research)"
+    license = "CDLA-Sharing-1.0"
+    source = "https://www.kaggle.com/datasets/ealtman2019/ibm-transactions-for-anti-money-laundering-aml"
+    path = Path(os.getenv(
+        "NITILENS_IBM_AML_PATH", DATASETS_DIR / "ibm_aml" / "sample_transactions.csv"
+    ))
+    dtypes = {
+        "Timestamp": "str",
+        "From Bank": "int64",
+        "Account": "str",
+        "To Bank": "int64",
+        "Account.1": "str",
+        "Amount Received": "float64",
+        "Receiving Currency": "category",
+        "Amount Paid": "float64",
+        "Payment Currency": "category",
+        "Payment Format": "category",
+        "Is Laundering": "int8",
+    }
+    column_mapping = {
+        "Timestamp": "timestamp",
+        "From Bank": "from_bank",
+        "Account": "from_account",
+        "To Bank": "to_bank",
+        "Account.1": "to_account",
+        "Amount Received": "amount_received",
+        "Receiving Currency": "receiving_currency",
+        "Amount Paid": "amount_paid",
+        "Payment Currency": "payment_currency",
+        "Payment Format": "payment_format",
+        "Is Laundering": "is_laundering",
+    }
+
+    def _derive(self, df: pd.DataFrame, raw: pd.DataFrame) -> pd.DataFrame:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        return df
+
+
+class PaySimAdapter(DatasetAdapter):
+    id = "paysim"
+    name = "PaySim Mobile Money"
+    description = "6.3M synthetic mobile transactions with fraud labels (CC BY-SA 4.0)"
+    license = "CC BY-SA 4.0"
+    source = "https://www.kaggle.com/datasets/ealaxi/paysim1"
+    path = Path(os.getenv(
+        "NITILENS_PAYSIM_PATH", DATASETS_DIR / "paysim" / "PS_20174392719_1491204439457_log.csv"
+    ))
+    dtypes = {
+        "step": "int32",
+        "type": "category",
+        "amount": "float64",
+        "nameOrig": "str",
+        "oldbalanceOrg": "float64",
+        "newbalanceOrig": "float64",
+        "nameDest": "str",
+        "oldbalanceDest": "float64",
+        "newbalanceDest": "float64",
+        "isFraud": "int8",
+        "isFlaggedFraud": "int8",
+    }
+    column_mapping = {
+        "type": "payment_format",
+        "amount": "amount_paid",
+        "nameOrig": "from_account",
+        "nameDest": "to_account",
+        "isFraud": "is_laundering",
+    }
+    # PaySim has no banks or currencies; amounts are single-currency
+    constants = {
+        "from_bank": 0,
+        "to_bank": 0,
+        "payment_currency": "US Dollar",
+        "receiving_currency": "US Dollar",
+    }
+    # Each simulation step is one hour from this origin
+    epoch = pd.Timestamp("2017-01-01")
+
+    def _derive(self, df: pd.DataFrame, raw: pd.DataFrame) -> pd.DataFrame:
+        df["timestamp"] = self.epoch + pd.to_timedelta(raw["step"], unit="h")
+        df["amount_received"] = raw["amount"]
+        df["payment_format"] = raw["type"].cat.rename_categories(
+            lambda t: t.replace("_", " ").title()
+        )
+        for col in ("payment_currency", "receiving_currency"):
+            df[col] = df[col].astype("category")
+        return df
+
+
+_ADAPTERS: Dict[str, DatasetAdapter] = {}
+
+
+def register_adapter(adapter: DatasetAdapter) -> None:
+    """Make a dataset available to scans and the datasets API."""
+    _ADAPTERS[adapter.id] = adapter
+
+
+def get_adapter(dataset_id: str) -> DatasetAdapter:
+    try:
+        return _ADAPTERS[dataset_id]
+    except KeyError:
+        raise KeyError(f"Unknown dataset: {dataset_id}") from None
+
+
+def list_adapters() -> List[DatasetAdapter]:
+    return list(_ADAPTERS.values())
+
+
+register_adapter(IbmAmlAdapter())
+register_adapter(PaySimAdapter())
+
+
+# ---------------------------------------------------------------------------
+# Columnar transaction cache
+# ---------------------------------------------------------------------------
+
+_cache: Dict[str, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+def _file_signature(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_frame(dataset_id: str = "ibm-aml") -> pd.DataFrame:
+    """
+    Return the full canonical DataFrame for a dataset, with USD-normalized amount columns.
+    Cached in memory until the underlying file or the FX rate table changes;
+    treat the result as read-only. The cache signature is kept in df.attrs["signature"]
+    so derived caches can tell which build of the frame they were computed from.
+    """
+    adapter = get_adapter(dataset_id)
+    if not adapter.connected:
+        raise FileNotFoundError(f"{adapter.name} dataset not found at: {adapter.path}")
+    signature = (_file_signature(adapter.path), rates_signature())
+    with _cache_lock:
+        cached = _cache.get(dataset_id)
+        if cached and cached[0] == signature:
+            return cached[1]
+        chunks = list(adapter.iter_chunks())
+        if not chunks:
+            df = pd.DataFrame(columns=CANONICAL_COLUMNS)
+        else:
+            df = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+        for col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype("category")
+        # Both currency columns share one category set so they compare code-to-code
+        currencies = df["payment_currency"].cat.categories.union(df["receiving_currency"].cat.categories)
+        for col in ("payment_currency", "receiving_currency"):
+            df[col] = df[col].cat.set_categories(currencies)
+        df = add_usd_columns(df)
+        df.attrs["signature"] = signature
+        _cache[dataset_id] = (signature, df)
+        return df
+
+
+def frame_signature(df: pd.DataFrame) -> Optional[tuple]:
+    """The (file, FX table) signature of a frame returned by load_frame()."""
+    return df.attrs.get("signature")
+
+
+def invalidate_cache(dataset_id: Optional[str] = None) -> None:
+    with _cache_lock:
+        if dataset_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(dataset_id, None)
@@ -0,0 +1,362 @@
+"""
+GDPR deadline engine: event-driven tracking of erasure and breach-notification deadlines.
+
+Events arrive as JSON lines, either appended to a local event file
+(NITILENS_GDPR_EVENTS_PATH, default data/events/gdpr_events.jsonl) or posted to the API,
+which appends them to the same file:
+
+    {"event_id": "...", "type": "erasure_request", "subject": "user-42", "timestamp": "2024-05-01T10:00:00Z"}
+
+`erasure_request` / `breach_discovered` open a deadline (30 days / 72 hours);
+`erasure_completed` / `breach_reported` for the same subject close it. Each deadline is
+keyed on its opening event, so a subject can miss several deadlines over time; a repeat
+opening event while the subject's deadline is still open is counted and ignored. Open
+deadlines sit in a hierarchical timer wheel (5 levels x 64 one-minute slots): scheduling
+and cancelling are O(1), and each tick touches only the slot that is due, so the cost of a
+tick does not grow with the number of open deadlines. A deadline that passes emits a
+Violation.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.priority import SEVERITY_WEIGHTS
+from app.core.rule_engine import get_rules
+from app.models.violation import Violation
+
+logger = logging.getLogger("nitilens.deadlines")
+
+_BASE = Path(__file__).parent.parent.parent.parent  # project root
+EVENTS_FILE = Path(os.getenv("NITILENS_GDPR_EVENTS_PATH", _BASE / "data" / "events" / "gdpr_events.jsonl"))
+
+TICK_SECONDS = 60
+
+# Opening event type -> deadline definition (matched to extracted rules by condition)
+DEADLINE_KINDS = {
+    "erasure_request": {
+        "kind": "erasure",
+        "window": timedelta(days=30),
+        "closed_by": "erasure_completed",
+        "condition": "days_since_erasure_request <= 30",
+        "rule_id": "gdpr-erasure-deadline",
+        "description": "Personal data must be deleted within 30 days of erasure request",
+        "severity": "critical",
+    },
+    "breach_discovered": {
+        "kind": "breach",
+        "window": timedelta(hours=72),
+        "closed_by": "breach_reported",
+        "condition": "hours_since_breach_discovery <= 72",
+        "rule_id": "gdpr-breach-deadline",
+        "description": "Data breach must be reported within 72 hours of discovery",
+        "severity": "critical",
+    },
+}
+_CLOSING_EVENTS = {spec["closed_by"]: opening for opening, spec in DEADLINE_KINDS.items()}
+
+
+class TimerWheel:
+    """Hierarchical hashed timer wheel keyed by integer ticks."""
+
+    SLOT_BITS = 6
+    SLOTS = 1 << SLOT_BITS
+    LEVELS = 5
+    REBUILD_AFTER = SLOTS * SLOTS  # ticks; longer jumps re-place every timer instead
+
+    def __init__(self, current_tick: int):
+        self.current = current_tick
+        self.slots: List[List[Set[str]]] = [[set() for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+        self.timers: Dict[str, Tuple[int, int, int]] = {}  # id -> (expiry tick, level, slot)
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def _place(self, timer_id: str, expiry: int) -> None:
+        delta = max(expiry - self.current, 0)
+        level = 0
+        while level < self.LEVELS - 1 and delta >= 1 << (self.SLOT_BITS * (level + 1)):
+            level += 1
+        slot = (expiry >> (self.SLOT_BITS * level)) & (self.SLOTS - 1)
+        self.slots[level][slot].add(timer_id)
+        self.timers[timer_id] = (expiry, level, slot)
+
+    def schedule(self, timer_id: str, expiry: int) -> bool:
+        """Schedule a timer; False (and nothing scheduled) if it is already due."""
+        if expiry <= self.current:
+            return False
+        self.cancel(timer_id)
+        self._place(timer_id, expiry)
+        return True
+
+    def cancel(self, timer_id: str) -> bool:
+        entry = self.timers.pop(timer_id, None)
+        if entry is None:
+            return False
+        self.slots[entry[1]][entry[2]].discard(timer_id)
+        return True
+
+    def advance(self, to_tick: int) -> List[str]:
+        """Move the wheel to `to_tick`, returning the ids of timers that fired (in expiry order)."""
+        fired: List[str] = []
+        if to_tick <= self.current:
+            return fired
+        if not self.timers or to_tick - self.current > self.REBUILD_AFTER:
+            return self._jump(to_tick)
+        mask = self.SLOTS - 1
+        while self.current < to_tick:
+            self.current += 1
+            # Cascade higher levels whose lower digits just wrapped to zero
+            for level in range(1, self.LEVELS):
+                if self.current & ((1 << (self.SLOT_BITS * level)) - 1):
+                    break
+                bucket = self.slots[level][(self.current >> (self.SLOT_BITS * level)) & mask]
+                moving = list(bucket)
+                bucket.clear()
+                for timer_id in moving:
+                    self._place(timer_id, self.timers[timer_id][0])
+            due = self.slots[0][self.current & mask]
+            for timer_id in list(due):
+                if self.timers[timer_id][0] <= self.current:
+                    due.discard(timer_id)
+                    del self.timers[timer_id]
+                    fired.append(timer_id)
+        return fired
+
+    def _jump(self, to_tick: int) -> List[str]:
+        pending = sorted(self.timers.items(), key=lambda item: item[1][0])
+        self.current = to_tick
+        self.timers = {}
+        self.slots = [[set() for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+        fired = []
+        for timer_id, (expiry, _, _) in pending:
+            if expiry <= to_tick:
+                fired.append(timer_id)
+            else:
+                self._place(timer_id, expiry)
+        return fired
+
+
+def _to_tick(moment: datetime) -> int:
+    """Ceil to the next tick boundary so a deadline never fires early."""
+    return -(-int(moment.timestamp()) // TICK_SECONDS)
+
+
+def _parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class DeadlineEngine:
+    """Tails the event file into the timer wheel and turns expired deadlines into violations."""
+
+    def __init__(self, events_file: Path = EVENTS_FILE):
+        self.events_file = events_file
+        self.offset = 0
+        self.wheel = TimerWheel(_to_tick(datetime.now(timezone.utc)))
+        self.deadlines: Dict[str, dict] = {}  # deadline id -> open deadline
+        self.open_by_subject: Dict[str, str] = {}  # "kind:subject" -> id of its open deadline
+        self.overdue: Dict[str, dict] = {}    # open deadlines already past on arrival
+        self.emitted: Set[str] = set()
+        self.counters = {"events": 0, "invalid_events": 0, "closed": 0, "missed": 0, "repeats": 0}
+        self.last_tick: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def subject_key(opening_type: str, subject: str) -> str:
+        return f"{DEADLINE_KINDS[opening_type]['kind']}:{subject}"
+
+    @staticmethod
+    def deadline_id(kind: str, subject: str, event_id: Optional[str], opened_at: str) -> str:
+        """One id per opening event (its event_id, else its timestamp)."""
+        return f"{kind}:{subject}:{event_id or opened_at}"
+
+    def _close(self, did: str) -> dict:
+        deadline = self.deadlines.pop(did)
+        key = self.subject_key(deadline["type"], deadline["subject"])
+        if self.open_by_subject.get(key) == did:
+            del self.open_by_subject[key]
+        return deadline
+
+    def ingest(self, event: dict) -> None:
+        """
+        Apply one event. A deadline already past when its opening event arrives is held as
+        overdue until the end of the batch, so a later on-time closing event can still clear it.
+        """
+        event_type, subject = event.get("type"), event.get("subject")
+        if not subject or (event_type not in DEADLINE_KINDS and event_type not in _CLOSING_EVENTS):
+            self.counters["invalid_events"] += 1
+            return
+        try:
+            at = _parse_time(event["timestamp"])
+        except (KeyError, ValueError):
+            self.counters["invalid_events"] += 1
+            return
+        self.counters["events"] += 1
+
+        if event_type in _CLOSING_EVENTS:
+            did = self.open_by_subject.get(self.subject_key(_CLOSING_EVENTS[event_type], subject))
+            deadline = self.deadlines.get(did) if did else None
+            # A closing event after the due time does not undo the miss
+            if deadline is not None and at <= datetime.fromisoformat(deadline["due_at"]):
+                self._close(did)
+                self.overdue.pop(did, None)
+                self.wheel.cancel(did)
+                self.counters["closed"] += 1
+            return
+
+        spec = DEADLINE_KINDS[event_type]
+        key = self.subject_key(event_type, subject)
+        did = self.deadline_id(spec["kind"], subject, event.get("event_id"), at.isoformat())
+        if did in self.deadlines:
+            return  # the same event twice
+        current = self.deadlines.get(self.open_by_subject.get(key, ""))
+        # A repeat request while the deadline is open does not restart the clock; one after
+        # its due time (still pending in this batch) is a new request
+        if current is not None and at <= datetime.fromisoformat(current["due_at"]):
+            self.counters["repeats"] += 1
+            logger.info(f"Ignoring repeat {event_type} for {subject}: deadline {self.open_by_subject[key]} is open")
+            return
+        deadline = {
+            "id": did, "type": event_type, "subject": subject,
+            "event_id": event.get("event_id"), "opened_at": at.isoformat(),
+            "due_at": (at + spec["window"]).isoformat(),
+        }
+        self.deadlines[did] = deadline
+        self.open_by_subject[key] = did
+        if not self.wheel.schedule(did, _to_tick(at + spec["window"])):
+            self.overdue[did] = deadline
+
+    def _read_new_events(self) -> List[dict]:
+        """Complete lines appended to the event file since the last read."""
+        try:
+            size = self.events_file.stat().st_size
+        except OSError:
+            return []
+        if size < self.offset:
+            self.offset = 0  # file was truncated / replaced
+        if size == self.offset:
+            return []
+        with self.events_file.open("rb") as fh:
+            fh.seek(self.offset)
+            payload = fh.read(size - self.offset)
+        end = payload.rfind(b"\n") + 1  # leave a partially written last line for next time
+        self.offset += end
+        events = []
+        for line in payload[:end].splitlines():
+            if line.strip():
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    self.counters["invalid_events"] += 1
+        return events
+
+    def tick(self, now: Optional[datetime] = None) -> List[Violation]:
+        """Ingest new events and fire every deadline due by `now`."""
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            for event in self._read_new_events():
+                self.ingest(event)
+            expired = [self._close(did) for did in self.overdue]
+            self.overdue.clear()
+            for did in self.wheel.advance(_to_tick(now)):
+                expired.append(self._close(did))
+            self.last_tick = now.isoformat()
+            violations = [self._violation(d, now) for d in expired if d["id"] not in self.emitted]
+            self.emitted.update(d["id"] for d in expired)
+            self.counters["missed"] += len(violations)
+        return violations
+
+    def _violation(self, deadline: dict, now: datetime) -> Violation:
+        spec = DEADLINE_KINDS[deadline["type"]]
+        rule = next((r for r in get_rules(approved_only=True) if r.condition.strip() == spec["condition"]), None)
+        severity = rule.severity if rule else spec["severity"]
+        what = "Erasure request" if spec["kind"] == "erasure" else "Data breach"
+        closing = spec["closed_by"].replace("_", " ")
+        return Violation(
+            id=f"viol-{uuid.uuid4().hex[:8]}",
+            transaction_id=f"{spec['kind'].upper()}-{deadline['subject']}",
+            rule_id=rule.id if rule else spec["rule_id"],
+            rule_name=rule.description if rule else spec["description"],
+            severity=severity,
+            explanation=(
+                f"{what} for {deadline['subject']} opened at {deadline['opened_at']} had no "
+                f"'{closing}' event by its deadline of {deadline['due_at']}."
+            ),
+            evidence={
+                "source": "gdpr_deadline",
+                "deadline_id": deadline["id"],
+                "event_id": deadline["event_id"],
+                "subject": deadline["subject"],
+                "opened_at": deadline["opened_at"],
+                "due_at": deadline["due_at"],
+                "condition": spec["condition"],
+            },
+            status="open",
+            detected_at=now.isoformat(),
+            risk_score=SEVERITY_WEIGHTS[severity],
+        )
+
+    def status(self) -> dict:
+        with self._lock:
+            by_kind: Dict[str, int] = {}
+            for d in self.deadlines.values():
+                kind = DEADLINE_KINDS[d["type"]]["kind"]
+                by_kind[kind] = by_kind.get(kind, 0) + 1
+            next_due = min((d["due_at"] for d in self.deadlines.values()), default=None)
+            return {
+                "events_file": str(self.events_file),
+                "open_deadlines": len(self.deadlines),
+                "open_by_kind": by_kind,
+                "next_due_at": next_due,
+                "last_tick": self.last_tick,
+                **self.counters,
+            }
+
+
+_engine: Optional[DeadlineEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> DeadlineEngine:
+    """The process-wide engine; already-emitted deadlines are recovered from stored violations."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from app.core.violation_engine import load_violations
+            engine = DeadlineEngine()
+            # Recomputed from the evidence, so violations stored under older ids still match
+            engine.emitted = {
+                engine.deadline_id(v.evidence["deadline_id"].split(":", 1)[0], v.evidence["subject"],
+                                   v.evidence.get("event_id"), v.evidence["opened_at"])
+                for v in load_violations()
+                if v.evidence.get("source") == "gdpr_deadline"
+            }
+            _engine = engine
+        return _engine
+
+
+def run_deadline_tick() -> int:
+    """Advance the engine to now and persist any violations it emits. Returns how many."""
+    from app.core.violation_engine import append_violations
+    violations = get_engine().tick()
+    if violations:
+        append_violations(violations, actor="deadline_engine")
+        logger.info(f"{len(violations)} GDPR deadline(s) missed.")
+    return len(violations)
+
+
+def submit_events(events: List[dict]) -> int:
+    """Append events to the event file (the engine's single source of truth)."""
+    EVENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    lines = []
+    for event in events:
+        event = {**event, "event_id": event.get("event_id") or f"evt-{uuid.uuid4().hex[:12]}"}
+        lines.append(json.dumps(event, separators=(",", ":")) + "\n")
+    with _engine_lock, EVENTS_FILE.open("a", encoding="utf-8") as fh:
+        fh.writelines(lines)
+    return len(lines)
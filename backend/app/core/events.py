@@ -0,0 +1,201 @@
+"""
+In-process event broadcaster behind GET /api/compliance/stream (server-sent events).
+
+Publishers (scans, review actions, the deadline engine) may run on any thread. Each event
+is serialized once into an SSE frame and handed to the event loop in a single call, which
+fans the same bytes out to every subscriber's bounded queue. A subscriber whose queue is
+full (a slow client) loses events rather than slowing anyone else down; the next frame it
+receives is a `resync` event telling it to refetch state through the regular endpoints.
+Recent frames are kept for reconnecting clients that send Last-Event-ID.
+"""
+import asyncio
+import itertools
+import json
+import os
+import signal
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set
+
+QUEUE_SIZE = int(os.getenv("NITILENS_STREAM_QUEUE_SIZE", "256"))
+REPLAY_SIZE = int(os.getenv("NITILENS_STREAM_REPLAY_SIZE", "1024"))
+HEARTBEAT_SECONDS = 15.0
+# Event types whose latest payload is sent to every new subscriber
+SNAPSHOT_EVENTS = ("summary",)
+
+
+def _frame(event_id: Optional[int], event: str, data: dict) -> bytes:
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {payload}\n\n".encode()
+
+
+class Subscriber:
+    """One connected client: a bounded queue of frames plus a lag flag."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = QUEUE_SIZE):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.lagged = False
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, frame: bytes) -> None:
+        """Enqueue without waiting (runs on the subscriber's loop)."""
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.lagged = True
+            self.dropped += 1
+
+    def close(self) -> None:
+        """End the stream (runs on the subscriber's loop); wakes a waiting reader."""
+        self.closed = True
+        try:
+            self.queue.put_nowait(b"")
+        except asyncio.QueueFull:
+            pass  # the reader is not waiting; it sees `closed` on its next turn
+
+
+class Broadcaster:
+    def __init__(self, replay_size: int = REPLAY_SIZE):
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._replay: deque = deque(maxlen=replay_size)  # (event id, frame)
+        self._snapshots: Dict[str, bytes] = {}
+        self.published = 0
+
+    def publish(self, event: str, data: dict) -> int:
+        """Serialize once and fan out to all subscribers; safe to call from any thread."""
+        data = {**data, "at": datetime.now(timezone.utc).isoformat()}
+        with self._lock:
+            event_id = next(self._ids)
+            frame = _frame(event_id, event, data)
+            self._replay.append((event_id, frame))
+            if event in SNAPSHOT_EVENTS:
+                self._snapshots[event] = frame
+            self.published += 1
+            by_loop: Dict[asyncio.AbstractEventLoop, List[Subscriber]] = {}
+            for sub in self._subscribers:
+                by_loop.setdefault(sub.loop, []).append(sub)
+        for loop, subs in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_fan_out, subs, frame)
+            except RuntimeError:  # loop closed: its subscribers are gone
+                with self._lock:
+                    self._subscribers.difference_update(subs)
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscriber:
+        """
+        Register a subscriber on the running loop. It first receives missed events after
+        `last_event_id` (or a resync if they have aged out), else the latest snapshots.
+        """
+        sub = Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id is not None:
+                oldest = self._replay[0][0] if self._replay else None
+                if oldest is not None and last_event_id + 1 < oldest:
+                    sub.lagged = True  # missed events have aged out of the replay buffer
+                else:
+                    for event_id, frame in self._replay:
+                        if event_id > last_event_id:
+                            sub.offer(frame)
+            else:
+                for frame in self._snapshots.values():
+                    sub.offer(frame)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def close_all(self) -> None:
+        """End every open stream, e.g. at shutdown (clients reconnect with Last-Event-ID)."""
+        with self._lock:
+            subs = list(self._subscribers)
+            self._subscribers.clear()
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.close)
+            except RuntimeError:
+                pass
+
+    def status(self) -> dict:
+        with self._lock:
+            subs = list(self._subscribers)
+        return {
+            "subscribers": len(subs),
+            "published": self.published,
+            "lagging": sum(1 for s in subs if s.lagged),
+            "dropped": sum(s.dropped for s in subs),
+        }
+
+
+def _fan_out(subs: List[Subscriber], frame: bytes) -> None:
+    for sub in subs:
+        sub.offer(frame)
+
+
+async def stream(sub: Subscriber, broadcaster: "Broadcaster"):
+    """Async generator of SSE bytes for one subscriber, with heartbeats and resyncs."""
+    try:
+        yield f"retry: 3000\n: connected, {broadcaster.status()['subscribers']} subscriber(s)\n\n".encode()
+        while not sub.closed:
+            if sub.lagged:
+                sub.lagged = False
+                # Drop what is queued: the client refetches everything anyway
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                yield _frame(None, "resync", {"reason": "client fell behind", "dropped": sub.dropped})
+                continue
+            try:
+                frame = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if frame:
+                yield frame
+    finally:
+        broadcaster.unsubscribe(sub)
+
+
+broadcaster = Broadcaster()
+
+
+def close_streams_on_exit() -> None:
+    """
+    Close open streams when the server is asked to stop (SIGINT / SIGTERM), chaining to
+    the server's own handlers. Open streams would otherwise hold up a graceful shutdown,
+    which waits for every response to finish. No-op outside the main thread.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+
+        def handler(sig, frame, previous=previous):
+            broadcaster.close_all()
+            if callable(previous):
+                previous(sig, frame)
+
+        signal.signal(signum, handler)
+
+
+def publish(event: str, data: dict) -> None:
+    """Publish on the process-wide broadcaster."""
+    broadcaster.publish(event, data)
+
+
+def summary_counters(violations) -> dict:
+    """Compact dashboard counters over a violation list (the `summary` event payload)."""
+    by_status = {"open": 0, "reviewed": 0, "resolved": 0, "false_positive": 0}
+    open_by_severity = {"critical": 0, "high": 0, "medium": 0, "low": 0}
+    for v in violations:
+        by_status[v.status] = by_status.get(v.status, 0) + 1
+        if v.status == "open":
+            open_by_severity[v.severity] = open_by_severity.get(v.severity, 0) + 1
+    return {"total_violations": len(violations), "by_status": by_status, "open_by_severity": open_by_severity}
@@ -0,0 +1,269 @@
+"""
+Columnar exports for notebooks: the violation store and the flagged transaction rows,
+as Arrow IPC streams or Parquet files.
+
+Flagged rows are cut straight from the cached canonical frame (see dataset_adapters):
+the date range is applied to the frame first, only the selected rules are evaluated,
+and only on that slice, and the matching rows go to Arrow column by column with a
+`rule_ids` list column built from the rule masks. Nothing is turned into per-row Python
+objects. Windowed custom conditions (count(...)) need each row's history, so those are
+evaluated over the full frame and then cut to the range.
+
+pyarrow is optional; without it the export functions raise ExportUnavailable.
+"""
+import json
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.dataset_adapters import load_frame
+from app.core.feature_store import get_feature_store
+from app.core.rule_conditions import ConditionError, is_row_local, parse_condition
+from app.core.rule_engine import get_rules
+from app.core.violation_engine import BUILTIN_RULES, VIOLATIONS_FILE, make_txn_id, rule_mask
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+BATCH_ROWS = 65_536  # rows per Arrow record batch / Parquet row group
+
+
+class ExportUnavailable(RuntimeError):
+    """pyarrow is not installed."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportUnavailable("Arrow/Parquet export requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what the writer produced since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def write_table(table, fmt: str) -> Iterator[bytes]:
+    """Serialize a pyarrow Table as an Arrow IPC stream or Parquet file, batch by batch."""
+    pa = _pyarrow()
+    sink = _ChunkSink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, table.schema)
+    elif fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, table.schema, compression="zstd")
+    else:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    for batch in table.to_batches(max_chunksize=BATCH_ROWS):
+        if fmt == "arrow":
+            writer.write_batch(batch)
+        else:
+            writer.write_table(pa.Table.from_batches([batch], schema=table.schema))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield sink.drain()
+
+
+# ---------------------------------------------------------------------------
+# Flagged transactions
+# ---------------------------------------------------------------------------
+
+def _select_rules(rule_ids: Optional[Sequence[str]], severities: Optional[Sequence[str]]):
+    rules = get_rules(approved_only=True)
+    if rule_ids:
+        unknown = set(rule_ids) - {r.id for r in rules}
+        if unknown:
+            raise KeyError(f"Unknown or unapproved rule(s): {', '.join(sorted(unknown))}")
+        rules = [r for r in rules if r.id in set(rule_ids)]
+    if severities:
+        rules = [r for r in rules if r.severity in set(severities)]
+    return rules
+
+
+def _needs_history(rule) -> bool:
+    """Windowed custom conditions look at other rows; builtins and row-local ones do not."""
+    if rule.id in BUILTIN_RULES or not rule.condition:
+        return False  # aml-002's pair counts come from the feature store, not the slice
+    try:
+        return not is_row_local(parse_condition(rule.condition))
+    except Exception:
+        return False  # rule_mask reports the bad condition
+
+
+def _naive_utc(moment: Optional[datetime]) -> Optional[pd.Timestamp]:
+    """A query bound as a naive UTC timestamp, comparable with the dataset's naive timestamps."""
+    if moment is None:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return pd.Timestamp(moment)
+
+
+def _date_mask(timestamps: pd.Series, date_from: Optional[datetime], date_to: Optional[datetime]) -> np.ndarray:
+    mask = np.ones(len(timestamps), dtype=bool)
+    lower, upper = _naive_utc(date_from), _naive_utc(date_to)
+    if lower is not None:
+        mask &= (timestamps >= lower).to_numpy()
+    if upper is not None:
+        mask &= (timestamps <= upper).to_numpy()
+    return mask
+
+
+def flagged_table(dataset_id: str, rule_ids: Optional[Sequence[str]] = None,
+                  severities: Optional[Sequence[str]] = None, date_from: Optional[datetime] = None,
+                  date_to: Optional[datetime] = None, transaction_ids: bool = False):
+    """
+    pyarrow Table of the rows the selected approved rules flag, in dataset order: the
+    canonical columns plus row_number, rule_ids (list of matching rules) and optionally
+    the transaction_id used by violations (computed per row, so off by default).
+    """
+    pa = _pyarrow()
+    rules = _select_rules(rule_ids, severities)
+    df = load_frame(dataset_id)
+    features = get_feature_store(dataset_id, frame=df)
+
+    in_range = None
+    subset = df
+    if date_from is not None or date_to is not None:
+        in_range = _date_mask(df["timestamp"], date_from, date_to)
+        subset = df[in_range]
+
+    hits = np.zeros((len(subset), len(rules)), dtype=bool)
+    for j, rule in enumerate(rules):
+        try:
+            if _needs_history(rule) and in_range is not None:
+                hits[:, j] = rule_mask(rule.id, df, rule.condition, features)[0].to_numpy()[in_range]
+            else:
+                hits[:, j] = rule_mask(rule.id, subset, rule.condition, features)[0].to_numpy()
+        except ConditionError:
+            pass  # as in a scan, a rule whose condition cannot be evaluated flags nothing
+
+    flagged = hits.any(axis=1)
+    rows = subset[flagged]
+    hits = hits[flagged]
+
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    table = table.append_column("row_number", pa.array(rows.index.to_numpy(), type=pa.int64()))
+    # Rule ids per row as one list column: offsets from the per-row hit counts
+    offsets = np.concatenate([[0], np.cumsum(hits.sum(axis=1))]).astype(np.int32)
+    names = pa.array([rule.id for rule in rules], type=pa.string())
+    values = names.take(pa.array(np.nonzero(hits)[1], type=pa.int32()))
+    table = table.append_column("rule_ids", pa.ListArray.from_arrays(pa.array(offsets), values))
+    if transaction_ids:
+        table = table.append_column("transaction_id", pa.array(
+            [make_txn_id(row) for row in _id_rows(rows)], type=pa.string()))
+    return table.replace_schema_metadata({
+        "dataset": dataset_id,
+        "rules": json.dumps([rule.id for rule in rules]),
+        "date_from": str(date_from or ""),
+        "date_to": str(date_to or ""),
+    })
+
+
+def _id_rows(rows: pd.DataFrame) -> Iterable[dict]:
+    """The fields make_txn_id reads, as light dicts rather than per-row Series."""
+    columns = ("timestamp", "from_account", "to_account", "amount_paid")
+    for values in zip(*(rows[c].tolist() for c in columns)):
+        yield dict(zip(columns, values))
+
+
+# ---------------------------------------------------------------------------
+# Violation store
+# ---------------------------------------------------------------------------
+
+_EVIDENCE_COLUMNS = ("dataset", "row_number", "from_account", "to_account", "amount_paid_usd",
+                     "payment_currency", "payment_format")
+
+
+def violations_table(rule_ids: Optional[Sequence[str]] = None, severities: Optional[Sequence[str]] = None,
+                     statuses: Optional[Sequence[str]] = None, date_from: Optional[datetime] = None,
+                     date_to: Optional[datetime] = None):
+    """
+    pyarrow Table of the stored violations matching the filters (dates apply to the
+    transaction timestamp). Read from the raw store without building Violation models;
+    the full evidence is kept as a JSON string column.
+    """
+    pa = _pyarrow()
+    try:
+        records = json.loads(VIOLATIONS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        records = []
+
+    lower, upper = _naive_utc(date_from), _naive_utc(date_to)
+    rule_ids, severities, statuses = (set(x) if x else None for x in (rule_ids, severities, statuses))
+    selected = []
+    for v in records:
+        if rule_ids and v["rule_id"] not in rule_ids:
+            continue
+        if severities and v["severity"] not in severities:
+            continue
+        if statuses and v.get("status") not in statuses:
+            continue
+        if lower is not None or upper is not None:
+            ts = pd.to_datetime(v["evidence"].get("timestamp"), errors="coerce")
+            if not pd.isna(ts) and ts.tzinfo is not None:
+                ts = ts.tz_convert(None)
+            if pd.isna(ts) or (lower is not None and ts < lower) or (upper is not None and ts > upper):
+                continue
+        selected.append(v)
+
+    evidence = [v["evidence"] for v in selected]
+    columns = {
+        "id": pa.array([v["id"] for v in selected], pa.string()),
+        "transaction_id": pa.array([v["transaction_id"] for v in selected], pa.string()),
+        "rule_id": pa.array([v["rule_id"] for v in selected], pa.string()).dictionary_encode(),
+        "rule_name": pa.array([v["rule_name"] for v in selected], pa.string()).dictionary_encode(),
+        "severity": pa.array([v["severity"] for v in selected], pa.string()).dictionary_encode(),
+        "status": pa.array([v.get("status", "open") for v in selected], pa.string()).dictionary_encode(),
+        "risk_score": pa.array([v.get("risk_score") for v in selected], pa.float64()),
+        "case_id": pa.array([v.get("case_id") for v in selected], pa.string()),
+        "detected_at": pa.array(pd.to_datetime([v["detected_at"] for v in selected], utc=True,
+                                               format="ISO8601", errors="coerce"), pa.timestamp("us", "UTC")),
+        "reviewed_at": pa.array(pd.to_datetime([v.get("reviewed_at") for v in selected], utc=True,
+                                               format="ISO8601", errors="coerce"), pa.timestamp("us", "UTC")),
+        "reviewer_comment": pa.array([v.get("reviewer_comment") for v in selected], pa.string()),
+        "explanation": pa.array([v["explanation"] for v in selected], pa.string()),
+        "timestamp": pa.array(pd.to_datetime([e.get("timestamp") for e in evidence], errors="coerce"),
+                              pa.timestamp("us")),
+    }
+    for name in _EVIDENCE_COLUMNS:
+        values = [e.get(name) for e in evidence]
+        kind = pa.int64() if name == "row_number" else pa.float64() if name.endswith("_usd") else pa.string()
+        columns[name] = pa.array(values, kind)
+    columns["evidence"] = pa.array([json.dumps(e, default=str) for e in evidence], pa.string())
+    return pa.table(columns)
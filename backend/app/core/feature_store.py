@@ -0,0 +1,339 @@
+"""
+Per-account feature store: materialized aggregates shared by rules and the dashboard.
+
+Accounts are interned to dense integer IDs; every feature is a numpy column indexed by
+that ID, and (sender, receiver) pair aggregates are kept as a sorted int64 key array.
+Tables are persisted per dataset as storage/features/<dataset_id>.npz and updated
+incrementally: when the source file only grew, just the appended bytes are folded in.
+
+Rolling activity is kept as exponentially decayed counters anchored at each account's
+last sent transaction (time constants of 1 and 7 days), which merge exactly across
+updates without retaining individual transactions.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.dataset_adapters import get_adapter
+from app.core.fx import add_usd_columns, rates_signature
+
+FEATURES_DIR = Path(__file__).parent.parent / "storage" / "features"
+
+DECAY_WINDOWS = {"1d": 86_400, "7d": 7 * 86_400}
+_NEVER = np.iinfo(np.int64).min
+_TAIL_BYTES = 4096
+
+ACCOUNT_FEATURES = (
+    "sent_count", "sent_usd", "received_count", "received_usd", "first_seen", "last_seen",
+    "last_sent", "currency_mask",
+    *(f"decayed_count_{w}" for w in DECAY_WINDOWS), *(f"decayed_sent_usd_{w}" for w in DECAY_WINDOWS),
+)
+PAIR_FEATURES = ("pair_keys", "pair_count", "pair_usd", "pair_last_seen")
+
+
+class FeatureTable:
+    """Columnar per-account and per-pair aggregates for one dataset."""
+
+    def __init__(self):
+        self.accounts = pd.Index([], dtype=object)
+        self.currencies: List[str] = []  # bit i of currency_mask = currencies[i]
+        self.columns: Dict[str, np.ndarray] = {}
+        self.pairs: Dict[str, np.ndarray] = {
+            "pair_keys": np.empty(0, np.int64), "pair_count": np.empty(0, np.int64),
+            "pair_usd": np.empty(0, np.float64), "pair_last_seen": np.empty(0, np.int64),
+        }
+        self._resize(0)
+
+    def __len__(self) -> int:
+        return len(self.accounts)
+
+    # -- interning ----------------------------------------------------------
+
+    def _resize(self, n: int) -> None:
+        for name in ACCOUNT_FEATURES:
+            old = self.columns.get(name)
+            dtype = np.uint64 if name == "currency_mask" else \
+                np.float64 if "usd" in name or name.startswith("decayed") else np.int64
+            fill = _NEVER if name in ("last_seen", "last_sent") else \
+                np.iinfo(np.int64).max if name == "first_seen" else 0
+            column = np.full(n, fill, dtype=dtype)
+            if old is not None:
+                column[:len(old)] = old
+            self.columns[name] = column
+
+    def _intern(self, values: pd.Series) -> np.ndarray:
+        """Dense account IDs for a column of account strings, registering new accounts."""
+        codes, uniques = pd.factorize(values.astype(str), sort=False)
+        ids = self.accounts.get_indexer(uniques)
+        new = ids < 0
+        if new.any():
+            ids[new] = np.arange(len(self.accounts), len(self.accounts) + int(new.sum()))
+            self.accounts = self.accounts.append(pd.Index(uniques[new], dtype=object))
+            self._resize(len(self.accounts))
+        return ids[codes].astype(np.int64)
+
+    def _currency_bits(self, values: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(values.astype(str), sort=False)
+        bits = []
+        for name in uniques:
+            if name not in self.currencies:
+                if len(self.currencies) == 64:
+                    bits.append(0)  # beyond the mask width; not tracked
+                    continue
+                self.currencies.append(name)
+            bits.append(1 << self.currencies.index(name))
+        return np.array(bits, dtype=np.uint64)[codes]
+
+    # -- updates ------------------------------------------------------------
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold a canonical chunk (with USD columns) into the table."""
+        if df.empty:
+            return
+        senders = self._intern(df["from_account"])
+        receivers = self._intern(df["to_account"])
+        n = len(self.accounts)
+        c = self.columns
+        seconds = pd.to_datetime(df["timestamp"]).to_numpy("datetime64[s]").astype(np.int64)
+        sent_usd = np.nan_to_num(df["amount_paid_usd"].to_numpy(np.float64), nan=0.0)
+        received_usd = np.nan_to_num(df["amount_received_usd"].to_numpy(np.float64), nan=0.0)
+
+        c["sent_count"] += np.bincount(senders, minlength=n)
+        c["sent_usd"] += np.bincount(senders, weights=sent_usd, minlength=n)
+        c["received_count"] += np.bincount(receivers, minlength=n)
+        c["received_usd"] += np.bincount(receivers, weights=received_usd, minlength=n)
+
+        both = np.concatenate([senders, receivers])
+        both_seconds = np.concatenate([seconds, seconds])
+        seen = pd.Series(both_seconds).groupby(both).agg(["min", "max"])
+        ids = seen.index.to_numpy()
+        c["first_seen"][ids] = np.minimum(c["first_seen"][ids], seen["min"].to_numpy())
+        c["last_seen"][ids] = np.maximum(c["last_seen"][ids], seen["max"].to_numpy())
+
+        # Currencies used (paid or received), OR-ed per account over unique (account, bit) pairs
+        bits = np.concatenate([self._currency_bits(df["payment_currency"]),
+                               self._currency_bits(df["receiving_currency"])])
+        uniq = pd.DataFrame({"id": both, "bit": bits}).drop_duplicates()
+        np.bitwise_or.at(c["currency_mask"], uniq["id"].to_numpy(), uniq["bit"].to_numpy(np.uint64))
+
+        self._update_decayed(senders, seconds, sent_usd)
+        self._update_pairs(senders, receivers, seconds, sent_usd)
+
+    def _update_decayed(self, senders: np.ndarray, seconds: np.ndarray, usd: np.ndarray) -> None:
+        c = self.columns
+        n = len(self.accounts)
+        chunk_last = pd.Series(seconds).groupby(senders).max()
+        ids = chunk_last.index.to_numpy()
+        old_last = c["last_sent"][ids]
+        new_last = np.maximum(old_last, chunk_last.to_numpy())
+        anchor = np.full(n, _NEVER, dtype=np.int64)
+        anchor[ids] = new_last
+        had_activity = old_last != _NEVER
+        elapsed = np.where(had_activity, new_last - np.where(had_activity, old_last, 0), 0)
+        for window, tau in DECAY_WINDOWS.items():
+            weights = np.exp(-(anchor[senders] - seconds) / tau)
+            for prefix, values in (("decayed_count_", weights), ("decayed_sent_usd_", weights * usd)):
+                column = c[prefix + window]
+                carried = np.where(had_activity, column[ids] * np.exp(-elapsed / tau), 0.0)
+                column[ids] = carried + np.bincount(senders, weights=values, minlength=n)[ids]
+        c["last_sent"][ids] = new_last
+
+    def _update_pairs(self, senders: np.ndarray, receivers: np.ndarray,
+                      seconds: np.ndarray, usd: np.ndarray) -> None:
+        p = self.pairs
+        keys = np.concatenate([p["pair_keys"], (senders << 32) | receivers])
+        counts = np.concatenate([p["pair_count"], np.ones(len(senders), np.int64)])
+        amounts = np.concatenate([p["pair_usd"], usd])
+        last = np.concatenate([p["pair_last_seen"], seconds])
+        merged, inverse = np.unique(keys, return_inverse=True)
+        p["pair_keys"] = merged
+        p["pair_count"] = np.bincount(inverse, weights=counts, minlength=len(merged)).astype(np.int64)
+        p["pair_usd"] = np.bincount(inverse, weights=amounts, minlength=len(merged))
+        latest = np.full(len(merged), _NEVER, dtype=np.int64)
+        np.maximum.at(latest, inverse, last)
+        p["pair_last_seen"] = latest
+
+    # -- reads --------------------------------------------------------------
+
+    def account_ids(self, values: pd.Series) -> np.ndarray:
+        """IDs for a column of account strings; -1 where the account is unknown."""
+        codes, uniques = pd.factorize(values.astype(str), sort=False)
+        return self.accounts.get_indexer(uniques)[codes]
+
+    def pair_counts(self, df: pd.DataFrame) -> pd.Series:
+        """Transfers from each row's sender to its receiver, aligned to df."""
+        senders = self.account_ids(df["from_account"]).astype(np.int64)
+        receivers = self.account_ids(df["to_account"]).astype(np.int64)
+        table = self.pairs["pair_keys"]
+        counts = np.zeros(len(df), dtype=np.int64)
+        if len(table):
+            # Look up each distinct pair once; sorted queries keep the binary search cache-friendly
+            keys, inverse = np.unique((senders << 32) | receivers, return_inverse=True)
+            pos = np.minimum(np.searchsorted(table, keys), len(table) - 1)
+            found = np.where(table[pos] == keys, self.pairs["pair_count"][pos], 0)[inverse]
+            counts = np.where((senders >= 0) & (receivers >= 0), found, 0)
+        return pd.Series(counts, index=df.index)
+
+    def distinct_counterparties(self) -> np.ndarray:
+        return np.bincount(self.pairs["pair_keys"] >> 32, minlength=len(self.accounts))
+
+    def _row(self, account_id: int, as_of: Optional[int], counterparties: np.ndarray) -> dict:
+        c = self.columns
+        mask = int(c["currency_mask"][account_id])
+        last_sent = int(c["last_sent"][account_id])
+        row = {
+            "account": str(self.accounts[account_id]),
+            "sent_count": int(c["sent_count"][account_id]),
+            "sent_usd": round(float(c["sent_usd"][account_id]), 2),
+            "received_count": int(c["received_count"][account_id]),
+            "received_usd": round(float(c["received_usd"][account_id]), 2),
+            "distinct_counterparties": int(counterparties[account_id]),
+            "currencies": [name for i, name in enumerate(self.currencies) if mask >> i & 1],
+            "first_seen": _iso(c["first_seen"][account_id]),
+            "last_seen": _iso(c["last_seen"][account_id]),
+        }
+        for window, tau in DECAY_WINDOWS.items():
+            # Decay from the last sent transaction to the as-of time (the dataset's latest activity)
+            factor = np.exp(-max(as_of - last_sent, 0) / tau) if last_sent != _NEVER and as_of else 0.0
+            row[f"activity_{window}"] = round(float(c[f"decayed_count_{window}"][account_id] * factor), 4)
+            row[f"sent_usd_{window}"] = round(float(c[f"decayed_sent_usd_{window}"][account_id] * factor), 2)
+        return row
+
+    def as_of(self) -> Optional[int]:
+        last = self.columns["last_seen"]
+        return int(last.max()) if len(last) else None
+
+    def account(self, account: str) -> Optional[dict]:
+        account_id = self.accounts.get_indexer([account])[0]
+        if account_id < 0:
+            return None
+        return self._row(account_id, self.as_of(), self.distinct_counterparties())
+
+    def top_accounts(self, by: str, limit: int) -> List[dict]:
+        counterparties = self.distinct_counterparties()
+        values = counterparties if by == "distinct_counterparties" else self.columns[by]
+        limit = min(limit, len(values))
+        if not limit:
+            return []
+        top = np.argpartition(-values.astype(np.float64), limit - 1)[:limit]
+        top = top[np.argsort(-values[top].astype(np.float64), kind="stable")]
+        as_of = self.as_of()
+        return [self._row(int(i), as_of, counterparties) for i in top]
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, path: Path, meta: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(
+            tmp,
+            accounts=self.accounts.to_numpy(dtype=str),
+            currencies=np.array(self.currencies, dtype=str),
+            meta=np.array(json.dumps(meta)),
+            **self.columns,
+            **self.pairs,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple["FeatureTable", dict]:
+        with np.load(path, allow_pickle=False) as data:
+            table = cls()
+            table.accounts = pd.Index(data["accounts"].astype(object))
+            table.currencies = data["currencies"].tolist()
+            table.columns = {name: data[name] for name in ACCOUNT_FEATURES}
+            table.pairs = {name: data[name] for name in PAIR_FEATURES}
+            return table, json.loads(str(data["meta"]))
+
+
+def _iso(seconds: int) -> Optional[str]:
+    if seconds in (_NEVER, np.iinfo(np.int64).max):
+        return None
+    return pd.Timestamp(int(seconds), unit="s").isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Per-dataset stores
+# ---------------------------------------------------------------------------
+
+_stores: Dict[str, Tuple[dict, FeatureTable]] = {}
+_lock = threading.Lock()
+
+
+def _store_path(dataset_id: str) -> Path:
+    return FEATURES_DIR / f"{dataset_id}.npz"
+
+
+def _meta(path: Path, rows: int) -> dict:
+    stat = path.stat()
+    with path.open("rb") as fh:
+        fh.seek(max(stat.st_size - _TAIL_BYTES, 0))
+        tail = fh.read()
+    return {
+        "path": str(path.resolve()), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+        "rows": rows, "fx": list(rates_signature() or []),
+        "tail_digest": hashlib.sha1(tail).hexdigest(), "ends_with_newline": tail.endswith(b"\n"),
+    }
+
+
+def _appended_only(path: Path, meta: dict) -> bool:
+    """The file is the one the table was built from, with whole rows appended after it."""
+    stat = path.stat()
+    if meta["path"] != str(path.resolve()) or stat.st_size <= meta["size"] \
+            or not meta["ends_with_newline"] or meta["fx"] != list(rates_signature() or []):
+        return False
+    with path.open("rb") as fh:
+        fh.seek(max(meta["size"] - _TAIL_BYTES, 0))
+        return hashlib.sha1(fh.read(min(meta["size"], _TAIL_BYTES))).hexdigest() == meta["tail_digest"]
+
+
+def get_feature_store(dataset_id: str, frame: Optional[pd.DataFrame] = None) -> FeatureTable:
+    """
+    The feature table for a dataset, brought up to date with its file. A full rebuild uses
+    `frame` (an already loaded canonical frame of the current file) when one is given.
+    """
+    adapter = get_adapter(dataset_id)
+    if not adapter.connected:
+        raise FileNotFoundError(f"{adapter.name} dataset not found at: {adapter.path}")
+    path = _store_path(dataset_id)
+    with _lock:
+        entry = _stores.get(dataset_id)
+        if entry is None:
+            try:
+                table, meta = FeatureTable.load(path)
+                entry = (meta, table)
+            except Exception:
+                entry = None
+        stat = adapter.path.stat()
+        if entry and entry[0]["path"] == str(adapter.path.resolve()) and entry[0]["size"] == stat.st_size \
+                and entry[0]["mtime_ns"] == stat.st_mtime_ns and entry[0]["fx"] == list(rates_signature() or []):
+            _stores[dataset_id] = entry
+            return entry[1]
+
+        if entry and _appended_only(adapter.path, entry[0]):
+            meta, table = entry
+            rows = meta["rows"]
+            for chunk in adapter.iter_chunks(start_offset=meta["size"], start_row=rows):
+                table.update(add_usd_columns(chunk))
+                rows += len(chunk)
+        elif frame is not None:
+            table = FeatureTable()
+            table.update(frame)
+            rows = len(frame)
+        else:
+            table, rows = FeatureTable(), 0
+            for chunk in adapter.iter_chunks():
+                table.update(add_usd_columns(chunk))
+                rows += len(chunk)
+        meta = _meta(adapter.path, rows)
+        try:
+            table.save(path, meta)
+        except OSError:
+            pass  # read-only storage: keep the in-memory table
+        _stores[dataset_id] = (meta, table)
+        return table
@@ -0,0 +1,130 @@
+"""
+FX normalization: converts transaction amounts to USD so thresholds compare like with like.
+
+Rates come from a local, versioned table (data/fx/usd_rates.csv) with one row per
+(effective_date, currency). The table is pivoted into a dense [date bucket x currency]
+matrix, forward-filled, and joined to transactions through their categorical currency
+codes — one flat integer-indexed lookup per row.
+
+Amounts in a currency the table does not cover cannot be converted. They are left NaN
+(never guessed), and counted per column in the frame's attrs["fx_unconverted"] so scans
+can report rows that USD thresholds could not be applied to.
+"""
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("nitilens.fx")
+
+_BASE = Path(__file__).parent.parent.parent.parent  # project root
+RATES_FILE = Path(os.getenv("NITILENS_FX_RATES_PATH", _BASE / "data" / "fx" / "usd_rates.csv"))
+
+# Bucket rates by transaction timestamp; when off, the latest rate per currency is used
+TIME_BUCKETED = os.getenv("NITILENS_FX_TIME_BUCKETED", "1") != "0"
+
+_table: Optional[dict] = None
+_lock = threading.Lock()
+
+
+def rates_signature() -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of the rate table, or None if it is missing."""
+    try:
+        stat = RATES_FILE.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_rate_table() -> dict:
+    """Load the rate table as {version, dates, currencies, matrix}; cached until the file changes."""
+    global _table
+    signature = rates_signature()
+    with _lock:
+        if _table is not None and _table["signature"] == signature:
+            return _table
+        if signature is None:
+            raise FileNotFoundError(f"FX rate table not found at: {RATES_FILE}")
+        raw = pd.read_csv(RATES_FILE, parse_dates=["effective_date"])
+        wide = (
+            raw.pivot_table(index="effective_date", columns="currency",
+                            values="usd_per_unit", aggfunc="last")
+            .sort_index()
+            .ffill()
+        )
+        _table = {
+            "signature": signature,
+            "version": str(raw["version"].iloc[-1]) if len(raw) else "empty",
+            "dates": wide.index.to_numpy(dtype="datetime64[ns]"),
+            "currencies": pd.Index(wide.columns),
+            "matrix": wide.to_numpy(dtype=np.float64),
+        }
+        return _table
+
+
+def _rates_for(currency: pd.Series, buckets: np.ndarray, table: dict) -> np.ndarray:
+    """USD rate per row: categorical code -> table column, then one flat lookup."""
+    if not table["matrix"].size:
+        return np.full(len(currency), np.nan)
+    categorical = currency.astype("category")
+    # Map each category (not each row) to its column in the rate matrix; -1 = unknown
+    category_cols = table["currencies"].get_indexer(categorical.cat.categories)
+    codes = categorical.cat.codes.to_numpy()
+    cols = np.where(codes >= 0, category_cols[codes], -1)
+
+    n_cols = table["matrix"].shape[1]
+    flat = np.append(table["matrix"].ravel(), np.nan)  # trailing NaN for unknown currency
+    idx = np.where(cols >= 0, buckets * n_cols + cols, len(flat) - 1)
+    return flat[idx]
+
+
+def add_usd_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add amount_paid_usd / amount_received_usd to a canonical frame.
+    Amounts in currencies missing from the table become NaN (and so never breach a
+    threshold); they are counted per column and currency in df.attrs["fx_unconverted"].
+    """
+    table = get_rate_table()
+    n_dates = len(table["dates"])
+    if TIME_BUCKETED and n_dates > 1:
+        stamps = pd.to_datetime(df["timestamp"]).to_numpy(dtype="datetime64[ns]")
+        buckets = np.clip(np.searchsorted(table["dates"], stamps, side="right") - 1, 0, n_dates - 1)
+    else:
+        buckets = np.full(len(df), n_dates - 1, dtype=np.int64)
+
+    unconverted = {"amount_paid": 0, "amount_received": 0, "currencies": {}}
+    for amount, currency in (("amount_paid", "payment_currency"), ("amount_received", "receiving_currency")):
+        rates = _rates_for(df[currency], buckets, table)
+        missing = np.isnan(rates)
+        if missing.any():
+            unconverted[amount] = int(missing.sum())
+            for name, count in df[currency][missing].astype(str).value_counts().items():
+                unconverted["currencies"][name] = unconverted["currencies"].get(name, 0) + int(count)
+        df[f"{amount}_usd"] = df[amount].to_numpy(dtype=np.float64) * rates
+    df.attrs["fx_version"] = table["version"]
+    df.attrs["fx_unconverted"] = unconverted
+    return df
+
+
+def merge_unconverted(total: Dict, part: Dict) -> Dict:
+    """Add one frame's fx_unconverted counts to a running total (for chunked loads)."""
+    for key in ("amount_paid", "amount_received"):
+        total[key] = total.get(key, 0) + part.get(key, 0)
+    currencies = total.setdefault("currencies", {})
+    for name, count in part.get("currencies", {}).items():
+        currencies[name] = currencies.get(name, 0) + count
+    return total
+
+
+def log_unconverted(dataset_id: str, unconverted: Optional[Dict]) -> None:
+    """Warn when a scanned dataset has amounts that could not be converted to USD."""
+    if unconverted and (unconverted.get("amount_paid") or unconverted.get("amount_received")):
+        logger.warning(
+            f"{dataset_id}: {unconverted['amount_paid']:,} paid / {unconverted['amount_received']:,} "
+            f"received amount(s) have no USD rate (currencies: "
+            f"{', '.join(sorted(unconverted.get('currencies', {})))}); USD thresholds cannot flag them."
+        )
@@ -0,0 +1,133 @@
+"""
+GDPR article search: a BM25-ranked inverted index over data/gdpr_text.csv.
+The index is built once, persisted to storage and reused until the corpus changes.
+"""
+import csv
+import heapq
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_BASE = Path(__file__).parent.parent.parent.parent  # project root
+CORPUS_FILE = _BASE / "data" / "gdpr_text.csv"
+INDEX_FILE = Path(__file__).parent.parent / "storage" / "gdpr_index.json"
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or such that the this "
+    "to was were which with shall may any other where referred paragraph article".split()
+)
+
+_index: Optional[dict] = None
+_lock = threading.Lock()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens with stopwords removed."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _corpus_signature() -> List[int]:
+    stat = CORPUS_FILE.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _build_index() -> dict:
+    """Read the corpus and build postings: term -> [[doc_id, term_frequency], ...]."""
+    docs = []
+    postings: Dict[str, List[List[int]]] = {}
+    with CORPUS_FILE.open(encoding="utf-8", newline="") as fh:
+        for row in csv.DictReader(fh):
+            doc_id = len(docs)
+            terms = Counter(tokenize(f"{row['article_title']} {row['gdpr_text']}"))
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append([doc_id, tf])
+            docs.append({
+                "article": int(row["article"]),
+                "article_title": row["article_title"],
+                "sub_article": row["sub_article"],
+                "chapter": int(row["chapter"]),
+                "chapter_title": row["chapter_title"],
+                "text": row["gdpr_text"],
+                "href": row["href"],
+                "length": sum(terms.values()),
+            })
+    return {
+        "signature": _corpus_signature(),
+        "avg_length": sum(d["length"] for d in docs) / max(len(docs), 1),
+        "docs": docs,
+        "postings": postings,
+    }
+
+
+def get_index() -> dict:
+    """Return the in-memory index, loading or rebuilding the persisted copy as needed."""
+    global _index
+    with _lock:
+        if _index is not None:
+            return _index
+        signature = _corpus_signature()
+        try:
+            persisted = json.loads(INDEX_FILE.read_text(encoding="utf-8"))
+            if persisted.get("signature") == signature:
+                _index = persisted
+                return _index
+        except Exception:
+            pass
+        _index = _build_index()
+        INDEX_FILE.write_text(json.dumps(_index), encoding="utf-8")
+        return _index
+
+
+def search(query: str, limit: int = 10) -> List[dict]:
+    """Rank GDPR sub-articles against a free-text query with BM25."""
+    index = get_index()
+    docs, postings = index["docs"], index["postings"]
+    n_docs, avg_length = len(docs), index["avg_length"]
+
+    scores: Dict[int, float] = {}
+    for term in set(tokenize(query)):
+        plist = postings.get(term)
+        if not plist:
+            continue
+        idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+        for doc_id, tf in plist:
+            norm = K1 * (1 - B + B * docs[doc_id]["length"] / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+    top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return [
+        {
+            "reference": article_reference(docs[doc_id]),
+            "article": docs[doc_id]["article"],
+            "article_title": docs[doc_id]["article_title"],
+            "sub_article": docs[doc_id]["sub_article"],
+            "chapter": docs[doc_id]["chapter"],
+            "chapter_title": docs[doc_id]["chapter_title"],
+            "score": round(score, 4),
+            "snippet": docs[doc_id]["text"][:240],
+            "href": docs[doc_id]["href"],
+        }
+        for doc_id, score in top
+    ]
+
+
+def article_reference(doc: dict) -> str:
+    """Human-readable citation, e.g. 'GDPR Art. 17(1) — Right to erasure'."""
+    return f"GDPR Art. {doc['article']}({doc['sub_article']}) — {doc['article_title']}"
+
+
+def best_articles(text: str, limit: int = 3) -> List[str]:
+    """Citations of the best-matching articles for a rule; empty if the corpus is unavailable."""
+    try:
+        return [hit["reference"] for hit in search(text, limit)]
+    except Exception:
+        return []
@@ -0,0 +1,192 @@
+"""
+Policy ingestion pipeline: PDF parsing and rule extraction run as background jobs on a
+bounded worker pool so a large upload never stalls the API event loop.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from app.core.pdf_parser import iter_pdf_text, shutdown_pdf_pool
+from app.core.rule_engine import add_rules
+from app.core.rule_extractor import extract_rules_from_pages
+from app.core.store_versions import mark_changed
+from app.models.rule import PolicyRule
+
+logger = logging.getLogger("nitilens.ingestion")
+
+POLICIES_FILE = Path(__file__).parent.parent / "storage" / "policies.json"
+SPOOL_DIR = Path(__file__).parent.parent / "storage" / "uploads"
+# Extracted text and rule sets keyed by the SHA-256 of the uploaded PDF
+CACHE_DIR = Path(__file__).parent.parent / "storage" / "cache"
+
+# Worker threads parsing PDFs, and the most jobs (queued + running) accepted at once.
+MAX_WORKERS = int(os.getenv("NITILENS_INGEST_WORKERS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("NITILENS_INGEST_MAX_PENDING", "8"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_reserved_slots = 0  # jobs accepted and not yet finished (queued + running)
+_slots_lock = threading.Lock()
+_policies_lock = threading.Lock()
+
+
+def load_policies() -> list:
+    """Load all policy records from storage."""
+    try:
+        return json.loads(POLICIES_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return []
+
+
+def _save_policies(policies: list) -> None:
+    POLICIES_FILE.write_text(json.dumps(policies, indent=2), encoding="utf-8")
+    mark_changed("policies")
+
+
+def get_policy(policy_id: str) -> Optional[dict]:
+    """Get a single policy record by ID."""
+    return next((p for p in load_policies() if p["id"] == policy_id), None)
+
+
+def add_policy(record: dict) -> None:
+    """Append a policy record to storage."""
+    with _policies_lock:
+        policies = load_policies()
+        policies.append(record)
+        _save_policies(policies)
+
+
+def update_policy(policy_id: str, **fields) -> Optional[dict]:
+    """Update fields on a stored policy record."""
+    with _policies_lock:
+        policies = load_policies()
+        for record in policies:
+            if record["id"] == policy_id:
+                record.update(fields)
+                _save_policies(policies)
+                return record
+    return None
+
+
+def try_reserve_slot() -> bool:
+    """Reserve a job slot without blocking; False means the pipeline is saturated."""
+    global _reserved_slots
+    with _slots_lock:
+        if _reserved_slots >= MAX_PENDING_JOBS:
+            return False
+        _reserved_slots += 1
+        return True
+
+
+def release_slot() -> None:
+    global _reserved_slots
+    with _slots_lock:
+        if _reserved_slots <= 0:
+            raise ValueError("release_slot() called without a reserved slot")
+        _reserved_slots -= 1
+
+
+def spool_path(policy_id: str) -> Path:
+    """Location an upload is spooled to before its job picks it up."""
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    return SPOOL_DIR / f"{policy_id}.pdf"
+
+
+def _cache_paths(content_hash: str) -> Tuple[Path, Path]:
+    return CACHE_DIR / f"{content_hash}.txt", CACHE_DIR / f"{content_hash}.rules.json"
+
+
+def _load_cached_extraction(content_hash: str, policy_id: str) -> Optional[List[PolicyRule]]:
+    """Rebuild a cached rule set for a new policy, or None on a cache miss."""
+    _, rules_path = _cache_paths(content_hash)
+    try:
+        templates = json.loads(rules_path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    return [
+        PolicyRule(**{**t, "id": f"{t['id_prefix']}-{uuid.uuid4().hex[:6]}", "policy_id": policy_id})
+        for t in templates
+    ]
+
+
+def _store_cached_extraction(content_hash: str, text: str, rules: List[PolicyRule]) -> None:
+    """Write the extracted text and a policy-independent copy of the rule set."""
+    text_path, rules_path = _cache_paths(content_hash)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    templates = []
+    for r in rules:
+        t = r.model_dump(exclude={"id", "policy_id"})
+        t["id_prefix"] = r.id.rsplit("-", 1)[0]
+        templates.append(t)
+    text_path.write_text(text, encoding="utf-8")
+    rules_path.write_text(json.dumps(templates, indent=2), encoding="utf-8")
+
+
+def submit_ingestion(policy_id: str, pdf_path: Path, source_name: str, content_hash: str) -> None:
+    """
+    Queue parsing + rule extraction for a spooled upload.
+    The caller must already hold a slot from try_reserve_slot(); the job releases it.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+    _executor.submit(_run_ingestion, policy_id, pdf_path, source_name, content_hash)
+
+
+def _run_ingestion(policy_id: str, pdf_path: Path, source_name: str, content_hash: str) -> None:
+    """Job body: parse the PDF, extract and store rules, then record the outcome."""
+    try:
+        update_policy(policy_id, status="extracting")
+        extracted = _load_cached_extraction(content_hash, policy_id)
+        cache_hit = extracted is not None
+        if not cache_hit:
+            # Keyword matching consumes pages as the parser pool returns them
+            text, extracted = extract_rules_from_pages(iter_pdf_text(str(pdf_path)), policy_id, source_name)
+            _store_cached_extraction(content_hash, text, extracted)
+        added = add_rules(extracted)
+        update_policy(
+            policy_id,
+            status="completed",
+            cache_hit=cache_hit,
+            rules_extracted=len(added),
+            rules_deduplicated=len(extracted) - len(added),
+            rule_ids=[r.id for r in added],
+            completed_at=datetime.now(timezone.utc).isoformat(),
+        )
+        logger.info(
+            f"Policy {policy_id} ingested — {len(added)} new rules, "
+            f"{len(extracted) - len(added)} duplicates skipped (cache {'hit' if cache_hit else 'miss'})."
+        )
+    except Exception as e:
+        update_policy(policy_id, status="failed", error=str(e))
+        logger.error(f"Ingestion of policy {policy_id} failed: {e}")
+    finally:
+        pdf_path.unlink(missing_ok=True)
+        release_slot()
+
+
+def ingestion_status() -> dict:
+    """Pipeline capacity snapshot (for status endpoints)."""
+    with _slots_lock:
+        reserved = _reserved_slots
+    return {
+        "max_workers": MAX_WORKERS,
+        "max_pending_jobs": MAX_PENDING_JOBS,
+        "reserved_slots": reserved,
+        "available_slots": MAX_PENDING_JOBS - reserved,
+    }
+
+
+def shutdown_ingestion() -> None:
+    """Stop accepting jobs and let running ones finish in the background."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    shutdown_pdf_pool()
+
@@ -0,0 +1,167 @@
+"""
+Multi-pattern keyword matching for rule extraction.
+An Aho–Corasick automaton finds every occurrence of every keyword in one pass over the
+text, and a sentence-offset index maps each hit back to its source sentence by bisection.
+StreamingHits runs the same pass over text that arrives in pieces (pages), carrying the
+automaton state across piece boundaries.
+"""
+import re
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Same boundary rule the extractor has always used to split policy text into sentences
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+class KeywordAutomaton:
+    """Case-insensitive Aho–Corasick automaton over a fixed keyword set."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for kw in keywords:
+            kw = kw.lower()
+            if kw and kw not in self._ids:
+                self._ids[kw] = len(self.keywords)
+                self.keywords.append(kw)
+                self._insert(kw, self._ids[kw])
+        self._build_failure_links()
+
+    def keyword_id(self, keyword: str) -> Optional[int]:
+        return self._ids.get(keyword.lower())
+
+    def _insert(self, keyword: str, kw_id: int) -> None:
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(kw_id)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Inherit matches that end at the failure state
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str, state: Optional[List[int]] = None,
+                     base: int = 0) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yield (keyword_id, start, end) for every hit, with offsets into `text` plus `base`.
+        `state` (a one-item list holding the automaton node) continues a scan from the
+        previous piece of the same text and is updated in place.
+        """
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            chars = enumerate(lowered)
+        else:
+            # Rare: some characters lower-case to several code points; keep original offsets
+            chars = ((i, lc) for i, ch in enumerate(text) for lc in ch.lower())
+
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self.keywords
+        state = state if state is not None else [0]
+        node = state[0]
+        try:
+            for i, ch in chars:
+                while node and ch not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(ch, 0)
+                for kw_id in out[node]:
+                    yield kw_id, base + i + 1 - len(keywords[kw_id]), base + i + 1
+        finally:
+            state[0] = node
+
+
+class SentenceIndex:
+    """Sorted sentence start/end offsets for mapping text positions to sentences."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.starts: List[int] = [0]
+        self.ends: List[int] = []
+        for m in _SENTENCE_BREAK.finditer(text):
+            self.ends.append(m.start())
+            self.starts.append(m.end())
+        self.ends.append(len(text))
+
+    def containing(self, start: int, end: int) -> Optional[int]:
+        """Index of the sentence that wholly contains [start, end), if any."""
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and end <= self.ends[i]:
+            return i
+        return None
+
+    def sentence(self, i: int) -> str:
+        return self.text[self.starts[i]:self.ends[i]]
+
+
+def first_hits(automaton: KeywordAutomaton, text: str) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    Scan `text` once. Returns two maps keyed by keyword id:
+    the first hit offset anywhere, and the index of the first sentence containing a hit.
+    """
+    sentences = SentenceIndex(text)
+    first_offset: Dict[int, int] = {}
+    first_sentence: Dict[int, int] = {}
+    for kw_id, start, end in automaton.iter_matches(text):
+        first_offset.setdefault(kw_id, start)
+        if kw_id not in first_sentence:
+            idx = sentences.containing(start, end)
+            if idx is not None:
+                first_sentence[kw_id] = idx
+    return first_offset, first_sentence
+
+
+class StreamingHits:
+    """
+    first_hits over a text fed piece by piece, the pieces joined by `separator`. The
+    keyword pass runs as each piece arrives; sentence boundaries can span pieces, so hits
+    are mapped to sentences once the whole text is in (finish()).
+    """
+
+    def __init__(self, automaton: KeywordAutomaton, separator: str = "\n"):
+        self.automaton = automaton
+        self.separator = separator
+        self._parts: List[str] = []
+        self._length = 0
+        self._state = [0]
+        self.first_offset: Dict[int, int] = {}
+        self._hits: Dict[int, List[Tuple[int, int]]] = {}  # keyword id -> hits in text order
+
+    def feed(self, piece: str) -> None:
+        if self._parts:
+            piece = self.separator + piece
+        for kw_id, start, end in self.automaton.iter_matches(piece, self._state, self._length):
+            self.first_offset.setdefault(kw_id, start)
+            self._hits.setdefault(kw_id, []).append((start, end))
+        self._parts.append(piece)
+        self._length += len(piece)
+
+    def finish(self) -> Tuple[str, Dict[int, int], Dict[int, int], SentenceIndex]:
+        """The joined text, the two first_hits maps, and the text's sentence index."""
+        text = "".join(self._parts)
+        sentences = SentenceIndex(text)
+        first_sentence: Dict[int, int] = {}
+        for kw_id, hits in self._hits.items():
+            idx = next((i for i in (sentences.containing(s, e) for s, e in hits) if i is not None), None)
+            if idx is not None:
+                first_sentence[kw_id] = idx
+        return text, self.first_offset, first_sentence, sentences
@@ -0,0 +1,61 @@
+"""
+Deferred imports for heavy modules (pandas / numpy-backed engines, PyMuPDF).
+
+Routers bind `lazy_import("app.core.violation_engine")` at import time and call through
+it; the real import happens on first attribute access (or during the startup warm-up),
+so importing app.main stays cheap. The cost of each deferred import is recorded and
+reported by the admin startup endpoint.
+"""
+import importlib
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Dict
+
+_import_costs: Dict[str, float] = {}  # module -> seconds its first import took
+_lock = threading.Lock()
+
+
+def timed_import(name: str) -> ModuleType:
+    """Import a module, recording how long the import took if it was not loaded yet."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        _import_costs.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = timed_import(self._name)
+        return getattr(module, attr)
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None or self._name in sys.modules
+
+    def __repr__(self):
+        return f"<lazy module '{self._name}'{' (loaded)' if self.loaded else ''}>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def import_costs() -> Dict[str, float]:
+    """Seconds taken by each deferred import so far, in import order."""
+    return {name: round(seconds, 4) for name, seconds in _import_costs.items()}
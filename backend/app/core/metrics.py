@@ -0,0 +1,284 @@
+"""
+Runtime metrics: scan instrumentation and HTTP request latency, exposed in the
+Prometheus text format at /metrics.
+
+Every scan fills a ScanMetrics record with per-stage and per-rule wall times, rows in /
+rows out per rule, the bytes written to each store file and the rows whose amounts had
+no USD rate (which USD thresholds cannot flag). The record is returned with the scan
+result, kept as the last scan for the scheduler status, and folded into cumulative
+counters. RequestMetricsMiddleware times every request into a latency histogram
+labelled by router and method. The router comes from the matched route's path template
+(its /api/<router> prefix), so labels are bounded by the app's routes; requests no route
+matches (scanners probing /wp-login.php and the like) share the "unmatched" label, and
+non-standard methods share "OTHER".
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Any other request method is labelled "OTHER" (clients can send arbitrary tokens)
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+_lock = threading.Lock()
+
+
+class ScanMetrics:
+    """Timings, row counts and bytes written for one scan."""
+
+    def __init__(self, dataset_id: str):
+        self.dataset_id = dataset_id
+        self.engine = "pandas"
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.outcome = "running"
+        self.rows = 0
+        self.stages: Dict[str, float] = {}
+        self.rules: Dict[str, dict] = {}
+        self.bytes_written: Dict[str, int] = {}
+        # Rows whose amounts had no USD rate, so USD thresholds could not flag them
+        self.fx_unconverted: dict = {}
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        # Called with (stage name, seconds) as each stage ends, e.g. to stream progress
+        self.on_stage: Optional[Callable[[str, float], None]] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            if self.on_stage is not None:
+                self.on_stage(name, seconds)
+
+    @contextmanager
+    def rule(self, rule_id: str, phase: str = "evaluate"):
+        """Time one phase ('evaluate' or 'materialize') of one rule."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self._rule(rule_id)
+            entry[f"{phase}_s"] = entry.get(f"{phase}_s", 0.0) + time.perf_counter() - started
+
+    def _rule(self, rule_id: str) -> dict:
+        return self.rules.setdefault(rule_id, {"rows_in": 0, "rows_out": 0, "violations": 0})
+
+    def rule_rows(self, rule_id: str, rows_in: int, rows_out: int) -> None:
+        entry = self._rule(rule_id)
+        entry["rows_in"], entry["rows_out"] = rows_in, rows_out
+
+    def rule_violations(self, rule_id: str, count: int) -> None:
+        self._rule(rule_id)["violations"] = count
+
+    def wrote(self, name: str, path: Path) -> None:
+        try:
+            self.bytes_written[name] = path.stat().st_size
+        except OSError:
+            pass
+
+    def finish(self, outcome: str) -> None:
+        self.outcome = outcome
+        self.duration = time.perf_counter() - self._started
+        _record_scan(self)
+
+    def as_dict(self) -> dict:
+        return {
+            "dataset": self.dataset_id,
+            "engine": self.engine,
+            "started_at": self.started_at,
+            "outcome": self.outcome,
+            "duration_s": round(self.duration, 4),
+            "rows": self.rows,
+            "stages": {k: round(v, 4) for k, v in self.stages.items()},
+            "rules": {
+                rule_id: {k: round(v, 4) if isinstance(v, float) else v for k, v in entry.items()}
+                for rule_id, entry in self.rules.items()
+            },
+            "bytes_written": dict(self.bytes_written),
+            "fx_unconverted": {
+                "amount_paid": self.fx_unconverted.get("amount_paid", 0),
+                "amount_received": self.fx_unconverted.get("amount_received", 0),
+                "currencies": dict(self.fx_unconverted.get("currencies", {})),
+            },
+        }
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+_last_scan: Optional[ScanMetrics] = None
+_scans_total: Dict[Tuple[str, str], int] = {}          # (dataset, outcome) -> count
+_stage_seconds_total: Dict[str, float] = {}
+_rule_seconds_total: Dict[str, float] = {}
+_rule_rows_out_total: Dict[str, int] = {}
+_bytes_written_total: Dict[str, int] = {}
+# (router, method) -> [bucket counts..., +Inf count], sum
+_latency: Dict[Tuple[str, str], Tuple[list, list]] = {}
+_requests_total: Dict[Tuple[str, str, str], int] = {}  # (router, method, status class) -> count
+
+
+def _record_scan(metrics: ScanMetrics) -> None:
+    global _last_scan
+    with _lock:
+        _last_scan = metrics
+        key = (metrics.dataset_id, metrics.outcome)
+        _scans_total[key] = _scans_total.get(key, 0) + 1
+        for name, seconds in metrics.stages.items():
+            _stage_seconds_total[name] = _stage_seconds_total.get(name, 0.0) + seconds
+        for rule_id, entry in metrics.rules.items():
+            seconds = entry.get("evaluate_s", 0.0) + entry.get("materialize_s", 0.0)
+            _rule_seconds_total[rule_id] = _rule_seconds_total.get(rule_id, 0.0) + seconds
+            _rule_rows_out_total[rule_id] = _rule_rows_out_total.get(rule_id, 0) + entry["rows_out"]
+        for name, size in metrics.bytes_written.items():
+            _bytes_written_total[name] = _bytes_written_total.get(name, 0) + size
+
+
+def last_scan() -> Optional[dict]:
+    """The most recent scan's metrics, or None before the first scan."""
+    return _last_scan.as_dict() if _last_scan else None
+
+
+def observe_request(router: str, method: str, status: int, seconds: float) -> None:
+    with _lock:
+        buckets, total = _latency.setdefault((router, method), ([0] * (len(LATENCY_BUCKETS) + 1), [0.0]))
+        buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        total[0] += seconds
+        key = (router, method, f"{status // 100}xx")
+        _requests_total[key] = _requests_total.get(key, 0) + 1
+
+
+def _router_of(scope) -> str:
+    """Router label from the route the request matched (set in the scope by routing)."""
+    path = getattr(scope.get("route"), "path", None)
+    if path is None:
+        return "unmatched"
+    parts = path.strip("/").split("/")
+    if parts[0] == "api":
+        return parts[1] if len(parts) > 1 and parts[1] else "api"
+    return parts[0] or "root"
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording per-router request latency."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+        first_byte = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = dict(message.get("headers") or ())
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    # Long-lived streams are timed to their first byte, not their lifetime
+                    first_byte[0] = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            observe_request(_router_of(scope), method, status[0],
+                            (first_byte[0] or time.perf_counter()) - started)
+
+
+# ---------------------------------------------------------------------------
+# Prometheus text exposition
+# ---------------------------------------------------------------------------
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _family(lines: list, name: str, kind: str, help_text: str, samples) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(**labels) if labels else ''} {value}")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    lines: list = []
+    with _lock:
+        latency = {k: (list(b), t[0]) for k, (b, t) in _latency.items()}
+        requests = dict(_requests_total)
+        scans = dict(_scans_total)
+        stage_totals = dict(_stage_seconds_total)
+        rule_totals = dict(_rule_seconds_total)
+        rows_out_totals = dict(_rule_rows_out_total)
+        bytes_totals = dict(_bytes_written_total)
+        last = _last_scan
+
+    samples = []
+    for (router, method), (buckets, total) in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += count
+            samples.append(({"router": router, "method": method, "le": bound}, cumulative))
+    lines.append("# HELP nitilens_http_request_duration_seconds HTTP request latency by router")
+    lines.append("# TYPE nitilens_http_request_duration_seconds histogram")
+    for labels, value in samples:
+        lines.append(f"nitilens_http_request_duration_seconds_bucket{_labels(**labels)} {value}")
+    for (router, method), (buckets, total) in sorted(latency.items()):
+        labels = _labels(router=router, method=method)
+        lines.append(f"nitilens_http_request_duration_seconds_sum{labels} {total:.6f}")
+        lines.append(f"nitilens_http_request_duration_seconds_count{labels} {sum(buckets)}")
+    _family(lines, "nitilens_http_requests_total", "counter", "HTTP requests by router and status class",
+            (({"router": r, "method": m, "status": s}, n) for (r, m, s), n in sorted(requests.items())))
+
+    _family(lines, "nitilens_scans_total", "counter", "Compliance scans by dataset and outcome",
+            (({"dataset": d, "outcome": o}, n) for (d, o), n in sorted(scans.items())))
+    _family(lines, "nitilens_scan_stage_seconds_total", "counter", "Cumulative scan time per stage",
+            (({"stage": k}, f"{v:.6f}") for k, v in sorted(stage_totals.items())))
+    _family(lines, "nitilens_scan_rule_seconds_total", "counter", "Cumulative scan time per rule",
+            (({"rule_id": k}, f"{v:.6f}") for k, v in sorted(rule_totals.items())))
+    _family(lines, "nitilens_scan_rule_rows_flagged_total", "counter", "Cumulative rows flagged per rule",
+            (({"rule_id": k}, v) for k, v in sorted(rows_out_totals.items())))
+    _family(lines, "nitilens_scan_bytes_written_total", "counter", "Cumulative bytes written by scans per file",
+            (({"file": k}, v) for k, v in sorted(bytes_totals.items())))
+
+    if last is not None:
+        _family(lines, "nitilens_last_scan_duration_seconds", "gauge", "Wall time of the last scan",
+                [({"dataset": last.dataset_id, "outcome": last.outcome}, f"{last.duration:.6f}")])
+        _family(lines, "nitilens_last_scan_rows", "gauge", "Rows read by the last scan",
+                [({"dataset": last.dataset_id}, last.rows)])
+        _family(lines, "nitilens_last_scan_stage_seconds", "gauge", "Per-stage wall time of the last scan",
+                (({"stage": k}, f"{v:.6f}") for k, v in last.stages.items()))
+        rule_samples = []
+        for rule_id, entry in last.rules.items():
+            for phase in ("evaluate", "materialize"):
+                if f"{phase}_s" in entry:
+                    rule_samples.append(({"rule_id": rule_id, "phase": phase}, f"{entry[f'{phase}_s']:.6f}"))
+        _family(lines, "nitilens_last_scan_rule_seconds", "gauge", "Per-rule wall time of the last scan",
+                rule_samples)
+        _family(lines, "nitilens_last_scan_rule_rows", "gauge", "Rows in / out per rule in the last scan",
+                [({"rule_id": r, "direction": d}, e[f"rows_{d}"]) for r, e in last.rules.items()
+                 for d in ("in", "out")])
+        _family(lines, "nitilens_last_scan_bytes_written", "gauge", "Bytes written per file by the last scan",
+                (({"file": k}, v) for k, v in last.bytes_written.items()))
+        _family(lines, "nitilens_last_scan_fx_unconverted_rows", "gauge",
+                "Rows in the last scan whose amount had no USD rate (USD thresholds cannot flag them)",
+                [({"dataset": last.dataset_id, "column": c}, last.fx_unconverted.get(c, 0))
+                 for c in ("amount_paid", "amount_received")])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,127 @@
+"""
+Per-transaction risk scoring and the prioritized review index.
+
+A transaction's risk score combines the severities of every rule it breaks with the size
+of the transfer:  sum(severity weights) + AMOUNT_WEIGHT * log10(1 + amount in USD).
+Scores are computed column-wise during the scan. Violations are then grouped per
+transaction into an index ordered by descending risk, so the review queue walks it from
+the top and stops after `limit` pending transactions.
+"""
+import heapq
+import json
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from app.models.violation import Violation
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PRIORITY_FILE = Path(__file__).parent.parent / "storage" / "priority_index.json"
+
+SEVERITY_WEIGHTS = {"critical": 40.0, "high": 25.0, "medium": 10.0, "low": 5.0}
+SEVERITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+AMOUNT_WEIGHT = 5.0
+PENDING_STATUSES = ("open", "reviewed")
+
+_lock = threading.Lock()
+
+
+def score_transactions(df: "pd.DataFrame", hits: Iterable[Tuple[str, "pd.Series"]]) -> "pd.Series":
+    """
+    Risk score per row of df. `hits` yields (severity, boolean mask) for each applied rule;
+    rows no rule flagged score 0.
+    """
+    # Imported here so the review queue and deadline engine load without pandas
+    import numpy as np
+    import pandas as pd
+
+    severity_total = np.zeros(len(df), dtype=np.float64)
+    for severity, mask in hits:
+        severity_total += SEVERITY_WEIGHTS.get(severity, 0.0) * np.asarray(mask, dtype=bool)
+    amount = df["amount_paid_usd"] if "amount_paid_usd" in df else df["amount_paid"]
+    amount_term = AMOUNT_WEIGHT * np.log10(1 + np.nan_to_num(amount.to_numpy(dtype=np.float64), nan=0.0).clip(min=0))
+    return pd.Series(np.where(severity_total > 0, np.round(severity_total + amount_term, 2), 0.0), index=df.index)
+
+
+def _group_sort_key(group: dict) -> tuple:
+    return -group["risk_score"], SEVERITY_RANK[group["severity"]], group["transaction_id"]
+
+
+def build_priority_index(violations: List[Violation]) -> List[dict]:
+    """Group violations per transaction, order by descending risk and persist the index."""
+    groups: Dict[str, dict] = {}
+    for v in violations:
+        group = groups.setdefault(v.transaction_id, {
+            "transaction_id": v.transaction_id, "risk_score": 0.0, "severity": v.severity, "violation_ids": [],
+        })
+        group["violation_ids"].append(v.id)
+        group["risk_score"] = max(group["risk_score"], v.risk_score or 0.0)
+        if SEVERITY_RANK[v.severity] < SEVERITY_RANK[group["severity"]]:
+            group["severity"] = v.severity
+    index = sorted(groups.values(), key=_group_sort_key)
+    with _lock:
+        PRIORITY_FILE.write_text(json.dumps({"signature": _signature(violations), "groups": index}),
+                                 encoding="utf-8")
+    return index
+
+
+def _signature(violations: List[Violation]) -> list:
+    """Identifies the scan an index was built from (statuses may change; membership may not)."""
+    return [len(violations), violations[0].id if violations else None, violations[-1].id if violations else None]
+
+
+def _load_index(violations: List[Violation]) -> Optional[List[dict]]:
+    with _lock:
+        try:
+            stored = json.loads(PRIORITY_FILE.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+    return stored["groups"] if stored.get("signature") == _signature(violations) else None
+
+
+def top_pending(violations: List[Violation], limit: int,
+                severity: Optional[str] = None) -> Tuple[List[dict], int]:
+    """
+    The `limit` highest-risk transactions with pending violations (optionally only those
+    pending at `severity`), plus the total number of pending violations.
+    """
+    by_id = {v.id: v for v in violations}
+    pending = [v for v in violations
+               if v.status in PENDING_STATUSES and (severity is None or v.severity == severity)]
+
+    def _entry(transaction_id: str, members: List[Violation], risk: float) -> dict:
+        members = sorted(members, key=lambda v: SEVERITY_RANK[v.severity])
+        return {
+            "transaction_id": transaction_id,
+            "risk_score": risk,
+            "severity": members[0].severity,
+            "rule_ids": [v.rule_id for v in members],
+            "violations": [v.model_dump() for v in members],
+        }
+
+    index = _load_index(violations)
+    if index is not None:
+        # Ordered index: walk from the top, stop once `limit` pending groups are found
+        top = []
+        for group in index:
+            members = [by_id[vid] for vid in group["violation_ids"]
+                       if vid in by_id and by_id[vid].status in PENDING_STATUSES
+                       and (severity is None or by_id[vid].severity == severity)]
+            if members:
+                top.append(_entry(group["transaction_id"], members, group["risk_score"]))
+                if len(top) == limit:
+                    break
+        return top, len(pending)
+
+    # No (or stale) index: group the pending violations and select the top-k with a heap
+    groups: Dict[str, List[Violation]] = {}
+    for v in pending:
+        groups.setdefault(v.transaction_id, []).append(v)
+    best = heapq.nsmallest(limit, (
+        {"transaction_id": tid, "risk_score": max(v.risk_score or 0.0 for v in members),
+         "severity": min((v.severity for v in members), key=SEVERITY_RANK.get), "members": members}
+        for tid, members in groups.items()
+    ), key=_group_sort_key)
+    return [_entry(g["transaction_id"], g["members"], g["risk_score"]) for g in best], len(pending)
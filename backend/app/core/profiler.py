@@ -0,0 +1,258 @@
+"""
+Opt-in per-request sampling profiler.
+
+A request is profiled when it is picked at random with probability
+NITILENS_PROFILE_SAMPLE_RATE or, only if NITILENS_PROFILE_ON_REQUEST=1, when it carries the
+`X-Nitilens-Profile: 1` header or the `?profile=1` query flag (off by default: profiles
+expose code paths, and any client could otherwise trigger them).
+
+While it runs, a sampler thread snapshots the stacks of the threads serving that request
+every NITILENS_PROFILE_INTERVAL_MS and counts them as folded stacks ("root;...;leaf
+count"), the input format of flamegraph.pl and speedscope. The event loop is sampled only
+while the request's own task is running on it, and a threadpool worker only while it runs
+a call made from the request's context (marked with a context variable that AnyIO copies
+into the worker), so concurrent requests do not leak into each other's profiles.
+
+Profiles are kept in a ring of NITILENS_PROFILE_KEEP slots under storage/profiles, so disk
+use stays bounded; the oldest profile is overwritten first.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger("nitilens.profiler")
+
+PROFILES_DIR = Path(__file__).parent.parent / "storage" / "profiles"
+SAMPLE_RATE = float(os.getenv("NITILENS_PROFILE_SAMPLE_RATE", "0"))
+INTERVAL_MS = float(os.getenv("NITILENS_PROFILE_INTERVAL_MS", "5"))
+KEEP = max(1, int(os.getenv("NITILENS_PROFILE_KEEP", "50")))
+# Set to 1 to let clients request a profile with the header / query flag
+ALLOW_ON_REQUEST = os.getenv("NITILENS_PROFILE_ON_REQUEST", "0") == "1"
+HEADER = b"x-nitilens-profile"
+MAX_STACK_DEPTH = 128
+# Worker threads run calls inside a copy of the caller's context, bound near the stack root
+_CONTEXT_SEARCH_DEPTH = 6
+
+# Id of the profile being taken in the current request's context
+_profile_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("nitilens_profile_id", default=None)
+
+# Leaf frames of a thread that is blocked rather than working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("queue.py", "get"), ("selectors.py", "select"),
+    ("thread.py", "_worker"), ("threading.py", "_wait_for_tstate_lock"),
+}
+
+_slot_lock = threading.Lock()
+_next_slot: Optional[int] = None
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    return (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in _IDLE_LEAVES
+
+
+def _runs_in_context(frames: list, profile_id: str) -> bool:
+    """Whether a worker thread (frames leaf first) is running a call from the profiled request."""
+    for frame in reversed(frames[-_CONTEXT_SEARCH_DEPTH:]):
+        context = frame.f_locals.get("context")
+        if isinstance(context, contextvars.Context):
+            return context.get(_profile_id) == profile_id
+    return False
+
+
+class Sampler:
+    """Samples the threads serving one request on a background thread."""
+
+    def __init__(self, profile_id: str, loop: asyncio.AbstractEventLoop, task: Optional[asyncio.Task],
+                 interval: float = INTERVAL_MS / 1000):
+        self.profile_id = profile_id
+        self.loop = loop
+        self.task = task
+        self.loop_thread = threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="nitilens-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            workers = {t.ident for t in threading.enumerate() if t.name.startswith("AnyIO worker")}
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == self.loop_thread:
+                    # The loop interleaves requests: only count it while this request's task runs
+                    if asyncio.current_task(self.loop) is not self.task:
+                        continue
+                    name = "event-loop"
+                elif ident in workers:
+                    name = "worker"
+                else:
+                    continue
+                if _is_idle(frame):
+                    continue
+                frames = []
+                while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                    frames.append(frame)
+                    frame = frame.f_back
+                if name == "worker" and not _runs_in_context(frames, self.profile_id):
+                    continue
+                stack = [_frame_label(f.f_code) for f in frames]
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Ask the sampler to stop; join() waits for it."""
+        self._stop.set()
+
+    def join(self):
+        self._thread.join()
+
+
+def _claim_slot() -> int:
+    """Next ring-buffer slot: the one after the most recently written profile."""
+    global _next_slot
+    with _slot_lock:
+        if _next_slot is None:
+            latest = max(_read_meta_files(), key=lambda m: m["finished_at"], default=None)
+            _next_slot = (latest["slot"] + 1) % KEEP if latest else 0
+        slot = _next_slot
+        _next_slot = (slot + 1) % KEEP
+        return slot
+
+
+def _read_meta_files() -> List[dict]:
+    metas = []
+    for path in PROFILES_DIR.glob("*.json"):
+        try:
+            metas.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return metas
+
+
+def save_profile(profile_id: str, sampler: Sampler, method: str, path: str, status: int,
+                 started_at: str, duration: float, trigger: str) -> dict:
+    """Write a finished profile to the next ring slot, replacing what was there."""
+    slot = _claim_slot()
+    meta = {
+        "id": profile_id,
+        "slot": slot,
+        "method": method,
+        "path": path,
+        "status": status,
+        "trigger": trigger,
+        "started_at": started_at,
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration * 1000, 2),
+        "interval_ms": sampler.interval * 1000,
+        "samples": sampler.samples,
+        "distinct_stacks": len(sampler.stacks),
+        "top_frames": _top_frames(sampler.stacks),
+    }
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    folded = "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+    (PROFILES_DIR / f"{slot:03d}.folded").write_text(folded, encoding="utf-8")
+    (PROFILES_DIR / f"{slot:03d}.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return meta
+
+
+def _top_frames(stacks: Counter, limit: int = 5) -> List[dict]:
+    """Leaf frames with the most self samples."""
+    leaves: Counter = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return [{"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+
+def list_profiles(limit: int = 50, path_prefix: Optional[str] = None) -> List[dict]:
+    """Recent profiles, newest first."""
+    metas = _read_meta_files()
+    if path_prefix:
+        metas = [m for m in metas if m["path"].startswith(path_prefix)]
+    return sorted(metas, key=lambda m: m["finished_at"], reverse=True)[:limit]
+
+
+def get_profile(profile_id: str) -> Optional[tuple]:
+    """(metadata, folded stacks text) for a profile still in the ring, else None."""
+    for meta in _read_meta_files():
+        if meta["id"] == profile_id:
+            try:
+                folded = (PROFILES_DIR / f"{meta['slot']:03d}.folded").read_text(encoding="utf-8")
+            except OSError:
+                return None
+            return meta, folded
+    return None
+
+
+def _trigger(scope) -> Optional[str]:
+    if ALLOW_ON_REQUEST:
+        if dict(scope.get("headers") or ()).get(HEADER, b"").lower() in (b"1", b"true", b"yes"):
+            return "header"
+        query = scope.get("query_string", b"").decode("latin-1")
+        if any(part in ("profile=1", "profile=true") for part in query.split("&")):
+            return "query"
+    if SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilerMiddleware:
+    """ASGI middleware that profiles opted-in requests; adds an X-Nitilens-Profile-Id header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        trigger = _trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"prof-{uuid.uuid4().hex[:10]}"
+        sampler = Sampler(profile_id, asyncio.get_running_loop(), asyncio.current_task())
+        status = [500]
+        started_at = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-nitilens-profile-id", profile_id.encode())]}
+            await send(message)
+
+        token = _profile_id.set(profile_id)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _profile_id.reset(token)
+            sampler.stop()
+            duration = time.perf_counter() - started
+            try:
+                # Joining the sampler and writing the files block: keep them off the event loop
+                await asyncio.to_thread(sampler.join)
+                meta = await asyncio.to_thread(save_profile, profile_id, sampler, scope["method"], scope["path"],
+                                               status[0], started_at, duration, trigger)
+                logger.info(f"Profiled {scope['method']} {scope['path']} -> {meta['id']} "
+                            f"({meta['samples']} samples, {meta['duration_ms']} ms)")
+            except OSError as e:
+                logger.warning(f"Could not save profile for {scope['path']}: {e}")
@@ -0,0 +1,136 @@
+"""
+Sparse byte-offset row index for CSV transaction files.
+
+Records the byte offset of every STRIDE-th data row. The index is built on first access
+(vectorised newline scan over fixed-size blocks), extended when the file is appended to,
+and persisted next to the data file as `<name>.rowidx.json`. Random-access reads then
+mmap the file and touch only the bytes of the rows requested.
+"""
+import io
+import json
+import mmap
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.dataset_adapters import DatasetAdapter
+
+STRIDE = 1024
+_BLOCK_BYTES = 64 * 1024 * 1024
+
+_indexes: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def _index_path(data_path: Path) -> Path:
+    return data_path.with_name(data_path.name + ".rowidx.json")
+
+
+def _scan(path: Path, start: int, next_row: int, offsets: List[int], stride: int) -> int:
+    """
+    Record row-start offsets from byte `start`. `next_row` is the number of the row that
+    begins after the first newline at or beyond `start` (the header's newline begins row 0).
+    Returns the row number following the last newline in the file.
+    """
+    with path.open("rb") as fh:
+        fh.seek(start)
+        base = start
+        while True:
+            block = fh.read(_BLOCK_BYTES)
+            if not block:
+                break
+            row_starts = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10) + base + 1
+            # Newline k in this block begins row next_row + k; keep every stride-th row
+            offsets.extend(row_starts[(-next_row) % stride::stride].tolist())
+            next_row += len(row_starts)
+            base += len(block)
+    return next_row
+
+
+def _build(path: Path, previous: Optional[dict]) -> dict:
+    stat = path.stat()
+    if previous and previous["path"] == str(path) and stat.st_size > previous["size"] \
+            and _ends_with_newline(path, previous["size"]):
+        # Appended rows only: continue from the old end of file, where row `rows` begins
+        offsets = previous["offsets"]
+        next_row = _scan(path, previous["size"], previous["rows"] + 1, offsets, STRIDE)
+    else:
+        offsets = []
+        next_row = _scan(path, 0, 0, offsets, STRIDE)
+    # A trailing newline begins no row; a final row without one still counts
+    rows = next_row - 1 if stat.st_size and _ends_with_newline(path, stat.st_size) else next_row
+    return {
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "stride": STRIDE,
+        "rows": max(rows, 0),
+        "offsets": offsets,
+    }
+
+
+def _ends_with_newline(path: Path, end: int) -> bool:
+    with path.open("rb") as fh:
+        fh.seek(end - 1)
+        return fh.read(1) == b"\n"
+
+
+def get_row_index(adapter: DatasetAdapter) -> dict:
+    """Load, extend or build the row index for an adapter's file."""
+    path = adapter.path
+    if not adapter.connected:
+        raise FileNotFoundError(f"{adapter.name} dataset not found at: {path}")
+    stat = path.stat()
+    key = str(path)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            try:
+                index = json.loads(_index_path(path).read_text(encoding="utf-8"))
+            except Exception:
+                index = None
+        if index and index["size"] == stat.st_size and index["mtime_ns"] == stat.st_mtime_ns \
+                and index["stride"] == STRIDE:
+            _indexes[key] = index
+            return index
+        index = _build(path, index if index and index["stride"] == STRIDE else None)
+        _indexes[key] = index
+        try:
+            _index_path(path).write_text(json.dumps(index), encoding="utf-8")
+        except OSError:
+            pass  # read-only data directory: keep the in-memory index
+        return index
+
+
+def read_rows(adapter: DatasetAdapter, offset: int, limit: int) -> List[dict]:
+    """Return raw rows [offset, offset + limit) as dicts, reading only the bytes they span."""
+    index = get_row_index(adapter)
+    if offset >= index["rows"] or limit <= 0:
+        return []
+    anchor = offset // index["stride"]
+    with adapter.path.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = mm[:mm.find(b"\n") + 1]
+        start = index["offsets"][anchor]
+        for _ in range(offset - anchor * index["stride"]):
+            start = mm.find(b"\n", start) + 1
+        end = start
+        for _ in range(min(limit, index["rows"] - offset)):
+            nl = mm.find(b"\n", end)
+            end = len(mm) if nl == -1 else nl + 1
+        payload = header + mm[start:end]
+
+    dtypes = {c: ("str" if t == "category" else t) for c, t in adapter.dtypes.items()}
+    df = pd.read_csv(io.BytesIO(payload), dtype=dtypes)
+    df.columns = [c.strip() for c in df.columns]
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    return [
+        {"row_number": row_number, **record}
+        for row_number, record in zip(df.index, df.astype(object).where(df.notna(), None).to_dict("records"))
+    ]
+
+
+def total_rows(adapter: DatasetAdapter) -> int:
+    return get_row_index(adapter)["rows"]
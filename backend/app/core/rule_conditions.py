@@ -0,0 +1,284 @@
+"""
+Rule condition language: parses PolicyRule.condition strings such as
+
+    Amount Paid > 10000
+    Amount Paid % 1000 == 0 AND Amount Paid > 5000
+    Payment Format IN ['Cheque', 'Wire']
+    count(To Account, 24h) > 5
+
+into a small AST, and evaluates it as a vectorised pandas mask over the canonical schema.
+Columns may be written by their IBM display name or canonical name. Amount thresholds
+compare USD-normalized amounts; `%` (round-number checks) uses the payment-currency amount.
+"""
+import re
+from typing import Any, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ConditionError(ValueError):
+    """Raised when a condition cannot be parsed or refers to data the schema lacks."""
+
+
+# Display names (lower-cased) -> canonical columns
+COLUMN_ALIASES = {
+    "timestamp": "timestamp",
+    "from bank": "from_bank",
+    "account": "from_account",
+    "from account": "from_account",
+    "to bank": "to_bank",
+    "account.1": "to_account",
+    "to account": "to_account",
+    "amount received": "amount_received",
+    "receiving currency": "receiving_currency",
+    "amount paid": "amount_paid",
+    "payment currency": "payment_currency",
+    "payment format": "payment_format",
+    "is laundering": "is_laundering",
+}
+# Amount columns compared in USD when the frame carries the normalized column
+USD_COLUMNS = {"amount_paid": "amount_paid_usd", "amount_received": "amount_received_usd"}
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<num>\d+(?:\.\d+)?)(?P<unit>[smhd](?![\w]))?"
+    r"|(?P<str>'[^']*'|\"[^\"]*\")"
+    r"|(?P<op>==|!=|>=|<=|>|<|%|\[|\]|\(|\)|,)"
+    r"|(?P<word>[A-Za-z_][\w.]*))"
+)
+_KEYWORDS = {"and", "or", "in", "count", "true", "false"}
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_COMPARATORS = {"==", "!=", ">", ">=", "<", "<="}
+
+
+def _tokenize(text: str) -> List[Tuple[str, Any]]:
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise ConditionError(f"Unexpected input at: {text[pos:]!r}")
+        pos = m.end()
+        if m.group("num") is not None:
+            value = float(m.group("num"))
+            if m.group("unit"):
+                tokens.append(("duration", value * _UNIT_SECONDS[m.group("unit")]))
+            else:
+                tokens.append(("num", int(value) if value.is_integer() else value))
+        elif m.group("str") is not None:
+            tokens.append(("str", m.group("str")[1:-1]))
+        elif m.group("op") is not None:
+            tokens.append(("op", m.group("op")))
+        else:
+            word = m.group("word")
+            tokens.append(("kw", word.lower()) if word.lower() in _KEYWORDS else ("word", word))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, kind=None, value=None):
+        if self.i >= len(self.tokens):
+            return None
+        tok = self.tokens[self.i]
+        if (kind and tok[0] != kind) or (value is not None and tok[1] != value):
+            return None
+        return tok
+
+    def take(self, kind=None, value=None):
+        tok = self.peek(kind, value)
+        if tok is None:
+            found = self.tokens[self.i] if self.i < len(self.tokens) else "end of condition"
+            raise ConditionError(f"Expected {value or kind or 'an operand'}, found {found}")
+        self.i += 1
+        return tok
+
+    def parse(self):
+        node = self.disjunction()
+        if self.i != len(self.tokens):
+            raise ConditionError(f"Unexpected trailing input: {self.tokens[self.i]}")
+        return node
+
+    def disjunction(self):
+        parts = [self.conjunction()]
+        while self.peek("kw", "or"):
+            self.take()
+            parts.append(self.conjunction())
+        return parts[0] if len(parts) == 1 else ("or", parts)
+
+    def conjunction(self):
+        parts = [self.clause()]
+        while self.peek("kw", "and"):
+            self.take()
+            parts.append(self.clause())
+        return parts[0] if len(parts) == 1 else ("and", parts)
+
+    def clause(self):
+        if self.peek("op", "("):
+            self.take()
+            node = self.disjunction()
+            self.take("op", ")")
+            return node
+        left = self.operand()
+        if self.peek("kw", "in"):
+            self.take()
+            self.take("op", "[")
+            values = [self.literal()]
+            while self.peek("op", ","):
+                self.take()
+                values.append(self.literal())
+            self.take("op", "]")
+            return ("in", left, values)
+        op = self.take("op")[1]
+        if op not in _COMPARATORS:
+            raise ConditionError(f"Expected a comparison, found {op!r}")
+        return ("cmp", op, left, self.operand())
+
+    def operand(self):
+        if self.peek("kw", "count"):
+            self.take()
+            self.take("op", "(")
+            column = self.column()
+            self.take("op", ",")
+            window = self.take("duration")[1]
+            self.take("op", ")")
+            node = ("count", column, window)
+        elif self.peek("word"):
+            node = self.column()
+        else:
+            node = ("lit", self.literal())
+        if self.peek("op", "%"):
+            self.take()
+            node = ("mod", node, self.take("num")[1])
+        return node
+
+    def column(self):
+        words = [self.take("word")[1]]
+        while self.peek("word"):
+            words.append(self.take()[1])
+        name = " ".join(words)
+        canonical = COLUMN_ALIASES.get(name.lower(), name if name in COLUMN_ALIASES.values() else None)
+        if canonical is None:
+            raise ConditionError(f"Unknown column: {name!r}")
+        return ("col", canonical)
+
+    def literal(self):
+        tok = self.take()
+        if tok[0] in ("num", "str"):
+            return tok[1]
+        if tok == ("kw", "true"):
+            return True
+        if tok == ("kw", "false"):
+            return False
+        raise ConditionError(f"Expected a literal, found {tok}")
+
+
+def parse_condition(condition: str):
+    """Parse a condition string into its AST (nested tuples)."""
+    return _Parser(_tokenize(condition)).parse()
+
+
+def is_row_local(node) -> bool:
+    """False when the condition aggregates across rows (e.g. windowed counts)."""
+    kind = node[0]
+    if kind == "count":
+        return False
+    if kind in ("and", "or"):
+        return all(is_row_local(n) for n in node[1])
+    if kind == "cmp":
+        return is_row_local(node[2]) and is_row_local(node[3])
+    if kind in ("in", "mod"):
+        return is_row_local(node[1])
+    return True
+
+
+# ---------------------------------------------------------------------------
+# pandas evaluation
+# ---------------------------------------------------------------------------
+
+def _column(df: pd.DataFrame, name: str, raw: bool = False) -> pd.Series:
+    if not raw and name in USD_COLUMNS and USD_COLUMNS[name] in df:
+        return df[USD_COLUMNS[name]]
+    return df[name]
+
+
+def window_counts(df: pd.DataFrame, column: str, window_seconds: float) -> pd.Series:
+    """
+    Transfers from the same sender to the same `column` value whose timestamp lies within
+    [t - window, t] of each row's timestamp t (rows sharing t count each other), aligned to df.
+    """
+    groups = df.groupby(["from_account", column], sort=False, observed=True).ngroup().to_numpy(np.int64)
+    seconds = pd.to_datetime(df["timestamp"]).to_numpy("datetime64[s]").astype(np.int64)
+    seconds = seconds - seconds.min() if len(seconds) else seconds
+    # One sortable key per row: group in the high bits, seconds since the first row in the low bits
+    keys = (groups << np.int64(34)) + seconds
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    lower = np.searchsorted(sorted_keys, sorted_keys - np.int64(window_seconds), side="left")
+    upper = np.searchsorted(sorted_keys, sorted_keys, side="right")
+    counts = np.empty(len(keys), dtype=np.int64)
+    counts[order] = upper - lower
+    return pd.Series(counts, index=df.index)
+
+
+def _value(node, df: pd.DataFrame):
+    kind = node[0]
+    if kind == "col":
+        return _column(df, node[1])
+    if kind == "lit":
+        return node[1]
+    if kind == "mod":
+        inner = node[1]
+        base = _column(df, inner[1], raw=True) if inner[0] == "col" else _value(inner, df)
+        return base % node[2]
+    if kind == "count":
+        return window_counts(df, node[1][1], node[2])
+    raise ConditionError(f"Not a value: {node}")
+
+
+def _compare(left, op: str, right):
+    if op == "==":
+        return left == right
+    if op == "!=":
+        return left != right
+    if op == ">":
+        return left > right
+    if op == ">=":
+        return left >= right
+    if op == "<":
+        return left < right
+    return left <= right
+
+
+def evaluate(node, df: pd.DataFrame) -> pd.Series:
+    """Evaluate a parsed condition to a boolean mask aligned with df."""
+    kind = node[0]
+    if kind == "and":
+        return np.logical_and.reduce([evaluate(n, df) for n in node[1]])
+    if kind == "or":
+        return np.logical_or.reduce([evaluate(n, df) for n in node[1]])
+    if kind == "in":
+        values = _value(node[1], df)
+        wanted = {str(v).lower() for v in node[2]}
+        return values.astype(str).str.lower().isin(wanted) if isinstance(values, pd.Series) \
+            else pd.Series(str(values).lower() in wanted, index=df.index)
+    if kind == "cmp":
+        left, right = _value(node[2], df), _value(node[3], df)
+        if isinstance(left, pd.Series) and isinstance(right, pd.Series) \
+                and isinstance(left.dtype, pd.CategoricalDtype) \
+                and not (isinstance(right.dtype, pd.CategoricalDtype)
+                         and left.cat.categories.equals(right.cat.categories)):
+            left, right = left.astype(str), right.astype(str)
+        result = _compare(left, node[1], right)
+        if not isinstance(result, pd.Series):
+            result = pd.Series(bool(result), index=df.index)
+        return result.fillna(False).astype(bool)
+    raise ConditionError(f"Not a boolean expression: {node}")
+
+
+def condition_mask(condition: str, df: pd.DataFrame) -> pd.Series:
+    """Parse and evaluate a condition string against a canonical frame."""
+    return pd.Series(np.asarray(evaluate(parse_condition(condition), df), dtype=bool), index=df.index)
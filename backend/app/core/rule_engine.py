@@ -2,21 +2,41 @@
 Rule engine: loads, stores, and manages compliance rules from storage.
 """
 import json
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from app.core import activity_log
+from app.core.store_versions import mark_changed
 from app.models.rule import PolicyRule
 
 RULES_FILE = Path(__file__).parent.parent / "storage" / "rules.json"
 
+# Serialises read-modify-write cycles on rules.json (ingestion jobs run in worker threads)
+_lock = threading.Lock()
+_cache: Optional[Tuple[tuple, List[PolicyRule]]] = None  # (generation + file signature, parsed rules)
+# Bumped by every save_rules: an in-process write invalidates the cache even when the
+# rewrite keeps the file's size and lands within the same mtime tick
+_generation = 0
+
+
+def _parsed_rules() -> List[PolicyRule]:
+    """Rules parsed from rules.json, re-read after a save or when the file changes."""
+    global _cache
+    generation = _generation  # read before the file, so a concurrent save cannot be cached under it
+    stat = RULES_FILE.stat()
+    signature = (generation, stat.st_mtime_ns, stat.st_size)
+    cached = _cache
+    if cached and cached[0] == signature:
+        return cached[1]
+    rules = [PolicyRule(**r) for r in json.loads(RULES_FILE.read_text(encoding="utf-8"))]
+    _cache = (signature, rules)
+    return rules
+
 
 def get_rules(approved_only: bool = False) -> List[PolicyRule]:
-    """Load all rules from storage."""
+    """Load all rules from storage (copies; callers may modify them)."""
     try:
-        data = json.loads(RULES_FILE.read_text(encoding="utf-8"))
-        rules = [PolicyRule(**r) for r in data]
-        if approved_only:
-            rules = [r for r in rules if r.approved]
-        return rules
+        return [r.model_copy() for r in _parsed_rules() if r.approved or not approved_only]
     except Exception:
         return []
 
@@ -28,52 +48,85 @@ def get_rule_by_id(rule_id: str) -> Optional[PolicyRule]:
 
 def save_rules(rules: List[PolicyRule]) -> None:
     """Persist rules to storage."""
+    global _cache, _generation
     RULES_FILE.write_text(
         json.dumps([r.model_dump() for r in rules], indent=2),
         encoding="utf-8"
     )
+    mark_changed("rules")
+    _generation += 1
+    _cache = None
+
+
+def rule_key(rule: PolicyRule) -> Tuple[str, str, str]:
+    """Normalized (condition, category, severity) identity of a rule."""
+    condition = " ".join(rule.condition.lower().split())
+    return condition, rule.category.strip().lower(), rule.severity
+
+
+def _key_index(rules: List[PolicyRule]) -> Dict[Tuple[str, str, str], PolicyRule]:
+    index: Dict[Tuple[str, str, str], PolicyRule] = {}
+    for r in rules:
+        index.setdefault(rule_key(r), r)
+    return index
 
 
 def add_rules(new_rules: List[PolicyRule]) -> List[PolicyRule]:
-    """Add new rules (from extraction), avoiding duplicates by id."""
-    existing = get_rules()
-    existing_ids = {r.id for r in existing}
-    to_add = [r for r in new_rules if r.id not in existing_ids]
-    all_rules = existing + to_add
-    save_rules(all_rules)
+    """
+    Add new rules (from extraction), avoiding duplicates by id and by
+    normalized (condition, category, severity) key.
+    """
+    with _lock:
+        existing = get_rules()
+        existing_ids = {r.id for r in existing}
+        index = _key_index(existing)
+        to_add = []
+        for r in new_rules:
+            key = rule_key(r)
+            if r.id in existing_ids or key in index:
+                continue
+            index[key] = r
+            to_add.append(r)
+        if to_add:
+            save_rules(existing + to_add)
     return to_add
 
 
-def approve_rule(rule_id: str, approved: bool = True) -> Optional[PolicyRule]:
-    """Approve or unapprove a rule."""
-    rules = get_rules()
-    for rule in rules:
-        if rule.id == rule_id:
-            rule.approved = approved
-            save_rules(rules)
-            return rule
+def approve_rule(rule_id: str, approved: bool = True, actor: str = "unknown") -> Optional[PolicyRule]:
+    """Approve or unapprove a rule (recorded in the activity log under `actor`)."""
+    with _lock:
+        rules = get_rules()
+        for rule in rules:
+            if rule.id == rule_id:
+                rule.approved = approved
+                save_rules(rules)
+                activity_log.record("rule_approved" if approved else "rule_unapproved", actor,
+                                    rule_id=rule.id, rule_name=rule.description, severity=rule.severity)
+                return rule
     return None
 
 
 def update_rule(rule_id: str, updates: dict) -> Optional[PolicyRule]:
     """Update fields on a rule."""
-    rules = get_rules()
-    for rule in rules:
-        if rule.id == rule_id:
-            for k, v in updates.items():
-                if hasattr(rule, k):
-                    setattr(rule, k, v)
-            save_rules(rules)
-            return rule
+    with _lock:
+        rules = get_rules()
+        for rule in rules:
+            if rule.id == rule_id:
+                for k, v in updates.items():
+                    if hasattr(rule, k):
+                        setattr(rule, k, v)
+                save_rules(rules)
+                return rule
     return None
 
 
 def delete_rule(rule_id: str) -> bool:
     """Delete a rule by ID."""
-    rules = get_rules()
-    original_len = len(rules)
-    rules = [r for r in rules if r.id != rule_id]
-    if len(rules) < original_len:
-        save_rules(rules)
-        return True
+    with _lock:
+        rules = get_rules()
+        original_len = len(rules)
+        rules = [r for r in rules if r.id != rule_id]
+        if len(rules) < original_len:
+            save_rules(rules)
+            return True
     return False
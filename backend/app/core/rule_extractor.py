@@ -2,9 +2,10 @@
 Rule extractor: parses raw policy text and maps keywords to structured compliance rules.
 Works without an LLM — uses pattern matching on known AML/GDPR terminology.
 """
-import re
 import uuid
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.gdpr_search import best_articles
+from app.core.keyword_matcher import KeywordAutomaton, SentenceIndex, StreamingHits, first_hits
 from app.models.rule import PolicyRule
 
 
@@ -80,21 +81,55 @@ _GDPR_RULE_TEMPLATES = [
 ]
 
 
+_ALL_TEMPLATES = _AML_RULE_TEMPLATES + _GDPR_RULE_TEMPLATES
+
+# Built once: a single automaton over every template keyword
+_AUTOMATON = KeywordAutomaton(kw for t in _ALL_TEMPLATES for kw in t["keywords"])
+_TEMPLATE_KEYWORD_IDS = [
+    [_AUTOMATON.keyword_id(kw) for kw in t["keywords"]] for t in _ALL_TEMPLATES
+]
+
+
 def extract_rules_from_text(policy_text: str, policy_id: str, source_name: str) -> List[PolicyRule]:
     """
     Extract compliance rules from raw policy text using keyword matching.
     Returns a list of PolicyRule objects awaiting human approval.
     """
-    text_lower = policy_text.lower()
-    extracted: List[PolicyRule] = []
+    # One pass over the text finds every keyword of every template
+    first_offset, first_sentence = first_hits(_AUTOMATON, policy_text)
+    return _rules_from_hits(first_offset, first_sentence, lambda: SentenceIndex(policy_text),
+                            policy_id, source_name)
+
 
-    all_templates = _AML_RULE_TEMPLATES + _GDPR_RULE_TEMPLATES
+def extract_rules_from_pages(pages: Iterable[str], policy_id: str,
+                             source_name: str) -> Tuple[str, List[PolicyRule]]:
+    """
+    extract_rules_from_text over page texts consumed as they arrive (e.g. from
+    pdf_parser.iter_pdf_text), so the keyword pass overlaps with parsing. Returns the
+    joined text ("\n" between pages) and the same rules extract_rules_from_text gives for it.
+    """
+    hits = StreamingHits(_AUTOMATON, separator="\n")
+    for page in pages:
+        hits.feed(page)
+    text, first_offset, first_sentence, sentences = hits.finish()
+    return text, _rules_from_hits(first_offset, first_sentence, lambda: sentences, policy_id, source_name)
+
+
+def _rules_from_hits(first_offset: Dict[int, int], first_sentence: Dict[int, int], sentence_index,
+                     policy_id: str, source_name: str) -> List[PolicyRule]:
+    """One rule per template with a keyword hit; `sentence_index` builds the SentenceIndex on demand."""
+    extracted: List[PolicyRule] = []
+    sentences: Optional[SentenceIndex] = None
 
-    for template in all_templates:
+    for template, kw_ids in zip(_ALL_TEMPLATES, _TEMPLATE_KEYWORD_IDS):
         # Check if any keyword appears in the policy text
-        if any(kw in text_lower for kw in template["keywords"]):
-            # Find the most relevant sentence for source reference
-            source_ref = _find_source_sentence(policy_text, template["keywords"])
+        if any(k in first_offset for k in kw_ids):
+            # Source reference: first sentence holding the earliest-listed keyword that occurs
+            source_ref = ""
+            sentence_idx = next((first_sentence[k] for k in kw_ids if k in first_sentence), None)
+            if sentence_idx is not None:
+                sentences = sentences or sentence_index()
+                source_ref = _clean_sentence(sentences.sentence(sentence_idx))
             rule = PolicyRule(
                 id=f"{template['id_prefix']}-{uuid.uuid4().hex[:6]}",
                 description=template["description"],
@@ -105,18 +140,15 @@ def extract_rules_from_text(policy_text: str, policy_id: str, source_name: str)
                 approved=False,
                 policy_id=policy_id,
             )
+            if template in _GDPR_RULE_TEMPLATES:
+                # Link to the regulation text itself, not just the uploaded policy
+                rule.article_refs = best_articles(f"{template['description']} {source_ref}")
             extracted.append(rule)
 
     return extracted
 
 
-def _find_source_sentence(text: str, keywords: List[str]) -> str:
-    """Find the sentence in the text most relevant to the given keywords."""
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    for kw in keywords:
-        for sentence in sentences:
-            if kw.lower() in sentence.lower():
-                # Return a truncated version
-                clean = sentence.strip().replace('\n', ' ')
-                return clean[:150] + ('...' if len(clean) > 150 else '')
-    return ""
+def _clean_sentence(sentence: str) -> str:
+    """Flatten and truncate a sentence for use as a source reference."""
+    clean = sentence.strip().replace('\n', ' ')
+    return clean[:150] + ('...' if len(clean) > 150 else '')
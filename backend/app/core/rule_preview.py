@@ -0,0 +1,200 @@
+"""
+Dry-run preview of a rule before approval.
+
+Row-local rules are evaluated on a stratified random sample of the cached transaction
+frame (strata = payment format, proportional allocation with a per-stratum floor), and
+hit counts are extrapolated with the stratified estimator and a 95% confidence interval.
+Rules that aggregate across rows (windowed / pair counts), or `exact=True`, are evaluated
+on the full columnar frame instead.
+"""
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.dataset_adapters import frame_signature
+from app.core.feature_store import get_feature_store
+from app.core.rule_conditions import ConditionError, is_row_local, parse_condition
+from app.core.rule_engine import get_rules
+from app.core.violation_engine import BUILTIN_RULES, build_evidence, load_transactions, rule_mask
+from app.models.rule import PolicyRule
+
+STRATIFY_BY = "payment_format"
+MIN_PER_STRATUM = 30
+MAX_EXAMPLES = 5
+_Z95 = 1.96
+
+_strata: Dict[str, tuple] = {}       # dataset_id -> (frame signature, strata)
+_full_masks: Dict[tuple, tuple] = {}  # (dataset_id, rule_id, condition) -> (frame signature, mask)
+_lock = threading.Lock()
+
+
+def _row_local(rule: PolicyRule) -> bool:
+    """Raises ConditionError when a non-builtin rule's condition cannot be compiled."""
+    if rule.id in BUILTIN_RULES:
+        return rule.id != "aml-002"
+    return is_row_local(parse_condition(rule.condition))
+
+
+def _get_strata(dataset_id: str, df: pd.DataFrame) -> dict:
+    """Row positions grouped by stratum; computed once per loaded frame."""
+    signature = frame_signature(df)
+    with _lock:
+        cached = _strata.get(dataset_id)
+        if cached and cached[0] == signature:
+            return cached[1]
+    labels = df[STRATIFY_BY].astype("category")
+    codes = labels.cat.codes.to_numpy()
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(labels.cat.categories) + 1), side="left")
+    strata = {
+        "names": [str(c) for c in labels.cat.categories],
+        "order": order,
+        "bounds": bounds,
+        # Rows with a missing stratum value sort first (code -1) and form their own stratum
+        "missing": int(bounds[0]),
+    }
+    with _lock:
+        _strata[dataset_id] = (signature, strata)
+    return strata
+
+
+def _full_mask(dataset_id: str, rule: PolicyRule, df: pd.DataFrame) -> np.ndarray:
+    """Full-frame mask for a rule, cached per loaded frame (used for cross-row rules)."""
+    key, signature = (dataset_id, rule.id, rule.condition), frame_signature(df)
+    with _lock:
+        cached = _full_masks.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    features = None if _row_local(rule) else get_feature_store(dataset_id, frame=df)
+    mask = rule_mask(rule.id, df, rule.condition, features)[0].to_numpy(dtype=bool)
+    with _lock:
+        # Masks computed against an older frame of this dataset are dead weight
+        for stale in [k for k, (frame, _) in _full_masks.items() if k[0] == dataset_id and frame != signature]:
+            del _full_masks[stale]
+        _full_masks[key] = (signature, mask)
+    return mask
+
+
+def _allocate(strata: dict, sample_size: int, rng: np.random.Generator) -> List[dict]:
+    """Proportional allocation with a floor, sampled without replacement within each stratum."""
+    bounds, order = strata["bounds"], strata["order"]
+    spans = [("(missing)", 0, strata["missing"])] if strata["missing"] else []
+    spans += [(name, bounds[i], bounds[i + 1]) for i, name in enumerate(strata["names"])]
+    total = len(order)
+    allocated = []
+    for name, lo, hi in spans:
+        population = int(hi - lo)
+        if population == 0:
+            continue
+        n = min(population, max(MIN_PER_STRATUM, round(sample_size * population / total)))
+        picks = rng.choice(population, size=n, replace=False) if n < population else np.arange(population)
+        allocated.append({"name": name, "population": population, "positions": np.sort(order[lo + picks])})
+    return allocated
+
+
+def _estimate(hits: np.ndarray, sampled: np.ndarray, population: np.ndarray) -> dict:
+    """Stratified total with a normal-approximation 95% CI (rule of three when no hits were seen)."""
+    p = hits / sampled
+    estimate = float((population * p).sum())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_h = population ** 2 * (1 - sampled / population) * p * (1 - p) / (sampled - 1)
+    variance = float(np.nansum(np.where(sampled > 1, var_h, 0.0)))
+    half_width = _Z95 * variance ** 0.5
+    lower, upper = estimate - half_width, estimate + half_width
+    if hits.sum() == 0:
+        upper = float((population * np.minimum(3 / sampled, 1)).sum())
+    total = float(population.sum())
+    return {"estimate": estimate, "lower": max(lower, 0.0), "upper": min(upper, total)}
+
+
+def preview_rule(rule: PolicyRule, dataset_id: str = "ibm-aml", sample_size: int = 20_000,
+                 exact: bool = False, seed: int = 0) -> dict:
+    """
+    Estimate how often a (possibly unapproved) rule would fire on a dataset.
+    Raises ConditionError if the rule's condition cannot be evaluated against the schema.
+    """
+    row_local = _row_local(rule)
+    df = load_transactions(dataset_id)
+    total = len(df)
+    approved = [r for r in get_rules(approved_only=True) if r.id != rule.id and _evaluable(r)]
+
+    if exact or not row_local or total <= sample_size:
+        mask = _full_mask(dataset_id, rule, df)
+        hits = int(mask.sum())
+        flagged = np.flatnonzero(mask)
+        overlap = {r.id: int((mask & _approved_mask(dataset_id, r, df, None)).sum()) for r in approved}
+        result = {
+            "method": "exact",
+            "estimated_hits": hits,
+            "confidence_interval": [hits, hits],
+            "evaluated_rows": total,
+            "strata": None,
+        }
+        examples = df.iloc[flagged[:MAX_EXAMPLES]]
+    else:
+        rng = np.random.default_rng(seed)
+        allocated = _allocate(_get_strata(dataset_id, df), sample_size, rng)
+        positions = np.concatenate([s["positions"] for s in allocated])
+        weights = np.concatenate([np.full(len(s["positions"]), s["population"] / len(s["positions"]))
+                                  for s in allocated])
+        sample = df.iloc[positions]
+        mask = rule_mask(rule.id, sample, rule.condition)[0].to_numpy(dtype=bool)
+
+        bounds = np.cumsum([0] + [len(s["positions"]) for s in allocated])
+        hits_h = np.array([mask[bounds[i]:bounds[i + 1]].sum() for i in range(len(allocated))], dtype=np.float64)
+        sampled_h = np.array([len(s["positions"]) for s in allocated], dtype=np.float64)
+        population_h = np.array([s["population"] for s in allocated], dtype=np.float64)
+        estimate = _estimate(hits_h, sampled_h, population_h)
+
+        overlap = {r.id: round(float(weights[mask & _approved_mask(dataset_id, r, sample, positions)].sum()))
+                   for r in approved}
+        result = {
+            "method": "stratified_sample",
+            "estimated_hits": round(estimate["estimate"]),
+            "confidence_interval": [round(estimate["lower"]), round(estimate["upper"])],
+            "evaluated_rows": len(positions),
+            "sampled_hits": int(mask.sum()),
+            "strata": [
+                {"stratum": s["name"], "population": s["population"], "sampled": int(n),
+                 "sampled_hits": int(h), "estimated_hits": round(s["population"] * h / n)}
+                for s, n, h in zip(allocated, sampled_h, hits_h)
+            ],
+        }
+        examples = sample[mask].head(MAX_EXAMPLES)
+
+    hits = max(result["estimated_hits"], 1)
+    return {
+        "rule_id": rule.id,
+        "condition": rule.condition,
+        "dataset": dataset_id,
+        "total_transactions": total,
+        **result,
+        "estimated_hit_rate": round(result["estimated_hits"] / max(total, 1), 6),
+        "examples": [build_evidence(row, dataset_id) for _, row in examples.iterrows()],
+        "overlap_with_approved": sorted(
+            ({"rule_id": rid, "estimated_overlap": n, "share_of_hits": round(n / hits, 4)}
+             for rid, n in overlap.items() if n),
+            key=lambda o: -o["estimated_overlap"],
+        ),
+    }
+
+
+def _evaluable(rule: PolicyRule) -> bool:
+    try:
+        _row_local(rule)
+        return True
+    except ConditionError:
+        return False
+
+
+def _approved_mask(dataset_id: str, rule: PolicyRule, frame: pd.DataFrame,
+                   positions: Optional[np.ndarray]) -> np.ndarray:
+    """An approved rule's mask over `frame` (the full frame, or the sample at `positions`)."""
+    if positions is None:
+        return _full_mask(dataset_id, rule, frame)
+    if _row_local(rule):
+        return rule_mask(rule.id, frame, rule.condition)[0].to_numpy(dtype=bool)
+    # Cross-row rules must see the whole frame; the full mask is cached per frame
+    return _full_mask(dataset_id, rule, load_transactions(dataset_id))[positions]
@@ -1,14 +1,18 @@
 """
 Scheduler: periodic compliance scan using APScheduler.
-The scheduler runs a scan every 24 hours and can be triggered manually.
+The scheduler runs a scan every 24 hours and can be triggered manually, and advances
+the GDPR deadline wheel every minute.
 """
 import logging
 from datetime import datetime, timezone
 
+from app.core.deadlines import TICK_SECONDS, get_engine, run_deadline_tick
+from app.core.metrics import ScanMetrics, last_scan
+
 logger = logging.getLogger("nitilens.scheduler")
 
 _scheduler = None
-_last_run: dict = {"timestamp": None, "violations_found": 0}
+_last_run: dict = {"timestamp": None, "violations_found": 0, "metrics": None}
 
 
 def start_scheduler():
@@ -24,8 +28,15 @@ def start_scheduler():
             id="daily_aml_scan",
             replace_existing=True,
         )
+        _scheduler.add_job(
+            _run_deadline_tick,
+            trigger="interval",
+            seconds=TICK_SECONDS,
+            id="gdpr_deadline_tick",
+            replace_existing=True,
+        )
         _scheduler.start()
-        logger.info("APScheduler started — daily AML scan scheduled.")
+        logger.info("APScheduler started — daily AML scan and GDPR deadline ticks scheduled.")
     except ImportError:
         logger.warning("APScheduler not installed. Periodic scanning disabled.")
     except Exception as e:
@@ -44,17 +55,27 @@ def _run_scheduled_scan():
     """Callback executed by the scheduler."""
     global _last_run
     try:
-        from app.core.violation_engine import run_scan
-        violations = run_scan()
+        from app.core.violation_engine import DEFAULT_DATASET, run_scan
+        metrics = ScanMetrics(DEFAULT_DATASET)
+        violations = run_scan(DEFAULT_DATASET, metrics, actor="scheduler")
         _last_run = {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "violations_found": len(violations),
+            "metrics": metrics.as_dict(),
         }
         logger.info(f"Scheduled scan complete — {len(violations)} violations found.")
     except Exception as e:
         logger.error(f"Scheduled scan failed: {e}")
 
 
+def _run_deadline_tick():
+    """Callback executed by the scheduler every deadline-wheel tick."""
+    try:
+        run_deadline_tick()
+    except Exception as e:
+        logger.error(f"GDPR deadline tick failed: {e}")
+
+
 def get_scheduler_status() -> dict:
     """Return scheduler status and last run info."""
     return {
@@ -65,4 +86,7 @@ def get_scheduler_status() -> dict:
             else None
         ),
         "last_run": _last_run,
+        # Most recent scan from any trigger (scheduled or POST /api/compliance/scan)
+        "last_scan_metrics": last_scan(),
+        "gdpr_deadlines": get_engine().status(),
     }
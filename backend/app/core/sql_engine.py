@@ -0,0 +1,375 @@
+"""
+SQL rule engine: evaluates approved rules on an embedded SQLite copy of a dataset, for
+datasets too large to scan as one in-memory frame.
+
+Each dataset is mirrored into storage/sql/<dataset>.sqlite by streaming the adapter's
+canonical chunks (USD columns included), and rebuilt when the file or the FX table
+changes. Builtin rules have hand-written SQL; extracted rules have their condition AST
+(see rule_conditions) translated to a WHERE clause, with count(column, window) becoming
+a COUNT(*) window over (sender, column) ordered by timestamp with a RANGE frame that
+matches window_counts. Indexes back the threshold filters and the window partitions.
+
+Rules run concurrently, one read-only connection each (SQLite releases the GIL while a
+query runs), and return row numbers. Only the flagged rows are then read back as a
+canonical frame, so the scan never holds the whole dataset in memory. Select this
+engine with NITILENS_SCAN_ENGINE=sql.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.dataset_adapters import CATEGORICAL_COLUMNS, get_adapter
+from app.core.fx import add_usd_columns, merge_unconverted, rates_signature
+from app.core.rule_conditions import ConditionError, USD_COLUMNS, parse_condition
+
+logger = logging.getLogger("nitilens.sql_engine")
+
+SQL_DIR = Path(__file__).parent.parent / "storage" / "sql"
+THREADS = int(os.getenv("NITILENS_SQL_THREADS", str(min(8, os.cpu_count() or 1))))
+CACHE_KIB = int(os.getenv("NITILENS_SQL_CACHE_KIB", "262144"))  # page cache per connection
+INSERT_CHUNK_ROWS = 200_000
+
+COLUMNS = [
+    ("row_number", "INTEGER PRIMARY KEY"),
+    ("timestamp", "INTEGER"),        # epoch nanoseconds (exact round-trip)
+    ("ts_s", "INTEGER"),             # epoch seconds, the window ordering key
+    ("from_bank", "INTEGER"),
+    ("from_account", "TEXT"),
+    ("to_bank", "INTEGER"),
+    ("to_account", "TEXT"),
+    ("amount_received", "REAL"),
+    ("receiving_currency", "TEXT"),
+    ("amount_paid", "REAL"),
+    ("payment_currency", "TEXT"),
+    ("payment_format", "TEXT"),
+    ("is_laundering", "INTEGER"),
+    ("amount_paid_usd", "REAL"),
+    ("amount_received_usd", "REAL"),
+]
+FRAME_COLUMNS = [name for name, _ in COLUMNS if name not in ("row_number", "ts_s")]
+INDEXES = {
+    "ix_pair_time": ("from_account", "to_account", "ts_s"),
+    "ix_paid_usd": ("amount_paid_usd",),
+}
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _mod(expr: str, divisor: float) -> str:
+    """Floored modulo on REAL values, as pandas computes it (SQLite's % works on integers)."""
+    d = repr(float(divisor))
+    quotient = f"({expr} / {d})"
+    floor = f"(CAST({quotient} AS INTEGER) - ({quotient} < 0 AND CAST({quotient} AS INTEGER) != {quotient}))"
+    return f"({expr} - {d} * {floor})"
+
+
+# Builtin rules as (WHERE clause, window columns), flagging exactly what rule_mask flags
+BUILTIN_SQL = {
+    "aml-001": ("amount_paid_usd > 10000", []),
+    # Transfers per (sender, receiver) pair over the whole dataset, as the feature store counts them
+    "aml-002": ("w0 >= 2", ["COUNT(*) OVER (PARTITION BY from_account, to_account) AS w0"]),
+    "aml-003": (f"{_mod('amount_paid', 1000)} = 0 AND amount_paid_usd > 5000", []),
+    "aml-004": ("payment_currency IS NOT receiving_currency", []),
+    "aml-005": ("is_laundering = 1", []),
+    "aml-006": ("amount_paid_usd > 50000 AND lower(payment_format) IN ('cheque', 'wire')", []),
+}
+
+
+# ---------------------------------------------------------------------------
+# Condition AST -> SQL
+# ---------------------------------------------------------------------------
+
+class _Translator:
+    """Translates one parsed condition; window counts are collected as select columns."""
+
+    def __init__(self):
+        self.params: List = []
+        self.windows: List[str] = []
+
+    def predicate(self, node) -> str:
+        kind = node[0]
+        if kind in ("and", "or"):
+            return "(" + f" {kind.upper()} ".join(self.predicate(n) for n in node[1]) + ")"
+        if kind == "in":
+            self.params.extend(str(v).lower() for v in node[2])
+            marks = ", ".join("?" * len(node[2]))
+            return f"lower({self._value(node[1])}) IN ({marks})"
+        if kind == "cmp":
+            op, left, right = node[1], node[2], node[3]
+            left_sql, right_sql = self._value(left, right), self._value(right, left)
+            if op == "!=":
+                # pandas treats missing != x as true; IS NOT does the same
+                return f"({left_sql} IS NOT {right_sql})"
+            return f"COALESCE({left_sql} {'=' if op == '==' else op} {right_sql}, 0)"
+        raise ConditionError(f"Not a boolean expression: {node}")
+
+    def _value(self, node, other=None) -> str:
+        kind = node[0]
+        if kind == "col":
+            return USD_COLUMNS.get(node[1], node[1])
+        if kind == "lit":
+            value = node[1]
+            if other is not None and other == ("col", "timestamp") and isinstance(value, str):
+                value = pd.Timestamp(value).value  # timestamps are stored as epoch ns
+            elif isinstance(value, bool):
+                value = int(value)
+            self.params.append(value)
+            return "?"
+        if kind == "mod":
+            inner = node[1]
+            base = inner[1] if inner[0] == "col" else self._value(inner)
+            return _mod(base, node[2])
+        if kind == "count":
+            column, seconds = node[1][1], int(node[2])
+            alias = f"w{len(self.windows)}"
+            self.windows.append(
+                f"COUNT(*) OVER (PARTITION BY from_account, {column} ORDER BY ts_s "
+                f"RANGE BETWEEN {seconds} PRECEDING AND CURRENT ROW) AS {alias}"
+            )
+            return alias
+        raise ConditionError(f"Not a value: {node}")
+
+
+def rule_query(rule_id: str, condition: Optional[str]) -> Tuple[str, list]:
+    """SELECT of the row numbers a rule flags, with its parameters."""
+    if rule_id in BUILTIN_SQL:
+        (where, windows), params = BUILTIN_SQL[rule_id], []
+    else:
+        if not condition:
+            raise ConditionError(f"Rule {rule_id} has no condition to evaluate")
+        translator = _Translator()
+        where = translator.predicate(parse_condition(condition))
+        params, windows = translator.params, translator.windows
+    if windows:
+        inner = f"SELECT *, {', '.join(windows)} FROM transactions"
+        return f"SELECT row_number FROM ({inner}) WHERE {where} ORDER BY row_number", params
+    return f"SELECT row_number FROM transactions WHERE {where} ORDER BY row_number", params
+
+
+def _window_columns(condition: Optional[str]) -> List[str]:
+    """Partition columns of the count(...) windows in a condition (for indexing)."""
+    found: List[str] = []
+
+    def walk(node):
+        if not isinstance(node, tuple):
+            return
+        if node and node[0] == "count":
+            found.append(node[1][1])
+        for child in node[1:]:
+            if isinstance(child, list):
+                for item in child:
+                    walk(item)
+            else:
+                walk(child)
+
+    if condition:
+        try:
+            walk(parse_condition(condition))
+        except ConditionError:
+            pass
+    return found
+
+
+# ---------------------------------------------------------------------------
+# Dataset mirror
+# ---------------------------------------------------------------------------
+
+def db_path(dataset_id: str) -> Path:
+    return SQL_DIR / f"{dataset_id}.sqlite"
+
+
+def _connect(path: Path, read_only: bool = False) -> sqlite3.Connection:
+    if read_only:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+    conn.execute("PRAGMA temp_store = FILE")  # window sorts spill to disk rather than RAM
+    conn.execute(f"PRAGMA threads = {THREADS}")
+    return conn
+
+
+def _signature(adapter) -> dict:
+    stat = adapter.path.stat()
+    return {"path": str(adapter.path.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "fx": list(rates_signature() or [])}
+
+
+def _lock_for(dataset_id: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(dataset_id, threading.Lock())
+
+
+def _stored_signature(path: Path) -> Optional[dict]:
+    try:
+        conn = _connect(path, read_only=True)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+    except sqlite3.Error:
+        return None
+
+
+def sync(dataset_id: str) -> int:
+    """Bring the dataset's SQLite mirror up to date with its file; returns its row count."""
+    adapter = get_adapter(dataset_id)
+    if not adapter.connected:
+        raise FileNotFoundError(f"{adapter.name} dataset not found at: {adapter.path}")
+    path = db_path(dataset_id)
+    with _lock_for(dataset_id):
+        signature = _signature(adapter)
+        if path.exists() and _stored_signature(path) == signature:
+            return row_count(dataset_id)
+        SQL_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".sqlite.tmp")
+        tmp.unlink(missing_ok=True)
+        conn = _connect(tmp)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(f"CREATE TABLE transactions ({', '.join(f'{n} {t}' for n, t in COLUMNS)})")
+            insert = f"INSERT INTO transactions VALUES ({', '.join('?' * len(COLUMNS))})"
+            rows = 0
+            unconverted: dict = {}
+            for chunk in adapter.iter_chunks(chunk_rows=INSERT_CHUNK_ROWS):
+                chunk = add_usd_columns(chunk)
+                merge_unconverted(unconverted, chunk.attrs["fx_unconverted"])
+                conn.executemany(insert, _records(chunk))
+                rows += len(chunk)
+            for name, columns in INDEXES.items():
+                conn.execute(f"CREATE INDEX {name} ON transactions ({', '.join(columns)})")
+            conn.execute("INSERT INTO meta VALUES ('signature', ?)", (json.dumps(signature),))
+            conn.execute("INSERT INTO meta VALUES ('fx_unconverted', ?)", (json.dumps(unconverted),))
+            conn.commit()
+            conn.execute("ANALYZE")
+        finally:
+            conn.close()
+        os.replace(tmp, path)
+        logger.info(f"SQL mirror of {dataset_id} built: {rows:,} rows")
+        return rows
+
+
+def fx_unconverted(dataset_id: str) -> dict:
+    """Amounts the mirror could not convert to USD, as in a frame's attrs["fx_unconverted"]."""
+    conn = _connect(db_path(dataset_id), read_only=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'fx_unconverted'").fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else {}
+
+
+def _records(chunk: pd.DataFrame):
+    """Row tuples in COLUMNS order, built column-wise (NaN -> NULL)."""
+    ns = chunk["timestamp"].to_numpy("datetime64[ns]").astype(np.int64)
+    columns = [
+        chunk.index.to_numpy(np.int64).tolist(),
+        ns.tolist(),
+        (ns // 1_000_000_000).tolist(),
+    ]
+    for name in FRAME_COLUMNS[1:]:
+        series = chunk[name]
+        values = series.astype(object).where(series.notna(), None) if series.hasnans else series
+        columns.append(values.tolist())
+    return zip(*columns)
+
+
+def row_count(dataset_id: str) -> int:
+    conn = _connect(db_path(dataset_id), read_only=True)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _ensure_window_indexes(dataset_id: str, rules) -> None:
+    """An index per (sender, column, time) window partition used by the rules."""
+    wanted = {column for rule in rules if rule.id not in BUILTIN_SQL
+              for column in _window_columns(rule.condition)} - {"to_account"}
+    if not wanted:
+        return
+    with _lock_for(dataset_id):
+        conn = _connect(db_path(dataset_id))
+        try:
+            for column in sorted(wanted):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_window_{column} "
+                             f"ON transactions (from_account, {column}, ts_s)")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def flagged_rows(dataset_id: str, rule_id: str, condition: Optional[str] = None) -> np.ndarray:
+    """Sorted row numbers one rule flags. Raises ConditionError for an unusable condition."""
+    sql, params = rule_query(rule_id, condition)
+    conn = _connect(db_path(dataset_id), read_only=True)
+    try:
+        return np.fromiter((r[0] for r in conn.execute(sql, params)), dtype=np.int64)
+    except sqlite3.Error as e:
+        raise ConditionError(f"Rule {rule_id}: {e}")
+    finally:
+        conn.close()
+
+
+def evaluate_rules(dataset_id: str, rules, metrics=None) -> Dict[str, np.ndarray]:
+    """
+    Row numbers flagged by each rule, evaluated concurrently. A rule whose condition
+    cannot be evaluated flags nothing, as in the pandas engine.
+    """
+    _ensure_window_indexes(dataset_id, rules)
+
+    def run(rule):
+        if metrics is None:
+            return _evaluate_one(dataset_id, rule)
+        with metrics.rule(rule.id):
+            return _evaluate_one(dataset_id, rule)
+
+    with ThreadPoolExecutor(max_workers=max(1, THREADS), thread_name_prefix="nitilens-sql") as pool:
+        return dict(zip((rule.id for rule in rules), pool.map(run, rules)))
+
+
+def _evaluate_one(dataset_id: str, rule) -> np.ndarray:
+    try:
+        return flagged_rows(dataset_id, rule.id, rule.condition)
+    except ConditionError as e:
+        logger.warning(f"SQL engine skipped {rule.id}: {e}")
+        return np.empty(0, dtype=np.int64)
+
+
+def fetch_rows(dataset_id: str, row_numbers: Sequence[int]) -> pd.DataFrame:
+    """Canonical frame (with USD columns) of the given rows, indexed by row number."""
+    conn = _connect(db_path(dataset_id), read_only=True)
+    try:
+        df = pd.read_sql_query(
+            f"SELECT row_number, {', '.join(FRAME_COLUMNS)} FROM transactions "
+            "WHERE row_number IN (SELECT value FROM json_each(?)) ORDER BY row_number",
+            conn, params=(json.dumps([int(r) for r in row_numbers]),), index_col="row_number",
+        )
+    finally:
+        conn.close()
+    df.index.name = None
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ns")
+    df["from_bank"] = df["from_bank"].astype(np.int64)
+    df["to_bank"] = df["to_bank"].astype(np.int64)
+    df["is_laundering"] = df["is_laundering"].astype(np.int8)
+    for col in ("amount_received", "amount_paid", "amount_paid_usd", "amount_received_usd"):
+        df[col] = df[col].astype(np.float64)
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("category")
+    return df
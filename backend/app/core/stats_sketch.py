@@ -0,0 +1,328 @@
+"""
+Streaming dataset statistics built from mergeable sketches.
+
+Each dataset keeps one DatasetStats summary, updated chunk by chunk as transactions are
+read: exact counts and sums, a relative-error quantile sketch for amounts, HyperLogLog
+for distinct accounts, and Misra–Gries heavy-hitter counters for currencies and formats.
+Summaries are persisted per dataset, so stats requests are answered without touching the
+data, and rows appended to a file are folded in without re-reading what came before.
+"""
+import base64
+import hashlib
+import json
+import math
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.dataset_adapters import get_adapter
+
+STATS_DIR = Path(__file__).parent.parent / "storage" / "stats"
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes (~0.8% error at p=14)."""
+
+    def __init__(self, p: int = 14, registers: Optional[np.ndarray] = None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = registers if registers is not None else np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes << np.uint64(self.p)
+        # rank = 1 + leading zeros of the remaining bits, computed on 32-bit halves
+        hi = (rest >> np.uint64(32)).astype(np.uint32)
+        lo = (rest & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        with np.errstate(divide="ignore"):
+            hi_lz = 31 - np.floor(np.log2(hi.astype(np.float64)))
+            lo_lz = 31 - np.floor(np.log2(lo.astype(np.float64)))
+        rank = np.where(hi > 0, hi_lz + 1, np.where(lo > 0, 32 + lo_lz + 1, 64 - self.p + 1))
+        np.maximum.at(self.registers, idx, np.minimum(rank, 64 - self.p + 1).astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            return int(round(self.m * math.log(self.m / zeros)))  # linear counting
+        return int(round(raw))
+
+    def to_dict(self) -> dict:
+        return {"p": self.p, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return cls(data["p"], registers)
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch with bounded relative error (DDSketch-style).
+    Buckets are sparse counts keyed by ceil(log_gamma(x)); merging adds counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zero_count += int(len(values) - len(positive))
+        if not len(positive):
+            return
+        keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            self.buckets[k] = self.buckets.get(k, 0) + c
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.zero_count += other.zero_count
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.zero_count + sum(self.buckets.values())
+        if not total:
+            return None
+        rank = q * (total - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if seen > rank:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "buckets": {str(k): c for k, c in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.zero_count = data["zero_count"]
+        sketch.buckets = {int(k): c for k, c in data["buckets"].items()}
+        return sketch
+
+
+class HeavyHitters:
+    """Misra–Gries counters: exact when cardinality <= capacity, else top-k with bounded undercount."""
+
+    def __init__(self, capacity: int = 64, counters: Optional[Dict[str, int]] = None):
+        self.capacity = capacity
+        self.counters: Dict[str, int] = counters or {}
+
+    def add_counts(self, counts: Dict[str, int]) -> None:
+        for key, c in counts.items():
+            if c:
+                self.counters[key] = self.counters.get(key, 0) + int(c)
+        self._trim()
+
+    def merge(self, other: "HeavyHitters") -> None:
+        self.add_counts(other.counters)
+
+    def _trim(self) -> None:
+        if len(self.counters) <= self.capacity:
+            return
+        ordered = sorted(self.counters.items(), key=lambda kv: kv[1], reverse=True)
+        cut = ordered[self.capacity][1]
+        self.counters = {k: c - cut for k, c in ordered[:self.capacity] if c > cut}
+
+    def top(self, n: Optional[int] = None) -> Dict[str, int]:
+        ordered = sorted(self.counters.items(), key=lambda kv: kv[1], reverse=True)
+        return dict(ordered[:n] if n else ordered)
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HeavyHitters":
+        return cls(data["capacity"], dict(data["counters"]))
+
+
+class DatasetStats:
+    """Mergeable summary of a canonical transaction stream."""
+
+    def __init__(self):
+        self.count = 0
+        self.laundering = 0
+        self.amount_sum = 0.0
+        self.amount_max: Optional[float] = None
+        self.amount_min: Optional[float] = None
+        self.amounts = QuantileSketch()
+        self.accounts = HyperLogLog()
+        self.currencies = HeavyHitters()
+        self.formats = HeavyHitters()
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one canonical chunk into the summary."""
+        if chunk.empty:
+            return
+        amounts = chunk["amount_paid"].to_numpy(dtype=np.float64)
+        self.count += len(chunk)
+        self.laundering += int(chunk["is_laundering"].sum())
+        self.amount_sum += float(np.nansum(amounts))
+        chunk_max, chunk_min = float(np.nanmax(amounts)), float(np.nanmin(amounts))
+        self.amount_max = chunk_max if self.amount_max is None else max(self.amount_max, chunk_max)
+        self.amount_min = chunk_min if self.amount_min is None else min(self.amount_min, chunk_min)
+        self.amounts.add(amounts)
+        for col in ("from_account", "to_account"):
+            self.accounts.add_hashes(pd.util.hash_pandas_object(chunk[col].astype(str), index=False).to_numpy())
+        self.currencies.add_counts(chunk["payment_currency"].astype(str).value_counts().to_dict())
+        self.formats.add_counts(chunk["payment_format"].astype(str).value_counts().to_dict())
+
+    def merge(self, other: "DatasetStats") -> None:
+        self.count += other.count
+        self.laundering += other.laundering
+        self.amount_sum += other.amount_sum
+        for attr, pick in (("amount_max", max), ("amount_min", min)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        self.amounts.merge(other.amounts)
+        self.accounts.merge(other.accounts)
+        self.currencies.merge(other.currencies)
+        self.formats.merge(other.formats)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "laundering": self.laundering,
+            "amount_sum": self.amount_sum,
+            "amount_max": self.amount_max,
+            "amount_min": self.amount_min,
+            "amounts": self.amounts.to_dict(),
+            "accounts": self.accounts.to_dict(),
+            "currencies": self.currencies.to_dict(),
+            "formats": self.formats.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DatasetStats":
+        stats = cls()
+        for attr in ("count", "laundering", "amount_sum", "amount_max", "amount_min"):
+            setattr(stats, attr, data[attr])
+        stats.amounts = QuantileSketch.from_dict(data["amounts"])
+        stats.accounts = HyperLogLog.from_dict(data["accounts"])
+        stats.currencies = HeavyHitters.from_dict(data["currencies"])
+        stats.formats = HeavyHitters.from_dict(data["formats"])
+        return stats
+
+
+# ---------------------------------------------------------------------------
+# Per-dataset summaries
+# ---------------------------------------------------------------------------
+
+_summaries: Dict[str, tuple] = {}  # dataset_id -> (signature, bytes_ingested, stats, tail digest)
+_lock = threading.Lock()
+
+# Bytes before the ingested watermark that must be unchanged for an append-only resume
+_TAIL_BYTES = 4096
+
+
+def _stats_file(dataset_id: str) -> Path:
+    return STATS_DIR / f"{dataset_id}.json"
+
+
+def _signature(path: Path) -> list:
+    stat = path.stat()
+    return [str(path.resolve()), stat.st_mtime_ns, stat.st_size]
+
+
+def _tail_digest(path: Path, end: int) -> str:
+    with path.open("rb") as fh:
+        fh.seek(max(end - _TAIL_BYTES, 0))
+        return hashlib.sha1(fh.read(min(end, _TAIL_BYTES))).hexdigest()
+
+
+def _appended_since(path: Path, signature: list, entry: tuple) -> bool:
+    """True if the file is the previously ingested one with rows appended after it."""
+    old_signature, ingested = entry[0], entry[1]
+    return (
+        old_signature[0] == signature[0]
+        and signature[2] > ingested
+        and _tail_digest(path, ingested) == entry[3]
+    )
+
+
+def _load_persisted(dataset_id: str) -> Optional[tuple]:
+    try:
+        data = json.loads(_stats_file(dataset_id).read_text(encoding="utf-8"))
+        return (data["signature"], data["bytes_ingested"],
+                DatasetStats.from_dict(data["stats"]), data["tail_digest"])
+    except Exception:
+        return None
+
+
+def _store(dataset_id: str, path: Path, signature: list, stats: DatasetStats) -> None:
+    """Cache and persist a summary covering the whole current file."""
+    entry = (signature, signature[2], stats, _tail_digest(path, signature[2]))
+    _summaries[dataset_id] = entry
+    STATS_DIR.mkdir(parents=True, exist_ok=True)
+    _stats_file(dataset_id).write_text(json.dumps({
+        "signature": entry[0],
+        "bytes_ingested": entry[1],
+        "stats": stats.to_dict(),
+        "tail_digest": entry[3],
+    }), encoding="utf-8")
+
+
+def get_stats(dataset_id: str) -> DatasetStats:
+    """
+    Current summary for a dataset. Served from memory/disk when the file is unchanged;
+    if it only grew, just the appended bytes are read; otherwise it is rebuilt by streaming.
+    """
+    adapter = get_adapter(dataset_id)
+    if not adapter.connected:
+        raise FileNotFoundError(f"{adapter.name} dataset not found at: {adapter.path}")
+    signature = _signature(adapter.path)
+    with _lock:
+        entry = _summaries.get(dataset_id) or _load_persisted(dataset_id)
+        if entry and entry[0] == signature:
+            _summaries[dataset_id] = entry
+            return entry[2]
+
+        if entry and _appended_since(adapter.path, signature, entry):
+            stats, start = entry[2], entry[1]
+        else:
+            stats, start = DatasetStats(), 0
+        for chunk in adapter.iter_chunks(start_offset=start):
+            stats.update(chunk)
+        _store(dataset_id, adapter.path, signature, stats)
+        return stats
+
+
+def observe_chunks(dataset_id: str, chunks: Iterable[pd.DataFrame]) -> None:
+    """
+    Record a full pass over a dataset's current file (e.g. made by a scan) so the
+    next stats request does not need to read the data again.
+    """
+    adapter = get_adapter(dataset_id)
+    signature = _signature(adapter.path)
+    with _lock:
+        entry = _summaries.get(dataset_id) or _load_persisted(dataset_id)
+        if entry and entry[0] == signature:
+            return
+        stats = DatasetStats()
+        for chunk in chunks:
+            stats.update(chunk)
+        _store(dataset_id, adapter.path, signature, stats)
@@ -0,0 +1,134 @@
+"""
+Store versions and conditional GETs.
+
+Each JSON store's version is a save token: every save path calls mark_changed() after
+writing the store, which writes a fresh random token to storage/versions/<store>. The
+token lives on disk, so it is shared by all worker processes, survives restarts, and is
+restored together with the data when storage is copied back. File stat metadata alone
+cannot version these stores: they are rewritten in place, and a same-size rewrite within
+one mtime tick looks unchanged. The file's mtime and size are folded in only so that
+edits made outside the app are noticed too. The dataset "store" is the transaction file
+(which the app never writes) plus the FX rate table; the activity log's version is its
+last sequence number. Read endpoints declare the stores their response
+is built from with `Depends(conditional(...))`; the dependency derives a strong ETag
+from those versions, the route and its query string, and answers a matching
+If-None-Match with 304 before the endpoint loads or aggregates anything.
+"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import Dict
+
+from fastapi import Request, Response
+
+from app.core.lazy import lazy_import
+
+STORAGE_DIR = Path(__file__).parent.parent / "storage"
+VERSIONS_DIR = STORAGE_DIR / "versions"
+STORE_FILES = {
+    "violations": STORAGE_DIR / "violations.json",
+    "cases": STORAGE_DIR / "cases.json",
+    "rules": STORAGE_DIR / "rules.json",
+    "policies": STORAGE_DIR / "policies.json",
+}
+DEFAULT_DATASET = "ibm-aml"
+# Bump (or set per deploy) when response formats change, so old ETags stop matching
+ETAG_SALT = os.getenv("NITILENS_ETAG_SALT", "1")
+
+activity_log = lazy_import("app.core.activity_log")
+dataset_adapters = lazy_import("app.core.dataset_adapters")
+fx = lazy_import("app.core.fx")
+
+
+def _file_version(path: Path) -> str:
+    try:
+        stat = path.stat()
+    except OSError:
+        return "absent"
+    return f"{stat.st_ino:x}.{stat.st_mtime_ns:x}.{stat.st_size:x}"
+
+
+def mark_changed(store: str) -> None:
+    """Give a JSON store a new version; call after every write of its file."""
+    if store not in STORE_FILES:
+        raise ValueError(f"Unknown store: {store}")
+    token = uuid.uuid4().hex[:16]
+    VERSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = VERSIONS_DIR / f".{store}.{token}"
+    tmp.write_text(token, encoding="utf-8")
+    os.replace(tmp, VERSIONS_DIR / store)
+
+
+def _save_token(store: str) -> str:
+    try:
+        return (VERSIONS_DIR / store).read_text(encoding="utf-8")
+    except OSError:
+        return "unsaved"  # not written through the app since the storage was created
+
+
+def _json_store_version(store: str) -> str:
+    path = STORE_FILES[store]
+    try:
+        stat = path.stat()
+    except OSError:
+        return "absent"
+    return f"{_save_token(store)}.{stat.st_mtime_ns:x}.{stat.st_size:x}"
+
+
+def store_version(store: str) -> str:
+    """Current version of one store: a JSON store name, 'dataset' or 'activity'."""
+    if store == "dataset":
+        adapter = dataset_adapters.get_adapter(DEFAULT_DATASET)
+        return f"{_file_version(adapter.path)}+fx{fx.rates_signature()}"
+    if store == "activity":
+        return activity_log.get_log().version()  # last sequence number
+    return _json_store_version(store)
+
+
+def store_versions() -> Dict[str, str]:
+    return {store: store_version(store) for store in (*STORE_FILES, "dataset", "activity")}
+
+
+def make_etag(request: Request, stores) -> str:
+    parts = [ETAG_SALT, request.url.path, str(request.url.query)]
+    parts += [f"{store}={store_version(store)}" for store in stores]
+    return '"' + hashlib.sha1("|".join(parts).encode()).hexdigest()[:20] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (c.strip() for c in if_none_match.split(","))
+    return any((c[2:] if c.startswith("W/") else c) == etag for c in candidates)
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "no-cache"})
+
+
+def conditional(*stores: str):
+    """
+    Dependency factory: tag the response with an ETag over `stores`, or raise NotModified
+    (answered as 304 by not_modified_handler) when the client already has it.
+    """
+    unknown = set(stores) - set(STORE_FILES) - {"dataset", "activity"}
+    if unknown:
+        raise ValueError(f"Unknown store(s): {', '.join(sorted(unknown))}")
+
+    async def dependency(request: Request, response: Response):
+        etag = make_etag(request, stores)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise NotModified(etag)
+        response.headers["ETag"] = etag
+        # Clients may cache but must revalidate every time
+        response.headers["Cache-Control"] = "no-cache"
+
+    return dependency
@@ -1,133 +1,344 @@
 """
-Violation Engine: applies AML compliance rules to IBM AML transaction data.
-Reads the CSV, runs each approved rule using pandas, and returns Violation objects.
+Violation Engine: applies AML compliance rules to transaction data.
+Loads a registered dataset in the canonical schema (see dataset_adapters), runs each
+approved rule using pandas, and returns Violation objects.
 """
 import json
+import os
+import threading
 import uuid
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
+from app.models.case import Case
 from app.models.violation import Violation
+from app.core import activity_log
+from app.core.cases import (
+    CASES_FILE, CASE_RULES, MAX_CASE_TRANSACTIONS, case_id, group_into_cases, load_cases, save_cases
+)
+from app.core.dataset_adapters import get_adapter, load_frame
+from app.core.events import publish, summary_counters
+from app.core.feature_store import FeatureTable, get_feature_store
+from app.core.fx import log_unconverted
+from app.core.lazy import lazy_import
+from app.core.metrics import ScanMetrics
+from app.core.priority import PRIORITY_FILE, build_priority_index, score_transactions
+from app.core.row_index import read_rows
+from app.core.rule_conditions import ConditionError, condition_mask
 from app.core.rule_engine import get_rules
+from app.core.stats_sketch import get_stats, observe_chunks
+from app.core.store_versions import mark_changed
 
-_BASE = Path(__file__).parent.parent.parent.parent  # project root
-DATA_FILE = _BASE / "data" / "datasets" / "ibm_aml" / "sample_transactions.csv"
+DEFAULT_DATASET = "ibm-aml"
+DATA_FILE = get_adapter(DEFAULT_DATASET).path
 VIOLATIONS_FILE = Path(__file__).parent.parent / "storage" / "violations.json"
+_store_lock = threading.RLock()  # serializes read-modify-write of the violation store
+# Rule evaluation backend: "pandas" (in-memory frame) or "sql" (embedded SQLite, out of core)
+SCAN_ENGINE = os.getenv("NITILENS_SCAN_ENGINE", "pandas")
 
+sql_engine = lazy_import("app.core.sql_engine")
 
-def load_transactions() -> pd.DataFrame:
-    """Load IBM AML transactions CSV into a DataFrame."""
-    if not DATA_FILE.exists():
-        raise FileNotFoundError(f"IBM AML dataset not found at: {DATA_FILE}")
-    df = pd.read_csv(DATA_FILE)
-    # Normalise column names (strip whitespace)
-    df.columns = [c.strip() for c in df.columns]
-    return df
 
+def load_transactions(dataset_id: str = DEFAULT_DATASET) -> pd.DataFrame:
+    """Load a registered dataset as a canonical-schema DataFrame (cached, read-only)."""
+    return load_frame(dataset_id)
 
-def run_scan() -> List[Violation]:
+
+def run_scan(dataset_id: str = DEFAULT_DATASET, metrics: Optional[ScanMetrics] = None,
+             engine: Optional[str] = None, actor: str = "system") -> List[Violation]:
     """
-    Run all approved rules against the IBM AML transaction dataset.
-    Returns a flat list of violations found.
+    Run all approved rules against a registered transaction dataset.
+    Returns a flat list of violations found. Stage and per-rule timings are recorded
+    on `metrics` (a fresh ScanMetrics if not given) and in the metrics registry;
+    progress and results are published on the event stream. `engine` ("pandas" or
+    "sql") defaults to NITILENS_SCAN_ENGINE; both flag the same transactions. The scan
+    and its detections are recorded in the activity log under `actor`.
     """
-    df = load_transactions()
+    metrics = metrics or ScanMetrics(dataset_id)
+    metrics.engine = engine or SCAN_ENGINE
+    if metrics.engine not in ("pandas", "sql"):
+        raise ValueError(f"Unknown scan engine: {metrics.engine!r}")
+    scan = {"dataset": dataset_id, "started_at": metrics.started_at}
+    metrics.on_stage = lambda name, seconds: publish(
+        "scan_progress", {**scan, "stage": name, "seconds": round(seconds, 4)})
+    publish("scan_started", scan)
+    try:
+        violations = _run_scan(dataset_id, metrics)
+    except Exception as e:
+        metrics.finish("error")
+        publish("scan_failed", {**scan, "error": str(e)})
+        activity_log.record("scan_failed", actor, dataset=dataset_id, engine=metrics.engine, error=str(e))
+        raise
+    metrics.finish("ok")
+    completed = {"violations": len(violations), "rows": metrics.rows, "duration_s": round(metrics.duration, 4)}
+    publish("scan_completed", {**scan, **completed})
+    activity_log.record_many([activity_log.detection(v, actor) for v in violations])
+    activity_log.record("scan_completed", actor, dataset=dataset_id, engine=metrics.engine, **completed)
+    return violations
+
+
+def _run_scan(dataset_id: str, metrics: ScanMetrics) -> List[Violation]:
     rules = get_rules(approved_only=True)
+    if metrics.engine == "sql":
+        df, applied = _evaluate_sql(dataset_id, rules, metrics)
+    else:
+        df, applied = _evaluate_pandas(dataset_id, rules, metrics)
+    log_unconverted(dataset_id, metrics.fx_unconverted)
     now = datetime.now(timezone.utc).isoformat()
 
     all_violations: List[Violation] = []
     seen_ids: set = set()  # avoid exact duplicates for the same (txn_id, rule_id)
 
-    for rule in rules:
-        flagged_rows, _ = _apply_rule(rule.id, df)
-        for _, row in flagged_rows.iterrows():
-            txn_id = _make_txn_id(row)
-            dedup_key = f"{txn_id}-{rule.id}"
-            if dedup_key in seen_ids:
-                continue
-            seen_ids.add(dedup_key)
-
-            violation = Violation(
-                id=f"viol-{uuid.uuid4().hex[:8]}",
-                transaction_id=txn_id,
-                rule_id=rule.id,
-                rule_name=rule.description,
-                severity=rule.severity,
-                explanation=_build_explanation(rule.id, row),
-                evidence=_build_evidence(row),
-                status="open",
-                detected_at=now,
-            )
-            all_violations.append(violation)
-
-    # Persist to storage
-    _save_violations(all_violations)
+    with metrics.stage("risk"):
+        # Risk-scoring stage: one combined score per transaction, computed column-wise
+        risk = score_transactions(
+            df, ((rule.severity, df.index.isin(flagged.index)) for rule, flagged in applied)
+        )
+
+    cases: List[Case] = []
+    with metrics.stage("materialize"):
+        for rule, flagged_rows in applied:
+            before = len(all_violations)
+            with metrics.rule(rule.id, "materialize"):
+                if rule.id in CASE_RULES:
+                    # High-volume rules: one violation per consolidated case, not per row
+                    for violation, case in _consolidate(rule, flagged_rows, risk, dataset_id, now):
+                        if f"{violation.transaction_id}-{rule.id}" in seen_ids:
+                            continue
+                        seen_ids.add(f"{violation.transaction_id}-{rule.id}")
+                        all_violations.append(violation)
+                        cases.append(case)
+                else:
+                    for _, row in flagged_rows.iterrows():
+                        txn_id = make_txn_id(row)
+                        dedup_key = f"{txn_id}-{rule.id}"
+                        if dedup_key in seen_ids:
+                            continue
+                        seen_ids.add(dedup_key)
+
+                        violation = Violation(
+                            id=f"viol-{uuid.uuid4().hex[:8]}",
+                            transaction_id=txn_id,
+                            rule_id=rule.id,
+                            rule_name=rule.description,
+                            severity=rule.severity,
+                            explanation=_build_explanation(rule.id, row),
+                            evidence=build_evidence(row, dataset_id),
+                            status="open",
+                            detected_at=now,
+                            risk_score=float(risk.at[row.name]),
+                        )
+                        all_violations.append(violation)
+            metrics.rule_violations(rule.id, len(all_violations) - before)
+
+    # Persist to storage, with the per-transaction priority index the review queue reads
+    # Event-driven violations (missed GDPR deadlines) are not the scan's to replace
+    with _store_lock:
+        with metrics.stage("persist_violations"):
+            stored = [v for v in load_violations() if v.evidence.get("source") == "gdpr_deadline"]
+            _save_violations(stored + all_violations)
+        metrics.wrote("violations", VIOLATIONS_FILE)
+        with metrics.stage("persist_cases"):
+            save_cases(cases)
+        metrics.wrote("cases", CASES_FILE)
+        with metrics.stage("priority_index"):
+            build_priority_index(stored + all_violations)
+        metrics.wrote("priority_index", PRIORITY_FILE)
+    _publish_added(all_violations, stored + all_violations, "scan")
     return all_violations
 
 
-def _apply_rule(rule_id: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, str]:
+def _evaluate_pandas(dataset_id: str, rules, metrics: ScanMetrics):
+    """Evaluate rules on the in-memory frame; returns (frame, [(rule, flagged rows)])."""
+    with metrics.stage("load"):
+        df = load_transactions(dataset_id)
+    metrics.rows = len(df)
+    metrics.fx_unconverted = df.attrs.get("fx_unconverted") or {}
+    with metrics.stage("stats"):
+        # The scan has the data in hand; refresh the dataset summary if it is stale
+        observe_chunks(dataset_id, [df])
+    with metrics.stage("features"):
+        features = get_feature_store(dataset_id, frame=df)
+
+    applied = []
+    with metrics.stage("rules"):
+        for rule in rules:
+            with metrics.rule(rule.id):
+                flagged = _apply_rule(rule.id, df, rule.condition, features)[0]
+            metrics.rule_rows(rule.id, len(df), len(flagged))
+            applied.append((rule, flagged))
+    return df, applied
+
+
+def _evaluate_sql(dataset_id: str, rules, metrics: ScanMetrics):
+    """
+    Evaluate rules in the SQL engine; returns the same shape as _evaluate_pandas, with
+    a frame of only the flagged rows (risk scoring and materialization need nothing else).
+    """
+    with metrics.stage("sync"):
+        metrics.rows = sql_engine.sync(dataset_id)
+    metrics.fx_unconverted = sql_engine.fx_unconverted(dataset_id)
+    with metrics.stage("rules"):
+        flagged = sql_engine.evaluate_rules(dataset_id, rules, metrics)
+    with metrics.stage("load"):
+        rows = np.unique(np.concatenate([np.empty(0, dtype=np.int64), *flagged.values()]))
+        df = sql_engine.fetch_rows(dataset_id, rows)
+    applied = []
+    for rule in rules:
+        metrics.rule_rows(rule.id, metrics.rows, len(flagged[rule.id]))
+        applied.append((rule, df.loc[flagged[rule.id]]))
+    return df, applied
+
+
+def _consolidate(rule, flagged: pd.DataFrame, risk: pd.Series, dataset_id: str, now: str):
+    """Yield (violation, case) pairs for a case rule's flagged rows."""
+    for case in group_into_cases(flagged, risk).itertuples(index=False):
+        members = flagged.loc[case.rows[:MAX_CASE_TRANSACTIONS]]
+        first = members.iloc[0]
+        txn_ids = [make_txn_id(row) for _, row in members.iterrows()]
+        total_usd = None if pd.isna(case.total_amount_usd) else round(float(case.total_amount_usd), 2)
+        first_seen, last_seen = str(case.first_seen), str(case.last_seen)
+
+        case_obj = Case(
+            id=case_id(rule.id, case.account, first_seen),
+            rule_id=rule.id,
+            rule_name=rule.description,
+            severity=rule.severity,
+            account=case.account,
+            violation_id=f"viol-{uuid.uuid4().hex[:8]}",
+            transaction_count=int(case.transaction_count),
+            total_amount_usd=total_usd,
+            first_seen=first_seen,
+            last_seen=last_seen,
+            counterparties=int(case.counterparties),
+            transaction_ids=txn_ids,
+            risk_score=float(case.risk_score),
+            detected_at=now,
+        )
+        summary = (
+            f"Case of {case_obj.transaction_count} flagged transaction(s) from account {case.account} "
+            f"to {case_obj.counterparties} counterpart(ies) between {first_seen} and {last_seen}"
+            + (f", totalling ${total_usd:,.2f}. " if total_usd is not None else ". ")
+        )
+        violation = Violation(
+            id=case_obj.violation_id,
+            transaction_id=txn_ids[0],
+            rule_id=rule.id,
+            rule_name=rule.description,
+            severity=rule.severity,
+            explanation=summary + _build_explanation(rule.id, first),
+            evidence={
+                **build_evidence(first, dataset_id),
+                "case": {
+                    "case_id": case_obj.id,
+                    "transaction_count": case_obj.transaction_count,
+                    "total_amount_usd": total_usd,
+                    "first_seen": first_seen,
+                    "last_seen": last_seen,
+                    "counterparties": case_obj.counterparties,
+                    "transaction_ids": txn_ids,
+                },
+            },
+            status="open",
+            detected_at=now,
+            risk_score=case_obj.risk_score,
+            case_id=case_obj.id,
+        )
+        yield violation, case_obj
+
+
+BUILTIN_RULES = ("aml-001", "aml-002", "aml-003", "aml-004", "aml-005", "aml-006")
+
+
+def _apply_rule(rule_id: str, df: pd.DataFrame, condition: Optional[str] = None,
+                features: Optional[FeatureTable] = None) -> Tuple[pd.DataFrame, str]:
     """Apply a specific rule and return matching rows."""
     try:
-        if rule_id == "aml-001":
-            mask = df["Amount Paid"] > 10_000
-            return df[mask], "Amount Paid > $10,000"
-
-        elif rule_id == "aml-002":
-            # Rapid transfers: group by From Account + To Account.1, count within window
-            # Simplified: flag accounts with top 5% frequency to same beneficiary
-            counts = df.groupby(["Account", "Account.1"]).size().reset_index(name="tx_count")
-            high = counts[counts["tx_count"] >= 2]  # at least 2 in sample = flag
-            flagged = df.merge(high[["Account", "Account.1"]], on=["Account", "Account.1"])
-            return flagged.drop_duplicates(), "Rapid transfers to same beneficiary"
-
-        elif rule_id == "aml-003":
-            mask = (df["Amount Paid"] % 1000 == 0) & (df["Amount Paid"] > 5_000)
-            return df[mask], "Round-number amount > $5,000 (structuring)"
-
-        elif rule_id == "aml-004":
-            mask = df["Payment Currency"] != df["Receiving Currency"]
-            return df[mask], "Payment currency ≠ receiving currency"
-
-        elif rule_id == "aml-005":
-            mask = df["Is Laundering"] == 1
-            return df[mask], "Confirmed laundering label"
-
-        elif rule_id == "aml-006":
-            mask = (df["Amount Paid"] > 50_000) & (
-                df["Payment Format"].str.lower().isin(["cheque", "wire"])
-            )
-            return df[mask], "Wire/Cheque > $50,000 — EDD required"
-
-        else:
-            # For extracted rules from PDFs, attempt basic numeric comparisons
-            return pd.DataFrame(), "Unknown rule"
+        mask, label = rule_mask(rule_id, df, condition, features)
+    except ConditionError:
+        return pd.DataFrame(), "Unknown rule"
     except Exception as e:
         return pd.DataFrame(), str(e)
+    return df[mask], label
+
+
+def rule_mask(rule_id: str, df: pd.DataFrame, condition: Optional[str] = None,
+              features: Optional[FeatureTable] = None) -> Tuple[pd.Series, str]:
+    """
+    Boolean mask of the rows a rule flags, with a short label. `features` is the dataset's
+    feature store, used instead of regrouping df when given (df must then be the full dataset).
+    Raises ConditionError for a non-builtin rule whose condition cannot be evaluated.
+    """
+    if rule_id == "aml-001":
+        return df["amount_paid_usd"] > 10_000, "Amount Paid > $10,000"
+
+    elif rule_id == "aml-002":
+        # Rapid transfers: group by From Account + To Account, count within window
+        # Simplified: flag accounts with top 5% frequency to same beneficiary
+        if features is not None:
+            pair_counts = features.pair_counts(df)
+        else:
+            pair_counts = df.groupby(["from_account", "to_account"])["from_account"].transform("size")
+        return pair_counts >= 2, "Rapid transfers to same beneficiary"  # at least 2 in sample = flag
+
+    elif rule_id == "aml-003":
+        # Round in the payment currency, threshold in USD
+        mask = (df["amount_paid"] % 1000 == 0) & (df["amount_paid_usd"] > 5_000)
+        return mask, "Round-number amount > $5,000 (structuring)"
 
+    elif rule_id == "aml-004":
+        return df["payment_currency"] != df["receiving_currency"], "Payment currency ≠ receiving currency"
 
-def _make_txn_id(row: pd.Series) -> str:
-    """Create a deterministic transaction identifier from row data."""
+    elif rule_id == "aml-005":
+        return df["is_laundering"] == 1, "Confirmed laundering label"
+
+    elif rule_id == "aml-006":
+        mask = (df["amount_paid_usd"] > 50_000) & (
+            df["payment_format"].str.lower().isin(["cheque", "wire"])
+        )
+        return mask, "Wire/Cheque > $50,000 — EDD required"
+
+    # Rules extracted from PDFs: compile the condition string against the schema
+    if not condition:
+        raise ConditionError(f"Rule {rule_id} has no condition to evaluate")
+    return condition_mask(condition, df), condition
+
+
+def make_txn_id(row) -> str:
+    """Create a deterministic transaction identifier from row data (a Series or a dict of its fields)."""
     parts = [
-        str(row.get("Timestamp", "")),
-        str(row.get("Account", "")),
-        str(row.get("Account.1", "")),
-        str(row.get("Amount Paid", "")),
+        str(row.get("timestamp", "")),
+        str(row.get("from_account", "")),
+        str(row.get("to_account", "")),
+        str(row.get("amount_paid", "")),
     ]
     return "TXN-" + uuid.uuid5(uuid.NAMESPACE_DNS, "|".join(parts)).hex[:12].upper()
 
 
+def _format_usd(row: pd.Series) -> str:
+    """USD amount, with the original amount appended for non-USD payments."""
+    amount = row.get("amount_paid", 0)
+    currency = row.get("payment_currency", "US Dollar")
+    amount_usd = row.get("amount_paid_usd", amount)
+    if currency == "US Dollar" or pd.isna(amount_usd):
+        return f"${amount:,.2f}"
+    return f"${amount_usd:,.2f} ({amount:,.2f} {currency})"
+
+
 def _build_explanation(rule_id: str, row: pd.Series) -> str:
-    amount = row.get("Amount Paid", 0)
-    from_acct = row.get("Account", "N/A")
-    to_acct = row.get("Account.1", "N/A")
-    currency = row.get("Payment Currency", "N/A")
-    recv_currency = row.get("Receiving Currency", "N/A")
-    fmt = row.get("Payment Format", "N/A")
+    amount_usd = _format_usd(row)
+    from_acct = row.get("from_account", "N/A")
+    to_acct = row.get("to_account", "N/A")
+    currency = row.get("payment_currency", "N/A")
+    recv_currency = row.get("receiving_currency", "N/A")
+    fmt = row.get("payment_format", "N/A")
 
     explanations = {
         "aml-001": (
-            f"Transaction of ${amount:,.2f} from account {from_acct} exceeds the $10,000 CTR "
+            f"Transaction of {amount_usd} from account {from_acct} exceeds the $10,000 CTR "
             f"reporting threshold. A Currency Transaction Report must be filed within 15 business days."
         ),
         "aml-002": (
@@ -135,7 +346,7 @@ def _build_explanation(rule_id: str, row: pd.Series) -> str:
             f"indicating a potential layering pattern in the AML placement cycle."
         ),
         "aml-003": (
-            f"Transaction of ${amount:,.2f} is a round number above $5,000, which may indicate "
+            f"Transaction of {amount_usd} is a round number above $5,000, which may indicate "
             f"deliberate structuring (smurfing) to stay below reporting thresholds."
         ),
         "aml-004": (
@@ -144,34 +355,42 @@ def _build_explanation(rule_id: str, row: pd.Series) -> str:
             f"enhanced scrutiny for currency-based layering."
         ),
         "aml-005": (
-            f"Transaction of ${amount:,.2f} ({fmt}) from {from_acct} to {to_acct} is confirmed "
+            f"Transaction of {amount_usd} ({fmt}) from {from_acct} to {to_acct} is confirmed "
             f"as illicit in the ground-truth dataset. This is a confirmed money laundering transaction."
         ),
         "aml-006": (
-            f"{fmt} transaction of ${amount:,.2f} from {from_acct} exceeds $50,000 threshold. "
+            f"{fmt} transaction of {amount_usd} from {from_acct} exceeds $50,000 threshold. "
             f"Enhanced Due Diligence (EDD) documentation required before processing."
         ),
     }
     return explanations.get(rule_id, f"Transaction flagged by rule {rule_id}.")
 
 
-def _build_evidence(row: pd.Series) -> dict:
-    """Build evidence dict from transaction row."""
+def build_evidence(row: pd.Series, dataset_id: str = DEFAULT_DATASET) -> dict:
+    """Build the evidence dict for a canonical transaction row (violations, rule previews)."""
     return {
-        "timestamp": str(row.get("Timestamp", "")),
-        "from_bank": str(row.get("From Bank", "")),
-        "from_account": str(row.get("Account", "")),
-        "to_bank": str(row.get("To Bank", "")),
-        "to_account": str(row.get("Account.1", "")),
-        "amount_paid": float(row.get("Amount Paid", 0)),
-        "payment_currency": str(row.get("Payment Currency", "")),
-        "amount_received": float(row.get("Amount Received", 0)),
-        "receiving_currency": str(row.get("Receiving Currency", "")),
-        "payment_format": str(row.get("Payment Format", "")),
-        "is_laundering": int(row.get("Is Laundering", 0)),
+        "dataset": dataset_id,
+        "row_number": int(row.name),
+        "timestamp": str(row.get("timestamp", "")),
+        "from_bank": str(row.get("from_bank", "")),
+        "from_account": str(row.get("from_account", "")),
+        "to_bank": str(row.get("to_bank", "")),
+        "to_account": str(row.get("to_account", "")),
+        "amount_paid": float(row.get("amount_paid", 0)),
+        "payment_currency": str(row.get("payment_currency", "")),
+        "amount_received": float(row.get("amount_received", 0)),
+        "receiving_currency": str(row.get("receiving_currency", "")),
+        "payment_format": str(row.get("payment_format", "")),
+        "is_laundering": int(row.get("is_laundering", 0)),
+        "amount_paid_usd": _usd_or_none(row.get("amount_paid_usd")),
+        "amount_received_usd": _usd_or_none(row.get("amount_received_usd")),
     }
 
 
+def _usd_or_none(value) -> Optional[float]:
+    return None if value is None or pd.isna(value) else round(float(value), 2)
+
+
 def load_violations() -> List[Violation]:
     """Load all violations from storage."""
     try:
@@ -187,50 +406,141 @@ def _save_violations(violations: List[Violation]) -> None:
         json.dumps([v.model_dump() for v in violations], indent=2),
         encoding="utf-8"
     )
-
-
-def update_violation_status(violation_id: str, status: str, comment: str = None) -> bool:
-    """Update a single violation's status and comment."""
-    violations = load_violations()
-    for v in violations:
-        if v.id == violation_id:
-            v.status = status
-            if comment:
-                v.reviewer_comment = comment
-            v.reviewed_at = datetime.now(timezone.utc).isoformat()
-            _save_violations(violations)
-            return True
+    mark_changed("violations")
+
+
+def append_violations(new: List[Violation], actor: str = "system") -> None:
+    """Add violations raised outside a scan (e.g. missed deadlines) to the store."""
+    with _store_lock:
+        violations = load_violations() + new
+        _save_violations(violations)
+        build_priority_index(violations)
+    activity_log.record_many([activity_log.detection(v, actor) for v in new])
+    _publish_added(new, violations, "event")
+
+
+STREAM_SAMPLE = 20  # highest-risk new violations included in a violations_added event
+
+
+def _publish_added(new: List[Violation], store: List[Violation], source: str) -> None:
+    """Stream a compact delta for newly stored violations, then the updated counters."""
+    by_severity: dict = {}
+    by_rule: dict = {}
+    for v in new:
+        by_severity[v.severity] = by_severity.get(v.severity, 0) + 1
+        by_rule[v.rule_id] = by_rule.get(v.rule_id, 0) + 1
+    top = sorted(new, key=lambda v: v.risk_score or 0.0, reverse=True)[:STREAM_SAMPLE]
+    publish("violations_added", {
+        "source": source,
+        "count": len(new),
+        "by_severity": by_severity,
+        "by_rule": by_rule,
+        "top": [{"id": v.id, "rule_id": v.rule_id, "severity": v.severity, "risk_score": v.risk_score,
+                 "transaction_id": v.transaction_id, "case_id": v.case_id} for v in top],
+    })
+    publish("summary", summary_counters(store))
+
+
+def _publish_status(ids: List[str], status: str, case_id_: Optional[str], store: List[Violation]) -> None:
+    publish("violation_status", {"ids": ids, "status": status, "case_id": case_id_})
+    publish("summary", summary_counters(store))
+
+
+def update_violation_status(violation_id: str, status: str, comment: str = None,
+                            reviewer: str = "unknown") -> bool:
+    """Update a single violation's status and comment (and its case's, if it has one)."""
+    with _store_lock:
+        violations = load_violations()
+        for v in violations:
+            if v.id == violation_id:
+                if v.case_id:
+                    return update_case_status(v.case_id, status, comment, reviewer)
+                _mark_reviewed(v, status, comment)
+                _save_violations(violations)
+                activity_log.record_many([activity_log.review(v, status, comment, reviewer)])
+                _publish_status([v.id], status, None, violations)
+                return True
     return False
 
 
-def get_dataset_stats() -> dict:
-    """Return summary statistics for the IBM AML dataset."""
+def update_case_status(case_id_: str, status: str, comment: str = None, reviewer: str = "unknown") -> bool:
+    """Apply a review action to a case and every violation it consolidates."""
+    with _store_lock:
+        cases = load_cases()
+        case = next((c for c in cases if c.id == case_id_), None)
+        if case is None:
+            return False
+        _mark_reviewed(case, status, comment)
+        violations = load_violations()
+        ids = []
+        for v in violations:
+            if v.case_id == case_id_:
+                _mark_reviewed(v, status, comment)
+                ids.append(v.id)
+        save_cases(cases)
+        _save_violations(violations)
+        lead = next((v for v in violations if v.id == case.violation_id), case)
+        activity_log.record_many([{**activity_log.review(lead, status, comment, reviewer, case_id_),
+                                   "violations": len(ids)}])
+        _publish_status(ids, status, case_id_, violations)
+    return True
+
+
+def _mark_reviewed(item, status: str, comment: Optional[str]) -> None:
+    item.status = status
+    if comment:
+        item.reviewer_comment = comment
+    item.reviewed_at = datetime.now(timezone.utc).isoformat()
+
+
+def get_dataset_stats(dataset_id: str = DEFAULT_DATASET) -> dict:
+    """
+    Return summary statistics for a registered dataset.
+    Served from the incrementally maintained sketch summary (see stats_sketch);
+    distinct accounts and amount quantiles are approximate.
+    """
     try:
-        df = load_transactions()
-        total = len(df)
-        laundering_count = int(df["Is Laundering"].sum())
+        adapter = get_adapter(dataset_id)
+        stats = get_stats(dataset_id)
+        total = stats.count
+        laundering_count = stats.laundering
         laundering_pct = round(laundering_count / total * 100, 2) if total > 0 else 0
-        currencies = df["Payment Currency"].value_counts().head(5).to_dict()
-        formats = df["Payment Format"].value_counts().to_dict()
+        quantiles = {
+            f"p{int(q * 100)}": (round(v, 2) if v is not None else None)
+            for q in (0.5, 0.9, 0.99) for v in [stats.amounts.quantile(q)]
+        }
         return {
             "total_transactions": total,
             "confirmed_laundering": laundering_count,
             "laundering_percentage": laundering_pct,
-            "avg_amount_paid": round(float(df["Amount Paid"].mean()), 2),
-            "max_amount_paid": round(float(df["Amount Paid"].max()), 2),
-            "top_currencies": currencies,
-            "payment_formats": formats,
-            "source": "IBM AML Dataset (Synthetic, CDLA-Sharing-1.0)",
-            "kaggle_url": "https://www.kaggle.com/datasets/ealtman2019/ibm-transactions-for-anti-money-laundering-aml",
+            "avg_amount_paid": round(stats.amount_sum / total, 2) if total else 0,
+            "max_amount_paid": round(stats.amount_max, 2) if stats.amount_max is not None else 0,
+            "amount_paid_quantiles": quantiles,
+            "distinct_accounts": stats.accounts.estimate(),
+            "top_currencies": stats.currencies.top(5),
+            "payment_formats": stats.formats.top(),
+            "source": f"{adapter.name} ({adapter.license})",
+            "kaggle_url": adapter.source,
         }
     except Exception as e:
         return {"error": str(e)}
 
 
-def get_dataset_preview(limit: int = 20) -> list:
-    """Return the first `limit` rows of the dataset as a list of dicts."""
+def get_dataset_preview(limit: int = 20, dataset_id: str = DEFAULT_DATASET, offset: int = 0) -> list:
+    """Return `limit` raw rows starting at row `offset`, read via the byte-offset row index."""
     try:
-        df = load_transactions()
-        return df.head(limit).where(df.head(limit).notna(), None).to_dict("records")
+        return read_rows(get_adapter(dataset_id), offset, limit)
     except Exception as e:
         return [{"error": str(e)}]
+
+
+def get_source_row(violation: Violation) -> dict:
+    """Return the raw dataset row behind a violation's evidence."""
+    dataset_id = violation.evidence.get("dataset", DEFAULT_DATASET)
+    row_number = violation.evidence.get("row_number")
+    if row_number is None:
+        raise LookupError("Violation predates row tracking; re-run the scan to link source rows.")
+    rows = read_rows(get_adapter(dataset_id), int(row_number), 1)
+    if not rows:
+        raise LookupError(f"Row {row_number} no longer exists in dataset '{dataset_id}'.")
+    return {"dataset": dataset_id, "row": rows[0]}
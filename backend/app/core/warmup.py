@@ -0,0 +1,116 @@
+"""
+Startup warm-up: loads what the first dashboard request would otherwise pay for.
+
+Runs once in a worker thread from the app's lifespan hook, after the server is already
+accepting requests: imports the pandas-backed engines, parses the rules, loads the
+default dataset's columnar frame, brings its summary sketch and feature store up to
+date, reads the violation store and primes the review queue's priority index, and
+imports PyMuPDF for the first policy upload. Each step's duration is recorded; a failing
+step is logged and skipped, so a missing dataset never blocks startup. Set
+NITILENS_WARMUP=0 to skip it (e.g. when measuring cold paths).
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+from app.core.lazy import import_costs, timed_import
+
+logger = logging.getLogger("nitilens.warmup")
+
+ENABLED = os.getenv("NITILENS_WARMUP", "1") != "0"
+
+_state: Dict = {"status": "pending", "started_at": None, "finished_at": None, "steps": {}}
+_app_import_seconds = None
+
+
+def record_app_import(seconds: float) -> None:
+    """Called by app.main once its own imports are done."""
+    global _app_import_seconds
+    _app_import_seconds = seconds
+    logger.info(f"app.main imported in {seconds * 1000:.0f} ms (pandas-backed engines deferred)")
+
+
+def _import_engines():
+    for name in ("app.core.violation_engine", "app.core.cases", "app.core.feature_store",
+                 "app.core.row_index", "app.core.backtest", "app.core.rule_preview"):
+        timed_import(name)
+
+
+def _load_rules():
+    from app.core.rule_engine import get_rules
+    get_rules()
+
+
+def _load_transactions():
+    from app.core.violation_engine import DEFAULT_DATASET, load_transactions
+    load_transactions(DEFAULT_DATASET)
+
+
+def _summary_aggregates():
+    from app.core.feature_store import get_feature_store
+    from app.core.stats_sketch import get_stats, observe_chunks
+    from app.core.violation_engine import DEFAULT_DATASET, load_transactions
+    # Build from the frame already in memory rather than re-reading the file
+    frame = load_transactions(DEFAULT_DATASET)
+    observe_chunks(DEFAULT_DATASET, [frame])
+    get_stats(DEFAULT_DATASET)
+    get_feature_store(DEFAULT_DATASET, frame=frame)
+
+
+def _review_queue():
+    from app.core.priority import top_pending
+    from app.core.violation_engine import load_violations
+    top_pending(load_violations(), 1)
+
+
+def _import_pdf_parser():
+    timed_import("fitz")
+
+
+STEPS: Dict[str, Callable[[], None]] = {
+    "import_engines": _import_engines,
+    "rules": _load_rules,
+    "transactions": _load_transactions,
+    "summary_aggregates": _summary_aggregates,
+    "review_queue": _review_queue,
+    "pdf_parser": _import_pdf_parser,
+}
+
+
+def warm_up() -> dict:
+    """Run every warm-up step in order (blocking); returns the warm-up state."""
+    _state.update(status="warming", started_at=datetime.now(timezone.utc).isoformat())
+    started = time.perf_counter()
+    failed = 0
+    for name, step in STEPS.items():
+        step_started = time.perf_counter()
+        try:
+            step()
+            outcome = "ok"
+        except Exception as e:
+            failed += 1
+            outcome = f"failed: {e}"
+            logger.warning(f"Warm-up step '{name}' failed: {e}")
+        _state["steps"][name] = {"seconds": round(time.perf_counter() - step_started, 4), "outcome": outcome}
+    _state.update(
+        status="ready" if not failed else "degraded",
+        finished_at=datetime.now(timezone.utc).isoformat(),
+        seconds=round(time.perf_counter() - started, 4),
+    )
+    logger.info(f"Warm-up {_state['status']} in {_state['seconds']:.2f}s")
+    return warmup_status()
+
+
+def warmup_status() -> dict:
+    return {**_state, "steps": dict(_state["steps"]), "enabled": ENABLED}
+
+
+def startup_report() -> dict:
+    """Import-time costs of the app and its deferred modules, plus the warm-up state."""
+    return {
+        "app_import_seconds": round(_app_import_seconds, 4) if _app_import_seconds is not None else None,
+        "deferred_imports": import_costs(),
+        "warmup": warmup_status(),
+    }
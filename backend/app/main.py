@@ -7,15 +7,49 @@ Run with:
 API docs available at:
     http://localhost:8000/docs  (Swagger UI)
     http://localhost:8000/redoc (ReDoc)
+
+Heavy engines (pandas, PyMuPDF) are imported lazily; the lifespan hook warms them and the
+default dataset in the background, so the server answers health checks immediately.
 """
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.policies import router as policies_router
 from app.api.datasets import router as datasets_router
 from app.api.compliance import router as compliance_router
 from app.api.reviews import router as reviews_router
+from app.api.admin import router as admin_router
+from app.core.events import broadcaster, close_streams_on_exit
+from app.core.ingestion import shutdown_ingestion
+from app.core.metrics import CONTENT_TYPE, RequestMetricsMiddleware, render
+from app.core.profiler import ProfilerMiddleware
 from app.core.scheduler import start_scheduler, stop_scheduler
+from app.core.store_versions import NotModified, not_modified_handler
+from app.core.warmup import ENABLED as WARMUP_ENABLED, record_app_import, warm_up, warmup_status
+
+record_app_import(time.perf_counter() - _import_started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_scheduler()
+    close_streams_on_exit()
+    # Warm caches off the event loop; requests are served (cold) until it finishes
+    warmup = asyncio.create_task(asyncio.to_thread(warm_up)) if WARMUP_ENABLED else None
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    broadcaster.close_all()
+    stop_scheduler()
+    shutdown_ingestion()
+
 
 app = FastAPI(
     title="NitiLens — AI Compliance Platform",
@@ -27,6 +61,7 @@ app = FastAPI(
     version="1.0.0",
     contact={"name": "NitiLens Team", "url": "https://github.com/GDG-Cloud-New-Delhi/hackfest-2.0"},
     license_info={"name": "MIT"},
+    lifespan=lifespan,
 )
 
 # Allow the Vite dev server to call this API
@@ -42,25 +77,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Conditional GETs: read endpoints answer a current If-None-Match with 304
+app.add_exception_handler(NotModified, not_modified_handler)
+
+# Per-router request latency histograms, served at /metrics
+app.add_middleware(RequestMetricsMiddleware)
+# Opt-in sampling profiler (a sample rate; the X-Nitilens-Profile header / ?profile=1 only
+# when NITILENS_PROFILE_ON_REQUEST=1)
+app.add_middleware(ProfilerMiddleware)
+
 # Register API routers
 app.include_router(policies_router)
 app.include_router(datasets_router)
 app.include_router(compliance_router)
 app.include_router(reviews_router)
-
-
-@app.on_event("startup")
-async def on_startup():
-    start_scheduler()
-
-
-@app.on_event("shutdown")
-async def on_shutdown():
-    stop_scheduler()
+app.include_router(admin_router)
 
 
 @app.get("/", tags=["Health"])
-def health_check():
+async def health_check():
     return {
         "status": "ok",
         "service": "NitiLens API",
@@ -70,6 +105,18 @@ def health_check():
     }
 
 
+@app.get("/health", tags=["Health"], summary="Liveness and warm-up state")
+async def health():
+    """Answered on the event loop without touching storage; `warm` turns true after warm-up."""
+    state = warmup_status()
+    return {"status": "ok", "warm": state["status"] in ("ready", "degraded"), "warmup": state["status"]}
+
+
+@app.get("/metrics", tags=["Health"], summary="Prometheus metrics")
+def metrics():
+    return Response(content=render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/api", tags=["Health"])
 def api_root():
     return {
@@ -78,5 +125,7 @@ def api_root():
             "datasets": "/api/datasets",
             "compliance": "/api/compliance",
             "reviews": "/api/reviews",
+            "admin": "/api/admin",
+            "metrics": "/metrics",
         }
     }
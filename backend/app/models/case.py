@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+
+class Case(BaseModel):
+    id: str
+    rule_id: str
+    rule_name: str
+    severity: Literal["critical", "high", "medium", "low"]
+    account: str
+    violation_id: str
+    transaction_count: int
+    total_amount_usd: Optional[float] = None
+    first_seen: str
+    last_seen: str
+    counterparties: int
+    transaction_ids: List[str] = []
+    risk_score: Optional[float] = None
+    status: Literal["open", "reviewed", "resolved", "false_positive"] = "open"
+    reviewer_comment: Optional[str] = None
+    detected_at: str
+    reviewed_at: Optional[str] = None
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+
+class GdprEvent(BaseModel):
+    type: Literal["erasure_request", "erasure_completed", "breach_discovered", "breach_reported"]
+    subject: str
+    timestamp: str
+    event_id: Optional[str] = None
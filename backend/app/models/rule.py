@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 
 
 class PolicyRule(BaseModel):
@@ -11,3 +11,4 @@ class PolicyRule(BaseModel):
     category: str
     approved: bool = False
     policy_id: Optional[str] = None
+    article_refs: List[str] = []
@@ -14,3 +14,5 @@ class Violation(BaseModel):
     reviewer_comment: Optional[str] = None
     detected_at: str
     reviewed_at: Optional[str] = None
+    risk_score: Optional[float] = None
+    case_id: Optional[str] = None
@@ -0,0 +1,4 @@
+"""
+Benchmarks: synthetic IBM AML data generation and scan / endpoint performance harnesses.
+Run from the backend directory, e.g. `python -m benchmarks.bench --rows 1M`.
+"""
@@ -0,0 +1,231 @@
+"""
+Scan and endpoint benchmark harness.
+
+    python -m benchmarks.bench --rows 1M                  # generate (once) and benchmark
+    python -m benchmarks.bench --data /path/to/HI-Small_Trans.csv
+    python -m benchmarks.bench --rows 1M --update-baseline
+
+Each step reports wall time, throughput (rows/s) and peak RSS while it ran. Steps cover
+loading the columnar frame, every approved rule's mask, the dataset summary (cold and
+warm), the full scan, loading the violation store and the main dashboard endpoints.
+Results are compared with benchmarks/baseline.json for the same row count; a step slower
+than `--tolerance` x its baseline is reported as a regression (exit status 1 with
+--fail-on-regression).
+
+The app's JSON stores under app/storage are snapshotted before the run and restored
+afterwards, so benchmarking does not disturb local data.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.generate_transactions import generate, parse_rows
+
+BENCH_DIR = Path(__file__).parent
+DATA_DIR = BENCH_DIR / "data"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+STORAGE_DIR = BENCH_DIR.parent / "app" / "storage"
+
+ENDPOINTS = [
+    ("GET", "/api/compliance/summary"),
+    ("GET", "/api/compliance/violations?limit=100"),
+    ("GET", "/api/compliance/activity?limit=20"),
+    ("GET", "/api/reviews?limit=50"),
+    ("GET", "/api/reviews/stats"),
+    ("GET", "/api/datasets/aml/stats"),
+    ("GET", "/api/datasets/aml/preview?limit=50"),
+]
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss: bytes on macOS, KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class PeakRss:
+    """Samples resident memory on a background thread while a step runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+@contextmanager
+def preserved_storage():
+    """Snapshot app/storage and put it back afterwards, whatever the benchmark wrote."""
+    snapshot = Path(tempfile.mkdtemp(prefix="nitilens-bench-"))
+    shutil.copytree(STORAGE_DIR, snapshot / "storage")
+    try:
+        yield
+    finally:
+        shutil.rmtree(STORAGE_DIR)
+        shutil.copytree(snapshot / "storage", STORAGE_DIR)
+        shutil.rmtree(snapshot, ignore_errors=True)
+
+
+def measure(results: Dict[str, dict], name: str, fn: Callable, rows: int, repeat: int = 1) -> object:
+    """Run fn `repeat` times; record the median wall time, throughput and peak RSS."""
+    timings, value = [], None
+    with PeakRss() as rss:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            value = fn()
+            timings.append(time.perf_counter() - started)
+    wall = statistics.median(timings)
+    results[name] = {
+        "wall_s": round(wall, 4),
+        "rows_per_s": round(rows / wall) if wall > 0 and rows else None,
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+    }
+    print(f"  {name:<48} {wall:>9.3f}s  {results[name]['peak_rss_mb']:>8.1f} MB", flush=True)
+    return value
+
+
+def run(data: Path, rows: int, endpoint_repeat: int = 5) -> Dict[str, dict]:
+    # Adapters read their path at import time: point the IBM AML adapter at the benchmark file
+    os.environ["NITILENS_IBM_AML_PATH"] = str(data)
+    from fastapi.testclient import TestClient
+
+    from app.core import feature_store, stats_sketch
+    from app.core.dataset_adapters import invalidate_cache, load_frame
+    from app.core.rule_engine import get_rules
+    from app.core.violation_engine import get_dataset_stats, load_violations, rule_mask, run_scan
+    from app.main import app
+
+    results: Dict[str, dict] = {}
+    invalidate_cache()
+    df = measure(results, "load_frame (cold)", lambda: load_frame("ibm-aml"), rows)
+    measure(results, "load_frame (cached)", lambda: load_frame("ibm-aml"), rows, repeat=5)
+    feature_store._stores.clear()
+    shutil.rmtree(feature_store.FEATURES_DIR, ignore_errors=True)
+    features = measure(results, "feature_store (build from frame)",
+                       lambda: feature_store.get_feature_store("ibm-aml", frame=df), rows)
+    for rule in get_rules(approved_only=True):
+        measure(results, f"rule {rule.id}", lambda: rule_mask(rule.id, df, rule.condition, features), rows)
+
+    stats_sketch._summaries.clear()
+    shutil.rmtree(stats_sketch.STATS_DIR, ignore_errors=True)
+    measure(results, "get_dataset_stats (cold)", lambda: get_dataset_stats("ibm-aml"), rows)
+    measure(results, "get_dataset_stats (warm)", lambda: get_dataset_stats("ibm-aml"), rows, repeat=5)
+
+    violations = measure(results, "run_scan", lambda: run_scan("ibm-aml"), rows)
+    results["run_scan"]["violations"] = len(violations)
+    measure(results, "load_violations", load_violations, len(violations), repeat=3)
+
+    client = TestClient(app)
+    for method, path in ENDPOINTS:
+        def call(method=method, path=path):
+            response = client.request(method, path)
+            response.raise_for_status()
+        measure(results, f"{method} {path}", call, rows, repeat=endpoint_repeat)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Optional[dict], tolerance: float) -> List[str]:
+    if not baseline:
+        print("\nNo baseline for this row count; run with --update-baseline to record one.")
+        return []
+    regressions = []
+    print(f"\n{'step':<50} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before or not before.get("wall_s"):
+            continue
+        ratio = current["wall_s"] / before["wall_s"]
+        flag = "  REGRESSION" if ratio > tolerance else ""
+        print(f"{name:<50} {before['wall_s']:>9.3f}s {current['wall_s']:>9.3f}s {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scans and dashboard endpoints.")
+    parser.add_argument("--rows", default="1M", help="rows to generate: 1M, 10M, 100M, ...")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data", type=Path, help="benchmark an existing IBM AML CSV instead of generating one")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--endpoint-repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="also write results as JSON here")
+    args = parser.parse_args(argv)
+
+    if args.data:
+        data = args.data.expanduser().resolve()
+        with data.open("rb") as fh:
+            rows = max(sum(block.count(b"\n") for block in iter(lambda: fh.read(1 << 24), b"")) - 1, 0)
+        label = data.name
+    else:
+        rows = parse_rows(args.rows)
+        data = DATA_DIR / f"ibm_aml_{args.rows}_{args.seed}.csv"
+        if not data.exists():
+            print(f"Generating {rows:,} rows -> {data}")
+            generate(rows, data, seed=args.seed)
+        label = f"generated-{args.rows}-seed{args.seed}"
+
+    print(f"Benchmarking {label} ({rows:,} rows)")
+    with preserved_storage():
+        results = run(data, rows, args.endpoint_repeat)
+
+    try:
+        baselines = json.loads(args.baseline.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        baselines = {}
+    regressions = compare(results, baselines.get(str(rows), {}).get("results"), args.tolerance)
+
+    record = {
+        "dataset": label,
+        "rows": rows,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    if args.update_baseline:
+        baselines[str(rows)] = record
+        args.baseline.write_text(json.dumps(baselines, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline for {rows:,} rows written to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} step(s) slower than {args.tolerance}x baseline.")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
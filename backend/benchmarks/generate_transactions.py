@@ -0,0 +1,197 @@
+"""
+Seeded generator of IBM AML-schema transaction files for benchmarking.
+
+    python -m benchmarks.generate_transactions --rows 10M --out benchmarks/data/ibm_aml_10M.csv
+
+Background traffic draws senders and receivers from a Zipf-like account popularity
+distribution; each account has a home bank and a home currency, which determines its
+payment currency. Amounts are log-normal in USD and converted at the FX table's rates.
+About 0.1% of rows are injected laundering patterns (labelled Is Laundering = 1):
+rapid repeat transfers to one beneficiary, round-amount structuring, fan-out bursts
+and short account cycles. The file is written in time order, one chunk at a time, so
+memory stays flat at any row count.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HEADER = [
+    "Timestamp", "From Bank", "Account", "To Bank", "Account.1", "Amount Received",
+    "Receiving Currency", "Amount Paid", "Payment Currency", "Payment Format", "Is Laundering",
+]
+# The Kaggle files name both account columns "Account"; write the header the same way so
+# every benchmark and parity run reads a header with a duplicate column, as on real data
+FILE_HEADER = ["Account" if name == "Account.1" else name for name in HEADER]
+
+# Home-currency shares and approximate USD rates (kept in line with data/fx/usd_rates.csv)
+CURRENCIES = {
+    "US Dollar": (0.36, 1.0), "Euro": (0.23, 1.05), "Yuan": (0.07, 0.146), "Shekel": (0.04, 0.29),
+    "Canadian Dollar": (0.04, 0.75), "UK Pound": (0.04, 1.19), "Ruble": (0.04, 0.015),
+    "Australian Dollar": (0.03, 0.68), "Swiss Franc": (0.03, 1.06), "Yen": (0.03, 0.0073),
+    "Mexican Peso": (0.03, 0.051), "Rupee": (0.02, 0.0123), "Brazil Real": (0.02, 0.19),
+    "Saudi Riyal": (0.01, 0.266), "Bitcoin": (0.01, 18000.0),
+}
+FORMATS = {"Cheque": 0.30, "Credit Cards": 0.25, "ACH": 0.20, "Cash": 0.10, "Reinvestment": 0.09, "Wire": 0.06}
+
+START = pd.Timestamp("2022-09-01")
+SPAN_DAYS = 18
+LAUNDERING_RATE = 0.001
+CHUNK_ROWS = 1_000_000
+
+
+def parse_rows(text: str) -> int:
+    """'1M' / '10M' / '250k' / '1000' -> row count."""
+    text = text.strip().upper()
+    scale = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+class Population:
+    """Accounts with a popularity weight, home bank and home currency."""
+
+    def __init__(self, rows: int, rng: np.random.Generator):
+        n = max(1_000, rows // 25)
+        ranks = rng.permutation(n) + 1
+        weights = 1.0 / ranks ** 0.8
+        self.cdf = np.cumsum(weights / weights.sum())
+        # Distinct pseudo-random 9-digit hex names, deterministic per index
+        ids = (np.arange(n, dtype=np.uint64) * np.uint64(2654435761) + np.uint64(0x1F2E3D)) % np.uint64(16 ** 9)
+        self.names = np.array([f"{int(i):09X}" for i in ids], dtype=object)
+        n_banks = max(10, n // 200)
+        bank_weights = 1.0 / np.arange(1, n_banks + 1) ** 1.1
+        self.banks = rng.choice(np.arange(1, n_banks + 1), size=n, p=bank_weights / bank_weights.sum())
+        shares = np.array([s for s, _ in CURRENCIES.values()])
+        self.currency_codes = rng.choice(len(CURRENCIES), size=n, p=shares / shares.sum())
+        self.size = n
+
+    def sample(self, rng: np.random.Generator, k: int) -> np.ndarray:
+        return np.minimum(np.searchsorted(self.cdf, rng.random(k)), self.size - 1)
+
+
+_CURRENCY_NAMES = np.array(list(CURRENCIES), dtype=object)
+_RATES = np.array([r for _, r in CURRENCIES.values()])
+_FORMAT_NAMES = np.array(list(FORMATS), dtype=object)
+_FORMAT_P = np.array(list(FORMATS.values())) / sum(FORMATS.values())
+
+
+def _frame(pop: Population, senders, receivers, seconds, usd, formats, laundering,
+           same_currency=None) -> pd.DataFrame:
+    pay_codes = pop.currency_codes[senders]
+    recv_codes = pop.currency_codes[receivers]
+    if same_currency is not None:
+        recv_codes = np.where(same_currency, pay_codes, recv_codes)
+    paid = np.round(usd / _RATES[pay_codes], 2)
+    received = np.where(pay_codes == recv_codes, paid, np.round(usd / _RATES[recv_codes], 2))
+    formats = np.where(_CURRENCY_NAMES[pay_codes] == "Bitcoin", "Bitcoin", formats)
+    return pd.DataFrame({
+        "Timestamp": START + pd.to_timedelta(seconds, unit="s"),
+        "From Bank": pop.banks[senders],
+        "Account": pop.names[senders],
+        "To Bank": pop.banks[receivers],
+        "Account.1": pop.names[receivers],
+        "Amount Received": received,
+        "Receiving Currency": _CURRENCY_NAMES[recv_codes],
+        "Amount Paid": paid,
+        "Payment Currency": _CURRENCY_NAMES[pay_codes],
+        "Payment Format": formats,
+        "Is Laundering": laundering.astype(np.int8),
+    })
+
+
+def _patterns(pop: Population, rng: np.random.Generator, target: int, lo: int, hi: int) -> pd.DataFrame:
+    """Roughly `target` laundering rows with timestamps in [lo, hi) seconds."""
+    parts, produced = [], 0
+    while produced < target:
+        kind = rng.integers(4)
+        origin = pop.sample(rng, 1)[0]
+        t0 = rng.integers(lo, max(hi - 86_400, lo + 1))
+        if kind == 0:    # rapid repeat transfers to one beneficiary within hours
+            k = int(rng.integers(6, 11))
+            senders, receivers = np.full(k, origin), np.full(k, pop.sample(rng, 1)[0])
+            seconds = t0 + np.sort(rng.integers(0, 12 * 3600, k))
+            usd = rng.uniform(2_000, 9_000, k)
+            formats = np.full(k, "Wire", dtype=object)
+        elif kind == 1:  # structuring: round amounts just under the reporting threshold
+            k = int(rng.integers(3, 7))
+            senders, receivers = np.full(k, origin), pop.sample(rng, k)
+            seconds = t0 + np.sort(rng.integers(0, 48 * 3600, k))
+            usd = rng.choice([6_000.0, 7_000.0, 8_000.0, 9_000.0], k)
+            formats = np.full(k, "Cash", dtype=object)
+        elif kind == 2:  # fan-out burst to many beneficiaries
+            k = int(rng.integers(5, 13))
+            senders, receivers = np.full(k, origin), pop.sample(rng, k)
+            seconds = t0 + np.sort(rng.integers(0, 6 * 3600, k))
+            usd = rng.lognormal(9.5, 0.4, k)
+            formats = np.full(k, "ACH", dtype=object)
+        else:            # short cycle A -> B -> ... -> A with slowly shrinking amounts
+            k = int(rng.integers(3, 6))
+            ring = np.concatenate([[origin], pop.sample(rng, k - 1)])
+            senders, receivers = ring, np.roll(ring, -1)
+            seconds = t0 + np.cumsum(rng.integers(600, 6 * 3600, k))
+            usd = rng.uniform(20_000, 200_000) * 0.97 ** np.arange(k)
+            formats = np.full(k, "Wire", dtype=object)
+        same = None
+        if kind == 1:
+            # Round in the payment currency (as aml-003 checks), received in the same currency
+            rate = _RATES[pop.currency_codes[senders]]
+            usd = np.maximum(np.round(usd / rate / 1000), 1) * 1000 * rate
+            same = np.ones(k, dtype=bool)
+        parts.append(_frame(pop, senders, receivers, np.minimum(seconds, hi - 1), usd,
+                            formats, np.ones(k, dtype=bool), same))
+        produced += k
+    return pd.concat(parts, ignore_index=True).head(target)
+
+
+def generate(rows: int, out: Path, seed: int = 42, chunk_rows: int = CHUNK_ROWS, quiet: bool = False) -> Path:
+    """Write `rows` transactions to `out` (CSV with the IBM AML header)."""
+    rng = np.random.default_rng(seed)
+    pop = Population(rows, rng)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    span = SPAN_DAYS * 86_400
+    n_chunks = max(1, -(-rows // chunk_rows))
+    started = time.perf_counter()
+    with out.open("w", newline="") as fh:
+        fh.write(",".join(FILE_HEADER) + "\n")
+        for i in range(n_chunks):
+            k = min(chunk_rows, rows - i * chunk_rows)
+            lo, hi = span * i // n_chunks, span * (i + 1) // n_chunks
+            n_laundering = int(rng.binomial(k, LAUNDERING_RATE))
+            n_normal = k - n_laundering
+            senders = pop.sample(rng, n_normal)
+            receivers = pop.sample(rng, n_normal)
+            normal = _frame(
+                pop, senders, receivers, rng.integers(lo, hi, n_normal),
+                rng.lognormal(7.0, 1.6, n_normal),
+                rng.choice(_FORMAT_NAMES, size=n_normal, p=_FORMAT_P),
+                np.zeros(n_normal, dtype=bool),
+                same_currency=rng.random(n_normal) < 0.95,
+            )
+            chunk = pd.concat([normal, _patterns(pop, rng, n_laundering, lo, hi)], ignore_index=True) \
+                if n_laundering else normal
+            chunk = chunk.sort_values("Timestamp", kind="stable")
+            chunk.to_csv(fh, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S")
+            if not quiet:
+                done = i * chunk_rows + k
+                rate = done / (time.perf_counter() - started)
+                print(f"  {done:,} / {rows:,} rows ({rate:,.0f} rows/s)", file=sys.stderr)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="1M", help="row count, e.g. 1M, 10M, 100M")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, help="output CSV (default benchmarks/data/ibm_aml_<rows>_<seed>.csv)")
+    args = parser.parse_args(argv)
+    rows = parse_rows(args.rows)
+    out = args.out or Path(__file__).parent / "data" / f"ibm_aml_{args.rows}_{args.seed}.csv"
+    generate(rows, out, seed=args.seed)
+    print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Concurrent API load test.
+
+    python -m benchmarks.load_test --clients 50 --duration 30
+    python -m benchmarks.load_test --workers 4 --mix poll=80,review=15,upload=4,scan=1
+    python -m benchmarks.load_test --base-url http://localhost:8000 --duration 60
+
+Starts the app under uvicorn (unless --base-url points at a running server) and drives
+it from many concurrent async clients. Each client repeatedly picks a scenario by
+weight: dashboard polling (summary, violations, activity, review queue, stats), review
+actions on queued violations, policy PDF uploads and compliance scans. The report gives
+per endpoint the request count, throughput, error rate and p50 / p95 / p99 / max latency;
+503 responses from the upload queue's backpressure are counted as throttled, and review
+actions on violations a concurrent scan has already replaced (404) as stale, not errors.
+
+When the harness starts the server, app/storage is snapshotted and restored afterwards.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench import preserved_storage
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+POLL_ENDPOINTS = [
+    "/api/compliance/summary",
+    "/api/compliance/violations?limit=50",
+    "/api/compliance/activity?limit=20",
+    "/api/reviews?limit=50",
+    "/api/reviews/stats",
+    "/api/reviews/cases?limit=20",
+    "/api/datasets/aml/stats",
+    "/api/compliance/scheduler",
+]
+REVIEW_ACTIONS = ["resolve", "dismiss", "escalate"]
+DEFAULT_MIX = "poll=80,review=14,upload=5,scan=1"
+
+
+class Recorder:
+    """Latencies and outcomes per endpoint label."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.throttled: Dict[str, int] = defaultdict(int)
+        self.stale: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str,
+                      stale_statuses=(), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[label].append(time.perf_counter() - started)
+            self.errors[label] += 1
+            self.error_samples.setdefault(label, f"{type(e).__name__}: {e}")
+            return None
+        self.latencies[label].append(time.perf_counter() - started)
+        if response.status_code == 503:
+            self.throttled[label] += 1
+        elif response.status_code in stale_statuses:
+            self.stale[label] += 1
+        elif response.status_code >= 400:
+            self.errors[label] += 1
+            self.error_samples.setdefault(label, f"{response.status_code}: {response.text[:200]}")
+        return response
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+def _pdf_bytes(n: int) -> bytes:
+    """A small single-page PDF; the counter keeps content hashes distinct."""
+    text = f"AML policy load test {n}: transactions above 10000 USD must be reported."
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+async def _poll(client, rec: Recorder, rng: random.Random, state: dict):
+    url = rng.choice(POLL_ENDPOINTS)
+    await rec.request(client, f"GET {url.split('?')[0]}", "GET", url)
+
+
+async def _review(client, rec: Recorder, rng: random.Random, state: dict):
+    queue = state.get("queue") or []
+    if not queue or rng.random() < 0.2:
+        response = await rec.request(client, "GET /api/reviews", "GET", "/api/reviews?limit=200")
+        if response is not None and response.status_code == 200:
+            queue = [v["id"] for v in response.json()["violations"]]
+            state["queue"] = queue
+    if not queue:
+        return
+    violation_id = queue.pop(rng.randrange(len(queue)))
+    response = await rec.request(
+        client, "POST /api/reviews/{id}/action", "POST", f"/api/reviews/{violation_id}/action",
+        stale_statuses=(404,),
+        json={"action": rng.choice(REVIEW_ACTIONS), "comment": "load test", "reviewed_by": "load-test"},
+    )
+    if response is not None and response.status_code == 404:
+        state["queue"] = []  # a scan replaced the store; refetch the queue
+
+
+async def _upload(client, rec: Recorder, rng: random.Random, state: dict):
+    state["uploads"] = state.get("uploads", 0) + 1
+    n = rng.getrandbits(48) ^ state["uploads"]
+    files = {"file": (f"load-test-{n}.pdf", _pdf_bytes(n), "application/pdf")}
+    await rec.request(client, "POST /api/policies/upload", "POST", "/api/policies/upload", files=files)
+
+
+async def _scan(client, rec: Recorder, rng: random.Random, state: dict):
+    await rec.request(client, "POST /api/compliance/scan", "POST", "/api/compliance/scan")
+
+
+SCENARIOS = {"poll": _poll, "review": _review, "upload": _upload, "scan": _scan}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'poll=80,review=15' -> {'poll': 80.0, 'review': 15.0}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("the mix needs at least one scenario with a positive weight")
+    return mix
+
+
+async def _client(n: int, base_url: str, deadline: float, mix: Dict[str, float], rec: Recorder,
+                  think_time: float, seed: int, timeout: float):
+    rng = random.Random(seed * 1_000_003 + n)
+    names, weights = list(mix), list(mix.values())
+    state: dict = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        while time.perf_counter() < deadline:
+            await SCENARIOS[rng.choices(names, weights)[0]](client, rec, rng, state)
+            if think_time:
+                await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def run_load(base_url: str, clients: int, duration: float, mix: Dict[str, float],
+                   think_time: float = 0.0, seed: int = 0, timeout: float = 120.0) -> dict:
+    rec = Recorder()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _client(n, base_url, deadline, mix, rec, think_time, seed, timeout) for n in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+    return summarize(rec, elapsed)
+
+
+def summarize(rec: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for label in sorted(rec.latencies):
+        values = sorted(rec.latencies[label])
+        endpoints[label] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "error_rate": round(rec.errors[label] / len(values), 4),
+            "throttled": rec.throttled[label],
+            "stale": rec.stale[label],
+            "p50_ms": round(_percentile(values, 50) * 1000, 2),
+            "p95_ms": round(_percentile(values, 95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+        if label in rec.error_samples:
+            endpoints[label]["first_error"] = rec.error_samples[label]
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(rec.errors.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{'endpoint':<38} {'reqs':>7} {'rps':>8} {'err%':>6} {'503':>5} {'stale':>5} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for label, e in report["endpoints"].items():
+        print(f"{label:<38} {e['requests']:>7} {e['throughput_rps']:>8.1f} {e['error_rate'] * 100:>6.2f} "
+              f"{e['throttled']:>5} {e['stale']:>5} {e['p50_ms']:>9.1f} {e['p95_ms']:>9.1f} "
+              f"{e['p99_ms']:>9.1f} {e['max_ms']:>9.1f}")
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s — {report['throughput_rps']} req/s, "
+          f"error rate {report['error_rate'] * 100:.2f}%")
+    for label, e in report["endpoints"].items():
+        if "first_error" in e:
+            print(f"  first error on {label}: {e['first_error']}")
+
+
+def _start_server(port: int, workers: int, data: Optional[Path]) -> subprocess.Popen:
+    env = dict(os.environ)
+    if data:
+        env["NITILENS_IBM_AML_PATH"] = str(data.expanduser().resolve())
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+
+def _wait_ready(base_url: str, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"uvicorn exited with status {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the NitiLens API.")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a client's requests (s)")
+    parser.add_argument("--base-url", help="load an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--data", type=Path, help="IBM AML CSV for the started server")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="also write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    def load(base_url):
+        print(f"Driving {base_url} with {args.clients} clients for {args.duration:.0f}s, mix {args.mix}")
+        return asyncio.run(run_load(base_url, args.clients, args.duration, args.mix,
+                                    args.think_time, args.seed, args.timeout))
+
+    if args.base_url:
+        report = load(args.base_url.rstrip("/"))
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        with preserved_storage():
+            server = _start_server(args.port, args.workers, args.data)
+            try:
+                _wait_ready(base_url, server)
+                report = load(base_url)
+            finally:
+                server.terminate()
+                try:
+                    server.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+    report["config"] = {"clients": args.clients, "duration_s": args.duration, "mix": args.mix,
+                        "workers": args.workers, "think_time_s": args.think_time}
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
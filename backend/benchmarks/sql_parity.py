@@ -0,0 +1,140 @@
+"""
+Parity check between the pandas and SQL scan engines.
+
+    python -m benchmarks.sql_parity --rows 100k
+    python -m benchmarks.sql_parity --data /path/to/HI-Small_Trans.csv
+
+For every approved rule, plus a set of conditions covering the whole condition language
+(windowed counts, IN lists, round-number checks, currency and timestamp comparisons),
+compares the row numbers each engine flags. Then runs a full scan with each engine and
+compares the resulting violations field by field, ignoring only the generated ids and
+detection times. Exits with status 1 on any difference. App storage is preserved as in
+benchmarks.bench.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.bench import DATA_DIR, preserved_storage
+from benchmarks.generate_transactions import generate, parse_rows
+
+CONDITIONS = [
+    "count(To Account, 24h) > 5",
+    "count(To Account, 1h) >= 2 AND Amount Paid > 1000",
+    "count(To Bank, 7d) > 20",
+    "count(Payment Format, 30m) >= 3 OR Is Laundering == 1",
+    "Payment Format IN ['Cheque', 'Wire'] AND Amount Paid > 25000",
+    "Amount Paid % 500 == 0 AND Amount Paid >= 2000",
+    "Amount Paid % 1000 != 0 AND Amount Received > 90000",
+    "Payment Currency != Receiving Currency AND Payment Currency == 'Euro'",
+    "Receiving Currency IN ['Bitcoin', 'Yuan'] OR From Bank == To Bank",
+    "Timestamp > '2022-09-05' AND Amount Paid < 50",
+]
+
+
+def _rows(flagged) -> set:
+    return set(int(i) for i in flagged)
+
+
+def check_rules(dataset_id: str) -> int:
+    """Compare flagged row numbers per rule / condition; returns the number of mismatches."""
+    from app.core import sql_engine
+    from app.core.dataset_adapters import load_frame
+    from app.core.feature_store import get_feature_store
+    from app.core.rule_conditions import condition_mask
+    from app.core.rule_engine import get_rules
+    from app.core.violation_engine import rule_mask
+
+    df = load_frame(dataset_id)
+    features = get_feature_store(dataset_id, frame=df)
+    started = time.perf_counter()
+    sql_engine.sync(dataset_id)
+    print(f"  SQL mirror synced in {time.perf_counter() - started:.2f}s")
+
+    cases = [(rule.id, rule.condition, lambda rule=rule: rule_mask(rule.id, df, rule.condition, features)[0])
+             for rule in get_rules(approved_only=True)]
+    cases += [(f"condition {i + 1}", condition, lambda condition=condition: condition_mask(condition, df))
+              for i, condition in enumerate(CONDITIONS)]
+    mismatches = 0
+    for name, condition, pandas_mask in cases:
+        started = time.perf_counter()
+        expected = _rows(df.index[pandas_mask().to_numpy()])
+        pandas_s = time.perf_counter() - started
+        started = time.perf_counter()
+        rule_id = name if not name.startswith("condition") else "parity"
+        actual = _rows(sql_engine.flagged_rows(dataset_id, rule_id, condition))
+        sql_s = time.perf_counter() - started
+        status = "ok" if expected == actual else "MISMATCH"
+        print(f"  {name:<14} {len(expected):>9,} rows  pandas {pandas_s:>7.3f}s  sql {sql_s:>7.3f}s  {status}"
+              + ("" if name.startswith("aml-") else f"  [{condition}]"))
+        if expected != actual:
+            mismatches += 1
+            print(f"    pandas only: {sorted(expected - actual)[:10]}  sql only: {sorted(actual - expected)[:10]}")
+    return mismatches
+
+
+def _normalized(violations) -> list:
+    rows = []
+    for v in violations:
+        record = v.model_dump(exclude={"id", "detected_at"})
+        rows.append(record)
+    return sorted(rows, key=lambda r: (r["rule_id"], r["transaction_id"], r["case_id"] or ""))
+
+
+def check_scan(dataset_id: str) -> int:
+    """Compare full-scan violations from both engines; returns the number of differences."""
+    from app.core.violation_engine import run_scan
+
+    results = {}
+    for engine in ("pandas", "sql"):
+        started = time.perf_counter()
+        results[engine] = _normalized(run_scan(dataset_id, engine=engine))
+        print(f"  run_scan engine={engine:<7} {len(results[engine]):>9,} violations  "
+              f"{time.perf_counter() - started:>7.2f}s")
+    differences = 0
+    if len(results["pandas"]) != len(results["sql"]):
+        print(f"  violation counts differ: pandas {len(results['pandas'])}, sql {len(results['sql'])}")
+        differences += 1
+    for expected, actual in zip(results["pandas"], results["sql"]):
+        if expected != actual:
+            differences += 1
+            if differences <= 5:
+                fields = [k for k in expected if expected[k] != actual.get(k)]
+                print(f"  {expected['rule_id']} {expected['transaction_id']}: differs in {', '.join(fields)}")
+    print(f"  scan parity: {'ok' if not differences else f'{differences} difference(s)'}")
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the SQL scan engine against the pandas engine.")
+    parser.add_argument("--rows", default="100k", help="rows to generate: 100k, 1M, ...")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data", type=Path, help="check an existing IBM AML CSV instead of generating one")
+    parser.add_argument("--skip-scan", action="store_true", help="only compare per-rule row sets")
+    args = parser.parse_args(argv)
+
+    if args.data:
+        data = args.data.expanduser().resolve()
+    else:
+        data = DATA_DIR / f"ibm_aml_{args.rows}_{args.seed}.csv"
+        if not data.exists():
+            print(f"Generating {parse_rows(args.rows):,} rows -> {data}")
+            generate(parse_rows(args.rows), data, seed=args.seed)
+    # Adapters read their path at import time: point the IBM AML adapter at the file
+    os.environ["NITILENS_IBM_AML_PATH"] = str(data)
+
+    print(f"Comparing scan engines on {data.name}")
+    with preserved_storage():
+        failures = check_rules("ibm-aml")
+        if not args.skip_scan:
+            failures += check_scan("ibm-aml")
+    if failures:
+        print(f"\nEngines disagree ({failures} failure(s)).")
+        sys.exit(1)
+    print("\nEngines agree.")
+
+
+if __name__ == "__main__":
+    main()
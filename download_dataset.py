@@ -1,26 +1,48 @@
+"""
+Connect a locally downloaded dataset file to NitiLens.
+
+Datasets are not fetched live from Kaggle. Download the CSV once (manually or with
+the Kaggle CLI), then point this script at it:
+
+    python download_dataset.py paysim ~/Downloads/PS_20174392719_1491204439457_log.csv
+    python download_dataset.py ibm-aml ~/Downloads/HI-Small_Trans.csv
+
+The file is linked (or copied, where links are unsupported) to the path the dataset
+adapter reads from. Alternatively set NITILENS_PAYSIM_PATH / NITILENS_IBM_AML_PATH.
+"""
 import os
-import subprocess
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+from app.core.dataset_adapters import get_adapter  # noqa: E402
 
-def download_dataset():
-    if not os.path.exists("data"):
-        os.makedirs("data")
 
-    if len(os.listdir("data")) > 0:
-        print("Dataset already exists")
+def download_dataset(dataset_id: str = "paysim", source: str = None):
+    adapter = get_adapter(dataset_id)
+    target = adapter.path
+
+    if target.exists():
+        print(f"Dataset already exists at {target}")
+        return
+
+    if not source or not Path(source).expanduser().exists():
+        print(f"No local file given for '{dataset_id}'.")
+        print(f"Download it from {adapter.source} and re-run:")
+        print(f"    python download_dataset.py {dataset_id} /path/to/file.csv")
         return
 
-    print("Downloading dataset...")
-    subprocess.run([
-        "kaggle",
-        "datasets",
-        "download",
-        "-d",
-        "ealaxi/paysim1",
-        "-p",
-        "data",
-        "--unzip"
-    ])
-    print("Download complete")
+    source_path = Path(source).expanduser().resolve()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.symlink(source_path, target)
+        print(f"Linked {source_path} -> {target}")
+    except OSError:
+        shutil.copyfile(source_path, target)
+        print(f"Copied {source_path} -> {target}")
+
 
 if __name__ == "__main__":
-    download_dataset()
\ No newline at end of file
+    download_dataset(*sys.argv[1:3])
@@ -2,7 +2,7 @@ import { useState, useEffect } from 'react';
 import { TrendingDown, TrendingUp, AlertTriangle, FileText, Activity, Loader2, RefreshCw } from 'lucide-react';
 import { Card } from '../components/ui/card';
 import { LineChart, Line, BarChart, Bar, PieChart, Pie, Cell, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
-import { api, type ComplianceSummary, type ActivityResponse } from '../services/api';
+import { api, type ComplianceSummary, type ActivityResponse, type ActivityItem } from '../services/api';
 
 const SEVERITY_COLORS = {
   critical: '#ef4444',
@@ -11,6 +11,31 @@ const SEVERITY_COLORS = {
   low: '#10b981'
 };
 
+function activityTitle(item: ActivityItem): string {
+  switch (item.type) {
+    case 'violation_detected':
+      return `${item.severity!.charAt(0).toUpperCase() + item.severity!.slice(1)} violation detected`;
+    case 'violation_reviewed':
+      return `Violation reviewed by ${item.actor}`;
+    case 'case_reviewed':
+      return `Case reviewed by ${item.actor}`;
+    case 'scan_completed':
+      return `Scan completed: ${item.violations} violation(s)`;
+    case 'scan_failed':
+      return 'Scan failed';
+    case 'rule_approved':
+      return `Rule approved by ${item.actor}`;
+    case 'rule_unapproved':
+      return `Rule unapproved by ${item.actor}`;
+  }
+}
+
+function activityDetail(item: ActivityItem): string {
+  if (item.transaction_id) return `${item.transaction_id}: ${item.rule_name}`;
+  if (item.rule_name) return item.rule_name;
+  return item.dataset ?? '';
+}
+
 export function Dashboard() {
   const [data, setData] = useState<ComplianceSummary | null>(null);
   const [activity, setActivity] = useState<ActivityResponse | null>(null);
@@ -274,12 +299,12 @@ export function Dashboard() {
             <h3 className="text-lg font-semibold mb-4">Recent Activity</h3>
             {activity && activity.items.length > 0 ? (
               <div className="space-y-4 max-h-[300px] overflow-y-auto">
-                {activity.items.map((item, index) => (
-                  <div key={index} className="flex items-start gap-3">
+                {activity.items.map((item) => (
+                  <div key={item.seq} className="flex items-start gap-3">
                     <div
                       className={`w-2 h-2 rounded-full mt-2 flex-shrink-0`}
                       style={{
-                        backgroundColor: item.type === 'violation_detected'
+                        backgroundColor: item.type === 'violation_detected' && item.severity
                           ? SEVERITY_COLORS[item.severity]
                           : item.status === 'resolved'
                           ? '#10b981'
@@ -288,10 +313,10 @@ export function Dashboard() {
                     />
                     <div className="flex-1 min-w-0">
                       <p className="text-sm font-medium text-gray-900 truncate">
-                        {item.type === 'violation_detected' ? `${item.severity.charAt(0).toUpperCase() + item.severity.slice(1)} violation detected` : 'Violation reviewed'}
+                        {activityTitle(item)}
                       </p>
-                      <p className="text-xs text-gray-600 truncate" title={`${item.transaction_id}: ${item.rule_name}`}>
-                        {item.transaction_id}: {item.rule_name}
+                      <p className="text-xs text-gray-600 truncate" title={activityDetail(item)}>
+                        {activityDetail(item)}
                       </p>
                       <p className="text-xs text-gray-500">
                         {new Date(item.timestamp).toLocaleString('en-US', {
@@ -53,13 +53,18 @@ export interface ComplianceSummary {
 }
 
 export interface ActivityItem {
-    type: 'violation_detected' | 'violation_reviewed';
-    severity: 'critical' | 'high' | 'medium' | 'low';
-    transaction_id: string;
-    rule_name: string;
+    seq: number;
+    type: 'violation_detected' | 'violation_reviewed' | 'case_reviewed' | 'scan_completed'
+        | 'scan_failed' | 'rule_approved' | 'rule_unapproved';
+    actor: string;
+    severity?: 'critical' | 'high' | 'medium' | 'low';
+    transaction_id?: string;
+    rule_name?: string;
     timestamp: string;
-    status: string;
+    status?: string;
     comment?: string;
+    dataset?: string;
+    violations?: number;
 }
 
 export interface ActivityResponse {
@@ -55,6 +55,34 @@ def test_endpoint(name: str, method: str, endpoint: str, expected_keys: list) ->
         return False
 
 
+def test_export(name: str, endpoint: str) -> bool:
+    """Test a binary export endpoint (Arrow / Parquet): status 200 and a non-empty body."""
+    url = f"{API_BASE}{endpoint}"
+    print(f"\n{'='*60}")
+    print(f"Testing: {name}")
+    print(f"URL: {url}")
+
+    try:
+        response = requests.get(url, timeout=60)
+        print(f"Status: {response.status_code}")
+        if response.status_code == 501:
+            print("⚠️  pyarrow is not installed on the backend; skipping")
+            return True
+        if response.status_code != 200 or not response.content:
+            print(f"❌ Failed with status {response.status_code}")
+            print(f"Response: {response.text[:500]}")
+            return False
+        print(f"✅ Success! {len(response.content):,} bytes ({response.headers.get('content-type')})")
+        return True
+
+    except requests.exceptions.ConnectionError:
+        print(f"❌ Connection failed. Is the backend running at {API_BASE}?")
+        return False
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+
 def main():
     print("="*60)
     print("NitiLens Dashboard API Validation")
@@ -115,6 +143,18 @@ def main():
             test["expected_keys"]
         )
         results.append((test["name"], success))
+
+    # Timezone-aware date bounds must be accepted (they are compared as naive UTC)
+    exports = [
+        ("Export Violations (tz-aware dates)",
+         "/compliance/export/violations?format=parquet"
+         "&date_from=2022-09-01T00:00:00Z&date_to=2022-09-30T23:59:59%2B02:00"),
+        ("Export Flagged (tz-aware dates)",
+         "/compliance/export/flagged?format=arrow&rule_id=aml-001"
+         "&date_from=2022-09-01T00:00:00Z&date_to=2022-09-30T23:59:59%2B02:00"),
+    ]
+    for name, endpoint in exports:
+        results.append((name, test_export(name, endpoint)))
     
     # Summary
     print(f"\n{'='*60}")